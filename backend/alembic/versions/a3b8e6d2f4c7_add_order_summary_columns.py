@@ -0,0 +1,66 @@
+"""add order summary columns
+
+Revision ID: a3b8e6d2f4c7
+Revises: f2a9c4d7e6b1
+Create Date: 2026-10-19 15:22:17.408315
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3b8e6d2f4c7'
+down_revision: Union[str, None] = 'f2a9c4d7e6b1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# The thumbnail is the image of the order's first line (lowest item id)
+BACKFILL = sa.text(
+    """
+    UPDATE orders o
+    SET item_count = summary.item_count, first_item_image = summary.first_item_image
+    FROM (
+        SELECT
+            order_id,
+            COUNT(*) AS item_count,
+            (array_agg(image ORDER BY id))[1] AS first_item_image
+        FROM order_item
+        WHERE order_id >= :start AND order_id < :stop
+        GROUP BY order_id
+    ) summary
+    WHERE o.id = summary.order_id
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("orders", sa.Column("item_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("orders", sa.Column("first_item_image", sa.String(), nullable=True))
+
+    # Backfill in id ranges, each committed on its own to keep locks short
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM orders")).scalar()
+        for start in range(0, last_id + 1, BATCH_SIZE):
+            bind.execute(BACKFILL, {"start": start, "stop": start + BATCH_SIZE})
+
+        op.create_index(
+            "ix_orders_owner_id_id",
+            "orders",
+            ["owner_id", "id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_orders_owner_id_id", table_name="orders", postgresql_concurrently=True)
+    op.drop_column("orders", "first_item_image")
+    op.drop_column("orders", "item_count")
@@ -0,0 +1,39 @@
+"""add order checkout token
+
+Revision ID: a8c3f6e1d9b2
+Revises: e7a2c5f9b4d1
+Create Date: 2026-10-19 21:14:52.403817
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8c3f6e1d9b2'
+down_revision: Union[str, None] = 'e7a2c5f9b4d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Nullable without a default: no table rewrite, existing orders keep NULL
+    op.add_column("orders", sa.Column("checkout_token", sa.String(length=32), nullable=True))
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_checkout_token",
+            "orders",
+            ["checkout_token"],
+            unique=True,
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_orders_checkout_token", table_name="orders", postgresql_concurrently=True)
+    op.drop_column("orders", "checkout_token")
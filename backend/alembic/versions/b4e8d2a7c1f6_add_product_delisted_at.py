@@ -0,0 +1,30 @@
+"""add product delisted at
+
+Revision ID: b4e8d2a7c1f6
+Revises: a8c3f6e1d9b2
+Create Date: 2026-10-19 21:48:17.915264
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8d2a7c1f6'
+down_revision: Union[str, None] = 'a8c3f6e1d9b2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("product", sa.Column("delisted_at", sa.DateTime(timezone=True), nullable=True))
+    # Inactive with stock left can only be the seller's doing; sold-out products stay listed
+    op.execute("UPDATE product SET delisted_at = updated_at WHERE is_active = false AND stock > 0")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column("product", "delisted_at")
@@ -0,0 +1,35 @@
+"""add order item seller index
+
+Revision ID: b6d1f8a4c3e9
+Revises: a3b8e6d2f4c7
+Create Date: 2026-10-19 15:58:40.126954
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b6d1f8a4c3e9'
+down_revision: Union[str, None] = 'a3b8e6d2f4c7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_order_item_seller_id_order_id",
+            "order_item",
+            ["seller_id", "order_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_order_item_seller_id_order_id", table_name="order_item", postgresql_concurrently=True)
@@ -0,0 +1,83 @@
+"""add cache invalidation triggers
+
+Revision ID: c4a7d9e2f1b3
+Revises: b3f1c2d4e5a6
+Create Date: 2026-10-19 10:03:17.520914
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4a7d9e2f1b3'
+down_revision: Union[str, None] = 'b3f1c2d4e5a6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Trigger arguments name the "volatile" columns: an UPDATE touching only those
+# is sent with scope "volatile" so listeners can keep the static caches.
+TRIGGERS = {
+    "product": ["stock", "status", "price", "is_active", "updated_at"],
+    "sellers": [],
+    "orders": [],
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.execute(
+        """
+        CREATE OR REPLACE FUNCTION notify_cache_invalidation() RETURNS trigger AS $$
+        DECLARE
+            changed record;
+            scope text := 'all';
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed := OLD;
+            ELSE
+                changed := NEW;
+            END IF;
+
+            IF TG_OP = 'UPDATE' THEN
+                IF to_jsonb(NEW) = to_jsonb(OLD) THEN
+                    RETURN NULL;
+                END IF;
+                IF TG_NARGS > 0
+                   AND to_jsonb(NEW) - TG_ARGV::text[] = to_jsonb(OLD) - TG_ARGV::text[] THEN
+                    scope := 'volatile';
+                END IF;
+            END IF;
+
+            PERFORM pg_notify(
+                'cache_invalidation',
+                json_build_object(
+                    'table', TG_TABLE_NAME,
+                    'op', TG_OP,
+                    'id', changed.id,
+                    'owner_id', changed.owner_id,
+                    'scope', scope
+                )::text
+            );
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql;
+        """
+    )
+    for table, volatile_columns in TRIGGERS.items():
+        args = ", ".join(f"'{c}'" for c in volatile_columns)
+        op.execute(
+            f"""
+            CREATE TRIGGER {table}_cache_invalidation
+            AFTER INSERT OR UPDATE OR DELETE ON "{table}"
+            FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation({args})
+            """
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {table}_cache_invalidation ON "{table}"')
+    op.execute("DROP FUNCTION IF EXISTS notify_cache_invalidation()")
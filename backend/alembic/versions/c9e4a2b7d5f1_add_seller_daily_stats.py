@@ -0,0 +1,128 @@
+"""add seller daily stats
+
+Revision ID: c9e4a2b7d5f1
+Revises: b6d1f8a4c3e9
+Create Date: 2026-10-19 16:47:03.551829
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9e4a2b7d5f1'
+down_revision: Union[str, None] = 'b6d1f8a4c3e9'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Batches are ranges of order ids, so an order is counted by exactly one
+# batch and per-batch distinct order counts can simply be added up.
+DAY = "(o.created_at AT TIME ZONE 'UTC')::date"
+# product.category stores enum names; the rollups keep the values the API shows
+CATEGORY = (
+    "CASE p.category::text WHEN 'ELECTRONICS' THEN 'Electronics' "
+    "WHEN 'ACCESSORIES' THEN 'Accessories' WHEN 'STORAGE' THEN 'Storage' END"
+)
+
+BACKFILL_PRODUCTS = sa.text(
+    f"""
+    INSERT INTO seller_product_daily_stats AS s (
+        seller_id, day, product_id, category,
+        orders, units, revenue, cancelled_units, cancelled_revenue
+    )
+    SELECT
+        i.seller_id, {DAY}, i.product_id, MAX({CATEGORY}),
+        COUNT(DISTINCT i.order_id),
+        SUM(i.quantity),
+        SUM(i.total_price),
+        COALESCE(SUM(i.quantity) FILTER (WHERE i.status = 'cancelled'), 0),
+        COALESCE(SUM(i.total_price) FILTER (WHERE i.status = 'cancelled'), 0)
+    FROM order_item i
+    JOIN orders o ON o.id = i.order_id
+    LEFT JOIN product p ON p.id = i.product_id
+    WHERE i.order_id >= :start AND i.order_id < :stop
+    GROUP BY i.seller_id, {DAY}, i.product_id
+    ON CONFLICT (seller_id, day, product_id) DO UPDATE SET
+        category = COALESCE(EXCLUDED.category, s.category),
+        orders = s.orders + EXCLUDED.orders,
+        units = s.units + EXCLUDED.units,
+        revenue = s.revenue + EXCLUDED.revenue,
+        cancelled_units = s.cancelled_units + EXCLUDED.cancelled_units,
+        cancelled_revenue = s.cancelled_revenue + EXCLUDED.cancelled_revenue
+    """
+)
+
+BACKFILL_SELLERS = sa.text(
+    f"""
+    INSERT INTO seller_daily_stats AS s (
+        seller_id, day, orders, units, revenue, cancelled_units, cancelled_revenue
+    )
+    SELECT
+        i.seller_id, {DAY},
+        COUNT(DISTINCT i.order_id),
+        SUM(i.quantity),
+        SUM(i.total_price),
+        COALESCE(SUM(i.quantity) FILTER (WHERE i.status = 'cancelled'), 0),
+        COALESCE(SUM(i.total_price) FILTER (WHERE i.status = 'cancelled'), 0)
+    FROM order_item i
+    JOIN orders o ON o.id = i.order_id
+    WHERE i.order_id >= :start AND i.order_id < :stop
+    GROUP BY i.seller_id, {DAY}
+    ON CONFLICT (seller_id, day) DO UPDATE SET
+        orders = s.orders + EXCLUDED.orders,
+        units = s.units + EXCLUDED.units,
+        revenue = s.revenue + EXCLUDED.revenue,
+        cancelled_units = s.cancelled_units + EXCLUDED.cancelled_units,
+        cancelled_revenue = s.cancelled_revenue + EXCLUDED.cancelled_revenue
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        "seller_product_daily_stats",
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("category", sa.String(), nullable=True),
+        sa.Column("orders", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("units", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("revenue", sa.Float(), server_default="0", nullable=False),
+        sa.Column("cancelled_units", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("cancelled_revenue", sa.Float(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers.id"]),
+        sa.ForeignKeyConstraint(["product_id"], ["product.id"]),
+        sa.PrimaryKeyConstraint("seller_id", "day", "product_id"),
+    )
+    op.create_table(
+        "seller_daily_stats",
+        sa.Column("seller_id", sa.Integer(), nullable=False),
+        sa.Column("day", sa.Date(), nullable=False),
+        sa.Column("orders", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("units", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("revenue", sa.Float(), server_default="0", nullable=False),
+        sa.Column("cancelled_units", sa.Integer(), server_default="0", nullable=False),
+        sa.Column("cancelled_revenue", sa.Float(), server_default="0", nullable=False),
+        sa.ForeignKeyConstraint(["seller_id"], ["sellers.id"]),
+        sa.PrimaryKeyConstraint("seller_id", "day"),
+    )
+
+    # Backfill from existing orders in id ranges, each committed on its own
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM orders")).scalar()
+        for start in range(0, last_id + 1, BATCH_SIZE):
+            params = {"start": start, "stop": start + BATCH_SIZE}
+            bind.execute(BACKFILL_PRODUCTS, params)
+            bind.execute(BACKFILL_SELLERS, params)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table("seller_daily_stats")
+    op.drop_table("seller_product_daily_stats")
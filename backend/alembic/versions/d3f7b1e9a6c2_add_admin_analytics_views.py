@@ -0,0 +1,112 @@
+"""add admin analytics views
+
+Revision ID: d3f7b1e9a6c2
+Revises: c9e4a2b7d5f1
+Create Date: 2026-10-19 17:31:26.904117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3f7b1e9a6c2'
+down_revision: Union[str, None] = 'c9e4a2b7d5f1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Each view needs a unique index over all rows for REFRESH ... CONCURRENTLY.
+# Days are UTC, like the seller rollups.
+VIEWS = {
+    "mv_platform_daily_gmv": (
+        """
+        SELECT
+            (created_at AT TIME ZONE 'UTC')::date AS day,
+            COUNT(*) AS orders,
+            COUNT(*) FILTER (WHERE status = 'cancelled') AS cancelled_orders,
+            COALESCE(SUM(total_price) FILTER (WHERE status <> 'cancelled'), 0) AS gmv,
+            COUNT(DISTINCT owner_id) AS buyers
+        FROM orders
+        GROUP BY 1
+        """,
+        ["day"],
+    ),
+    "mv_orders_by_status": (
+        """
+        SELECT status::text AS status, COUNT(*) AS orders, COALESCE(SUM(total_price), 0) AS total
+        FROM orders
+        GROUP BY status
+        """,
+        ["status"],
+    ),
+    "mv_daily_signups": (
+        """
+        SELECT day, COALESCE(u.users, 0) AS users, COALESCE(s.sellers, 0) AS sellers
+        FROM (
+            SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS users
+            FROM "user"
+            GROUP BY 1
+        ) u
+        FULL JOIN (
+            SELECT (created_at AT TIME ZONE 'UTC')::date AS day, COUNT(*) AS sellers
+            FROM sellers
+            WHERE created_at IS NOT NULL
+            GROUP BY 1
+        ) s USING (day)
+        """,
+        ["day"],
+    ),
+    "mv_daily_category_sales": (
+        """
+        SELECT
+            day,
+            COALESCE(category, 'Uncategorized') AS category,
+            SUM(orders) AS orders,
+            SUM(units - cancelled_units) AS units,
+            SUM(revenue - cancelled_revenue) AS revenue
+        FROM seller_product_daily_stats
+        GROUP BY 1, 2
+        """,
+        ["day", "category"],
+    ),
+    "mv_seller_funnel": (
+        """
+        SELECT 'registered' AS stage, 1 AS position, COUNT(*) AS sellers FROM sellers
+        UNION ALL
+        SELECT 'approved', 2, COUNT(*) FROM sellers WHERE status = 'approved'
+        UNION ALL
+        SELECT 'listed', 3, COUNT(*) FROM sellers s
+        WHERE s.status = 'approved' AND EXISTS (SELECT 1 FROM product p WHERE p.seller_id = s.id)
+        UNION ALL
+        SELECT 'selling', 4, COUNT(*) FROM sellers s
+        WHERE s.status = 'approved' AND EXISTS (SELECT 1 FROM seller_daily_stats d WHERE d.seller_id = s.id)
+        UNION ALL
+        SELECT 'pending', 5, COUNT(*) FROM sellers WHERE status = 'pending'
+        UNION ALL
+        SELECT 'declined', 6, COUNT(*) FROM sellers WHERE status = 'declined'
+        """,
+        ["stage"],
+    ),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing users get the migration time as their signup date
+    op.add_column(
+        "user",
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+
+    for name, (query, unique_columns) in VIEWS.items():
+        op.execute(f"CREATE MATERIALIZED VIEW {name} AS {query}")
+        op.create_index(f"ux_{name}", name, unique_columns, unique=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for name in reversed(list(VIEWS)):
+        op.execute(f"DROP MATERIALIZED VIEW {name}")
+    op.drop_column("user", "created_at")
@@ -0,0 +1,50 @@
+"""add pending order expiry indexes
+
+Revision ID: d8e3b6a1c9f4
+Revises: c4a7d9e2f1b3
+Create Date: 2026-10-19 11:26:48.304771
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8e3b6a1c9f4'
+down_revision: Union[str, None] = 'c4a7d9e2f1b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # CONCURRENTLY so large tables stay writable while the indexes build
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_orders_pending_created_at",
+            "orders",
+            ["created_at"],
+            postgresql_where="status = 'pending'",
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_order_item_order_id",
+            "order_item",
+            ["order_id"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_seller_orders_owner_id_created_at",
+            "seller_orders",
+            ["owner_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_seller_orders_owner_id_created_at", table_name="seller_orders", postgresql_concurrently=True)
+        op.drop_index("ix_order_item_order_id", table_name="order_item", postgresql_concurrently=True)
+        op.drop_index("ix_orders_pending_created_at", table_name="orders", postgresql_concurrently=True)
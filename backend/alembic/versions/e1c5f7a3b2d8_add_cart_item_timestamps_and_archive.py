@@ -0,0 +1,61 @@
+"""add cart item timestamps and archive
+
+Revision ID: e1c5f7a3b2d8
+Revises: d8e3b6a1c9f4
+Create Date: 2026-10-19 12:41:05.672193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e1c5f7a3b2d8'
+down_revision: Union[str, None] = 'd8e3b6a1c9f4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Existing lines start their retention window now
+    op.add_column(
+        "cart_item",
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.add_column(
+        "cart_item",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+    )
+    op.create_table(
+        "cart_item_archive",
+        sa.Column("id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("owner_id", sa.Integer(), nullable=False),
+        sa.Column("product_id", sa.Integer(), nullable=False),
+        sa.Column("quantity", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("reason", sa.String(), nullable=False),
+        sa.Column("archived_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_cart_item_archive_owner_id", "cart_item_archive", ["owner_id"])
+
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_cart_item_updated_at",
+            "cart_item",
+            ["updated_at"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_cart_item_updated_at", table_name="cart_item", postgresql_concurrently=True)
+    op.drop_index("ix_cart_item_archive_owner_id", table_name="cart_item_archive")
+    op.drop_table("cart_item_archive")
+    op.drop_column("cart_item", "updated_at")
+    op.drop_column("cart_item", "created_at")
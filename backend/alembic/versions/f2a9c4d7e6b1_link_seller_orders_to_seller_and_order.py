@@ -0,0 +1,127 @@
+"""link seller orders to seller and order
+
+Revision ID: f2a9c4d7e6b1
+Revises: e1c5f7a3b2d8
+Create Date: 2026-10-19 14:08:52.931467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2a9c4d7e6b1'
+down_revision: Union[str, None] = 'e1c5f7a3b2d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 5000
+
+# Checkout writes an order and its seller orders in one transaction, so they
+# share owner_id and created_at (now() is the transaction start). The seller
+# is the one whose items in that order add up to the seller order's total.
+# Sellers with equal totals in one order can't be told apart by amount, so
+# both sides are ranked within (order, total) and paired rank to rank: each
+# seller order gets a different seller. Ranks cover all seller orders of the
+# batch's orders, not just the id range, so a batch boundary can't reset them.
+BACKFILL = sa.text(
+    """
+    WITH batch AS (
+        SELECT DISTINCT o.id AS order_id, o.owner_id, o.created_at
+        FROM seller_orders so
+        JOIN orders o ON o.owner_id = so.owner_id AND o.created_at = so.created_at
+        WHERE so.id >= :start AND so.id < :stop AND so.seller_id IS NULL
+    ),
+    ranked_seller_orders AS (
+        SELECT
+            so.id,
+            b.order_id,
+            round(so.total_price::numeric, 2) AS total,
+            row_number() OVER (
+                PARTITION BY b.order_id, round(so.total_price::numeric, 2) ORDER BY so.id
+            ) AS rank
+        FROM batch b
+        JOIN seller_orders so ON so.owner_id = b.owner_id AND so.created_at = b.created_at
+    ),
+    ranked_sellers AS (
+        SELECT
+            order_id,
+            seller_id,
+            round(SUM(total_price)::numeric, 2) AS total,
+            row_number() OVER (
+                PARTITION BY order_id, round(SUM(total_price)::numeric, 2) ORDER BY seller_id
+            ) AS rank
+        FROM order_item
+        WHERE order_id IN (SELECT order_id FROM batch)
+        GROUP BY order_id, seller_id
+    )
+    UPDATE seller_orders so
+    SET order_id = matched.order_id, seller_id = matched.seller_id
+    FROM (
+        SELECT rso.id, rso.order_id, rs.seller_id
+        FROM ranked_seller_orders rso
+        JOIN ranked_sellers rs
+            ON rs.order_id = rso.order_id AND rs.total = rso.total AND rs.rank = rso.rank
+    ) matched
+    WHERE so.id = matched.id AND so.id >= :start AND so.id < :stop AND so.seller_id IS NULL
+    """
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column("seller_orders", sa.Column("seller_id", sa.Integer(), nullable=True))
+    op.add_column("seller_orders", sa.Column("order_id", sa.Integer(), nullable=True))
+    op.create_foreign_key("fk_seller_orders_seller_id", "seller_orders", "sellers", ["seller_id"], ["id"])
+    op.create_foreign_key(
+        "fk_seller_orders_order_id", "seller_orders", "orders", ["order_id"], ["id"], ondelete="CASCADE"
+    )
+
+    # Backfill in id ranges, each committed on its own to keep locks short
+    with op.get_context().autocommit_block():
+        bind = op.get_bind()
+        last_id = bind.execute(sa.text("SELECT COALESCE(MAX(id), 0) FROM seller_orders")).scalar()
+        for start in range(0, last_id + 1, BATCH_SIZE):
+            bind.execute(BACKFILL, {"start": start, "stop": start + BATCH_SIZE})
+
+        op.create_index(
+            "ix_seller_orders_seller_id_status_created_at",
+            "seller_orders",
+            ["seller_id", "status", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_seller_orders_order_id",
+            "seller_orders",
+            ["order_id"],
+            postgresql_concurrently=True,
+        )
+        # Superseded by order_id for matching seller orders to their order
+        op.drop_index(
+            "ix_seller_orders_owner_id_created_at",
+            table_name="seller_orders",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_seller_orders_owner_id_created_at",
+            "seller_orders",
+            ["owner_id", "created_at"],
+            postgresql_concurrently=True,
+        )
+        op.drop_index("ix_seller_orders_order_id", table_name="seller_orders", postgresql_concurrently=True)
+        op.drop_index(
+            "ix_seller_orders_seller_id_status_created_at",
+            table_name="seller_orders",
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint("fk_seller_orders_order_id", "seller_orders", type_="foreignkey")
+    op.drop_constraint("fk_seller_orders_seller_id", "seller_orders", type_="foreignkey")
+    op.drop_column("seller_orders", "order_id")
+    op.drop_column("seller_orders", "seller_id")
@@ -0,0 +1,11 @@
+# Offline analytics (cohorts, repeat purchases, revenue distributions,
+# bought-together neighbours) over columnar extracts of orders/order_item.
+# Needs the optional numpy dependency: pip install "backend[analytics]".
+try:
+    import numpy  # noqa: F401
+except ImportError:
+    numpy = None
+
+
+def analytics_enabled() -> bool:
+    return numpy is not None
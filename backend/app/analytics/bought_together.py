@@ -0,0 +1,88 @@
+import numpy as np
+
+from app.analytics.reports import live, load, months
+from app.core.bought_together import MAX_BASKET, TOP_K
+
+# Co-purchase neighbours from the item extracts. Each order is a basket of
+# distinct products; every pair in a basket is one co-occurrence. Pairs are
+# scored by lift, P(a and b) / (P(a) P(b)): how much more often the two are
+# bought together than chance would have it. Lift overrates rare products,
+# so pairs seen in fewer than MIN_SUPPORT orders are dropped.
+HISTORY_MONTHS = 12
+MIN_SUPPORT = 3
+
+
+def _pairs(baskets: np.ndarray, starts: np.ndarray, sizes: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """All (a, b) with a before b in the same basket: one vectorized step per distance in the basket"""
+    firsts, seconds = [], []
+    for distance in range(1, int(sizes.max(initial=1))):
+        groups = sizes > distance
+        # Positions i in each basket that have a partner `distance` further on
+        counts = sizes[groups] - distance
+        base = np.repeat(starts[groups], counts)
+        offset = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        first = base + offset
+        firsts.append(baskets[first])
+        seconds.append(baskets[first + distance])
+    if not firsts:
+        return np.empty(0, np.int64), np.empty(0, np.int64)
+    return np.concatenate(firsts), np.concatenate(seconds)
+
+
+def neighbours(data_dir: str, history_months: int = HISTORY_MONTHS, top_k: int = TOP_K) -> dict:
+    """
+    Top-k products bought together with each product over the last
+    `history_months` extracted months, plus the order counts the scores
+    were computed from (the incremental updates need them).
+    """
+    selected = months(data_dir)[-history_months:]
+    items = live(load(data_dir, "items", selected))
+
+    # 1️⃣ Distinct (order, product) rows sorted by order; products as dense indexes
+    product_ids, product_index = np.unique(items["product_id"], return_inverse=True)
+    width = max(len(product_ids), 1)
+    rows = np.unique(items["order_id"] * width + product_index)
+    order_ids, baskets = rows // width, rows % width
+
+    # Orders per product and in total
+    total_orders = len(np.unique(order_ids))
+    product_orders = np.bincount(baskets, minlength=len(product_ids))
+
+    # 2️⃣ Baskets as runs of equal order ids
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]]) if len(order_ids) else np.empty(0, np.int64)
+    sizes = np.diff(np.r_[starts, len(order_ids)])
+    keep = (sizes >= 2) & (sizes <= MAX_BASKET)
+    first, second = _pairs(baskets, starts[keep], sizes[keep])
+
+    # 3️⃣ Sparse co-occurrence counts: one code per unordered pair (first < second within a basket)
+    codes, together = np.unique(first * width + second, return_counts=True)
+    supported = together >= MIN_SUPPORT
+    a, b, together = codes[supported] // width, codes[supported] % width, together[supported]
+    lift = together * total_orders / (product_orders[a].astype(np.float64) * product_orders[b])
+
+    # 4️⃣ Both directions, best lift first within each product, then the first top_k of each run
+    source = np.r_[a, b]
+    target = np.r_[b, a]
+    lift = np.r_[lift, lift]
+    together = np.r_[together, together]
+    order = np.lexsort((-together, -lift, source))
+    source, target, lift, together = source[order], target[order], lift[order], together[order]
+    run_starts = np.flatnonzero(np.r_[True, source[1:] != source[:-1]]) if len(source) else np.empty(0, np.int64)
+    rank = np.arange(len(source)) - np.repeat(run_starts, np.diff(np.r_[run_starts, len(source)]))
+    top = rank < top_k
+
+    result: dict[int, list] = {}
+    for s, t, score, count in zip(
+        product_ids[source[top]].tolist(),
+        product_ids[target[top]].tolist(),
+        lift[top].round(4).tolist(),
+        together[top].tolist(),
+    ):
+        result.setdefault(s, []).append([t, score, count])
+
+    return {
+        "months": selected,
+        "orders": int(total_orders),
+        "product_orders": dict(zip(product_ids.tolist(), product_orders.tolist())),
+        "neighbours": result,
+    }
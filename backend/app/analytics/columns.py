@@ -0,0 +1,24 @@
+from app.models.user_order import OrderStatus
+
+# One .npz file per table and month: {data_dir}/{table}-{YYYY-MM}.npz, one
+# array per column. Items are filed under the month of their order.
+PARTITION_FILE = "{table}-{month}.npz"
+
+ORDER_COLUMNS = {
+    "id": "int64",
+    "owner_id": "int64",
+    "created_at": "int64",      # epoch seconds, UTC
+    "total_price": "float64",
+    "status": "int8",           # index in STATUSES
+    "item_count": "int32",
+}
+ITEM_COLUMNS = {
+    "order_id": "int64",
+    "product_id": "int64",
+    "seller_id": "int64",
+    "quantity": "int32",
+    "total_price": "float64",
+    "status": "int8",
+}
+STATUSES = [status.value for status in OrderStatus]
+CANCELLED = STATUSES.index(OrderStatus.CANCELLED.value)
@@ -0,0 +1,64 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Optional
+
+from app.core.config import settings
+from app.core.redis import RedisClient
+
+# Reports are CPU bound, so they run in a small process pool and the API event
+# loop only awaits them. Extraction (the only part reading Postgres) runs as
+# a background job; reports read the files alone.
+ANALYTICS_REPORTS_CACHE_KEY = "admin_analytics:reports"  # hash: one field per report/range
+
+
+class AnalyticsPool:
+    _pool: Optional[ProcessPoolExecutor] = None
+
+    @classmethod
+    def get(cls) -> ProcessPoolExecutor:
+        if cls._pool is None:
+            # spawn: forking a process running an event loop and a DB pool is unsafe
+            cls._pool = ProcessPoolExecutor(
+                max_workers=settings.analytics_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return cls._pool
+
+    @classmethod
+    def shutdown(cls) -> None:
+        if cls._pool is not None:
+            cls._pool.shutdown(cancel_futures=True)
+            cls._pool = None
+
+
+async def run_report(name: str, **kwargs) -> dict:
+    """Run one of app.analytics.reports.REPORTS in the pool"""
+    from app.analytics.reports import REPORTS
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        AnalyticsPool.get(), partial(REPORTS[name], settings.analytics_data_dir, **kwargs)
+    )
+
+
+async def extract_orders() -> None:
+    """Background job: refresh the monthly extracts, then drop cached reports"""
+    from app.analytics.extract import extract_all
+
+    written = await extract_all(settings.analytics_data_dir)
+    if written:
+        print(f"Analytics extract wrote {', '.join(written)}")
+        await RedisClient.get().delete(ANALYTICS_REPORTS_CACHE_KEY)
+
+
+async def build_bought_together() -> None:
+    """Background job: recompute the co-purchase neighbours in the pool and replace them in Redis"""
+    from app.analytics.bought_together import neighbours
+    from app.core.bought_together import store
+
+    loop = asyncio.get_running_loop()
+    result = await loop.run_in_executor(AnalyticsPool.get(), partial(neighbours, settings.analytics_data_dir))
+    products = await store(RedisClient.get(), result)
+    print(f"Bought together: {products} products from {result['orders']} orders")
@@ -0,0 +1,117 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+from sqlalchemy import BigInteger, case, func
+from sqlalchemy.future import select
+
+from app.analytics.columns import ITEM_COLUMNS, ORDER_COLUMNS, PARTITION_FILE, STATUSES
+from app.core.engine import new_async_session
+from app.models.user_order import Order, OrderItem, OrderStatus
+
+# A month is rewritten on every run until its file was written SETTLE_DAYS
+# after the month ended (late cancellations and status changes are in by
+# then), later runs leave it alone. Rows are read through a server-side
+# cursor so a month never has to fit in memory as Python objects.
+EXTRACT_CHUNK_ROWS = 50_000
+SETTLE_DAYS = 7
+
+
+def _status_code(column):
+    return case({OrderStatus(status): code for code, status in enumerate(STATUSES)}, value=column)
+
+
+def _epoch(column):
+    return func.extract("epoch", column).cast(BigInteger)
+
+
+def _month_start(month: str) -> datetime:
+    return datetime.strptime(month, "%Y-%m").replace(tzinfo=timezone.utc)
+
+
+def _next_month(month: str) -> str:
+    year, number = map(int, month.split("-"))
+    return f"{year + number // 12}-{number % 12 + 1:02d}"
+
+
+def partition_path(data_dir: str, table: str, month: str) -> str:
+    return os.path.join(data_dir, PARTITION_FILE.format(table=table, month=month))
+
+
+def _save(path: str, columns: dict, chunks: list) -> None:
+    """Write one array per column; readers never see a half-written file"""
+    rows = np.concatenate(chunks) if chunks else np.empty(0, dtype=list(columns.items()))
+    tmp = f"{path}.tmp.npz"
+    np.savez(tmp, **{name: rows[name] for name in columns})
+    os.replace(tmp, path)
+
+
+async def _read(session, stmt, columns: dict) -> list:
+    dtype = list(columns.items())
+    result = await session.stream(stmt.execution_options(yield_per=EXTRACT_CHUNK_ROWS))
+    return [
+        np.array([tuple(row) for row in rows], dtype=dtype)
+        async for rows in result.partitions()
+    ]
+
+
+async def extract_month(session, data_dir: str, month: str) -> None:
+    start, stop = _month_start(month), _month_start(_next_month(month))
+    in_month = (Order.created_at >= start, Order.created_at < stop)
+
+    orders = await _read(
+        session,
+        select(
+            Order.id,
+            Order.owner_id,
+            _epoch(Order.created_at),
+            Order.total_price,
+            _status_code(Order.status),
+            Order.item_count,
+        ).where(*in_month),
+        ORDER_COLUMNS,
+    )
+    items = await _read(
+        session,
+        select(
+            OrderItem.order_id,
+            OrderItem.product_id,
+            OrderItem.seller_id,
+            OrderItem.quantity,
+            OrderItem.total_price,
+            _status_code(OrderItem.status),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*in_month),
+        ITEM_COLUMNS,
+    )
+
+    await asyncio.to_thread(_save, partition_path(data_dir, "orders", month), ORDER_COLUMNS, orders)
+    await asyncio.to_thread(_save, partition_path(data_dir, "items", month), ITEM_COLUMNS, items)
+
+
+async def extract_all(data_dir: str) -> list[str]:
+    """Extract every month that is missing or not settled yet, returns the months written"""
+    os.makedirs(data_dir, exist_ok=True)
+    current = datetime.now(timezone.utc).strftime("%Y-%m")
+
+    async with new_async_session() as session:
+        first = await session.scalar(select(func.min(Order.created_at)))
+        if first is None:
+            return []
+
+        written = []
+        month = first.astimezone(timezone.utc).strftime("%Y-%m")
+        while month <= current:
+            path = partition_path(data_dir, "items", month)
+            settled = _month_start(_next_month(month)) + timedelta(days=SETTLE_DAYS)
+            written_at = datetime.fromtimestamp(os.path.getmtime(path), timezone.utc) if os.path.exists(path) else None
+            if written_at is None or written_at < settled:
+                await extract_month(session, data_dir, month)
+                # Ends the read transaction so snapshots are per month
+                await session.commit()
+                written.append(month)
+            month = _next_month(month)
+
+    return written
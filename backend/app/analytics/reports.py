@@ -0,0 +1,176 @@
+import glob
+import os
+from typing import Optional
+
+import numpy as np
+
+from app.analytics.columns import CANCELLED, ITEM_COLUMNS, ORDER_COLUMNS, PARTITION_FILE
+
+# Report functions run in worker processes (app/analytics/engine.py): they
+# take plain arguments, read the extracts themselves and return JSON-ready
+# dicts, so no arrays cross the process boundary. Cancelled orders are left
+# out of every report.
+PERCENTILES = [10, 25, 50, 75, 90, 95, 99]
+
+
+def months(data_dir: str, since: Optional[str] = None, until: Optional[str] = None) -> list[str]:
+    """Extracted months (YYYY-MM) within [since, until]"""
+    pattern = os.path.join(data_dir, PARTITION_FILE.format(table="orders", month="*"))
+    found = sorted(os.path.basename(path)[len("orders-"): -len(".npz")] for path in glob.glob(pattern))
+    return [m for m in found if (not since or m >= since) and (not until or m <= until)]
+
+
+def load(data_dir: str, table: str, selected: list[str]) -> dict[str, np.ndarray]:
+    """Concatenate the monthly partitions of one table, column by column"""
+    columns = ORDER_COLUMNS if table == "orders" else ITEM_COLUMNS
+    parts: dict[str, list] = {name: [] for name in columns}
+    for month in selected:
+        with np.load(os.path.join(data_dir, PARTITION_FILE.format(table=table, month=month))) as data:
+            for name in columns:
+                parts[name].append(data[name])
+    return {
+        name: np.concatenate(arrays) if arrays else np.empty(0, dtype=columns[name])
+        for name, arrays in parts.items()
+    }
+
+
+def live(data: dict[str, np.ndarray]) -> dict[str, np.ndarray]:
+    keep = data["status"] != CANCELLED
+    return {name: column[keep] for name, column in data.items()}
+
+
+def _month_index(epoch: np.ndarray) -> np.ndarray:
+    """Months since 1970-01"""
+    return epoch.astype("datetime64[s]").astype("datetime64[M]").astype(np.int64)
+
+
+def _month_label(index: int) -> str:
+    return str(np.datetime64(int(index), "M"))
+
+
+def _by_buyer(orders: dict[str, np.ndarray]) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Orders sorted by (buyer, time): buyer ids, times, and the start of each buyer's run"""
+    order = np.lexsort((orders["created_at"], orders["owner_id"]))
+    owners, times = orders["owner_id"][order], orders["created_at"][order]
+    starts = np.flatnonzero(np.r_[True, owners[1:] != owners[:-1]]) if len(owners) else np.empty(0, np.int64)
+    return owners, times, starts
+
+
+def cohorts(data_dir: str, since: Optional[str] = None, until: Optional[str] = None, max_offset: int = 12) -> dict:
+    """
+    Monthly acquisition cohorts: buyers whose first order (within the
+    extracted range) fell in a month, and the share of them ordering again
+    0..max_offset months later.
+    """
+    selected = months(data_dir, since, until)
+    orders = live(load(data_dir, "orders", selected))
+    owners, times, starts = _by_buyer(orders)
+    if not len(owners):
+        return {"months": selected, "cohorts": []}
+
+    month = _month_index(times)
+    runs = np.diff(np.r_[starts, len(owners)])
+    cohort = np.repeat(month[starts], runs)
+    offset = month - cohort
+
+    # One hit per buyer and active month
+    first_in_month = np.r_[True, (owners[1:] != owners[:-1]) | (month[1:] != month[:-1])]
+    keep = first_in_month & (offset <= max_offset)
+    cohort_ids, cohort_index = np.unique(cohort[keep], return_inverse=True)
+    width = max_offset + 1
+    matrix = np.bincount(
+        cohort_index * width + offset[keep], minlength=len(cohort_ids) * width
+    ).reshape(len(cohort_ids), width)
+
+    sizes = matrix[:, 0]
+    return {
+        "months": selected,
+        "cohorts": [
+            {
+                "cohort": _month_label(cohort_id),
+                "buyers": int(size),
+                "retention": np.round(row / size, 4).tolist(),
+            }
+            for cohort_id, size, row in zip(cohort_ids, sizes, matrix)
+        ],
+    }
+
+
+def repeat_purchases(data_dir: str, since: Optional[str] = None, until: Optional[str] = None) -> dict:
+    """Share of buyers ordering more than once, orders per buyer and time to the second order"""
+    selected = months(data_dir, since, until)
+    orders = live(load(data_dir, "orders", selected))
+    owners, times, starts = _by_buyer(orders)
+    if not len(owners):
+        return {"months": selected, "buyers": 0}
+
+    counts = np.diff(np.r_[starts, len(owners)])
+    repeaters = starts[counts >= 2]
+    days_to_second = (times[repeaters + 1] - times[repeaters]) / 86400
+
+    capped = np.minimum(counts, 10)
+    histogram = np.bincount(capped, minlength=11)[1:]
+    return {
+        "months": selected,
+        "buyers": int(len(counts)),
+        "repeat_buyers": int(len(repeaters)),
+        "repeat_rate": round(float(len(repeaters) / len(counts)), 4),
+        "orders_per_buyer": {
+            **{str(n): int(histogram[n - 1]) for n in range(1, 10)},
+            "10+": int(histogram[9]),
+        },
+        "days_to_second_order": {
+            "mean": round(float(days_to_second.mean()), 2) if len(days_to_second) else None,
+            "median": round(float(np.median(days_to_second)), 2) if len(days_to_second) else None,
+        },
+    }
+
+
+def _distribution(values: np.ndarray) -> dict:
+    if not len(values):
+        return {"count": 0}
+    return {
+        "count": int(len(values)),
+        "sum": round(float(values.sum()), 2),
+        "mean": round(float(values.mean()), 2),
+        "percentiles": {
+            f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))
+        },
+    }
+
+
+def revenue_distribution(data_dir: str, since: Optional[str] = None, until: Optional[str] = None) -> dict:
+    """Order value percentiles and histogram, basket size in lines and in units"""
+    selected = months(data_dir, since, until)
+    orders = live(load(data_dir, "orders", selected))
+    items = live(load(data_dir, "items", selected))
+
+    totals = orders["total_price"]
+    histogram = []
+    if len(totals) and totals.max() > 0:
+        # Log-spaced bins: order values span several orders of magnitude
+        edges = np.unique(np.geomspace(max(totals[totals > 0].min(), 0.01), totals.max(), 20).round(2))
+        edges = np.r_[0, edges]
+        counts, _ = np.histogram(totals, bins=edges)
+        histogram = [
+            {"from": float(low), "to": float(high), "orders": int(count)}
+            for low, high, count in zip(edges[:-1], edges[1:], counts)
+        ]
+
+    # Units per order: sum of quantities grouped by order id
+    _, order_index = np.unique(items["order_id"], return_inverse=True)
+    units = np.bincount(order_index, weights=items["quantity"]) if len(order_index) else np.empty(0)
+
+    return {
+        "months": selected,
+        "order_value": {**_distribution(totals), "histogram": histogram},
+        "lines_per_order": _distribution(orders["item_count"].astype(np.float64)),
+        "units_per_order": _distribution(units),
+    }
+
+
+REPORTS = {
+    "cohorts": cohorts,
+    "repeat_purchases": repeat_purchases,
+    "revenue_distribution": revenue_distribution,
+}
@@ -6,6 +6,18 @@ from starlette.middleware.cors import CORSMiddleware
 from app.core.engine import warm_up_connections
 from app.core.redis import RedisClient
 from app.core.config import settings
+from app.core.tasks import BackgroundRunner
+from app.core.cart_store import flush_live_carts, live_cart_enabled
+from app.core.flash_sale import reconcile_flash_sales
+from app.core.idempotency import IdempotencyMiddleware
+from app.core.outbox import relay_outbox, wait_for_wake
+from app.core.admin_views import refresh_admin_views
+from app.core.view_counter import ViewCounter
+from app.analytics import analytics_enabled
+from app.analytics.engine import AnalyticsPool, build_bought_together, extract_orders
+from app.cache_listener import CacheInvalidationListener
+from app.order_expiry import expire_stale_orders
+from app.cart_cleanup import cleanup_carts
 
 from app.routes.users import auth_backend, fastapi_users
 from app.schemas.users import UserRead, UserCreate, UserUpdate
@@ -15,11 +27,14 @@ from app.routes.admin_users import router as admin_users_router
 from app.routes.todo import router as todo_router
 from app.routes.product import router as product_router
 from app.routes.cart import router as cart_router
+from app.routes.cart_live import router as cart_live_router
 from app.routes.checkout import router as checkout_router
 from app.routes.user_order import router as user_order_router
 from app.routes.seller import router as seller_router
 from app.routes.user_address import router as user_address_router
 from app.routes.admin_seller import router as admin_seller_router
+from app.routes.admin_flash_sale import router as admin_flash_sale_router
+from app.routes.admin_analytics import router as admin_analytics_router
 
 
 @asynccontextmanager
@@ -31,8 +46,30 @@ async def lifespan(app: FastAPI):
 
     print("Redis connected")
 
+    if live_cart_enabled():
+        BackgroundRunner.every("live-cart-flush", settings.cart_flush_interval, flush_live_carts)
+    BackgroundRunner.every("flash-sale-reconcile", settings.flash_sale_reconcile_interval, reconcile_flash_sales)
+    BackgroundRunner.every("outbox-relay", settings.outbox_relay_interval, relay_outbox, wait=wait_for_wake)
+    BackgroundRunner.every("order-expiry", settings.order_expiry_interval, expire_stale_orders)
+    BackgroundRunner.every("cart-cleanup", settings.cart_cleanup_interval, cleanup_carts)
+    BackgroundRunner.every("product-view-flush", settings.product_view_flush_interval, ViewCounter.flush)
+    BackgroundRunner.every("admin-analytics-refresh", settings.admin_analytics_refresh_interval, refresh_admin_views)
+    if analytics_enabled():
+        BackgroundRunner.every("analytics-extract", settings.analytics_extract_interval, extract_orders)
+        BackgroundRunner.every("bought-together", settings.bought_together_interval, build_bought_together)
+    CacheInvalidationListener.start()  # pg_notify from triggers on product, sellers, orders
+
     yield
 
+    await CacheInvalidationListener.stop()
+    await BackgroundRunner.stop()
+    AnalyticsPool.shutdown()
+    if live_cart_enabled():
+        await flush_live_carts()
+    await reconcile_flash_sales()
+    await relay_outbox()
+    await ViewCounter.flush()
+
     await RedisClient.close()
     print("Redis closed")
 
@@ -42,7 +79,13 @@ app = FastAPI(
 )
 
 # ----------------------------
-# CORS Middleware
+# Idempotency-Key replay (checkout, cart, seller products)
+# ----------------------------
+
+app.add_middleware(IdempotencyMiddleware)
+
+# ----------------------------
+# CORS Middleware (added last so it wraps everything)
 # ----------------------------
 
 app.add_middleware(
@@ -94,8 +137,11 @@ app.include_router(admin_users_router)
 app.include_router(todo_router)
 app.include_router(product_router)
 app.include_router(cart_router)
+app.include_router(cart_live_router)
 app.include_router(checkout_router)
 app.include_router(user_order_router)
 app.include_router(seller_router)
 app.include_router(user_address_router)
-app.include_router(admin_seller_router)
\ No newline at end of file
+app.include_router(admin_seller_router)
+app.include_router(admin_flash_sale_router)
+app.include_router(admin_analytics_router)
\ No newline at end of file
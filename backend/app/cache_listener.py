@@ -0,0 +1,117 @@
+import asyncio
+import json
+from typing import Optional
+
+import asyncpg
+from redis.asyncio import Redis
+
+from app.core.config import settings
+from app.core.engine import get_async_engine
+from app.core.product_cache import PRODUCT_STATIC_CACHE_KEY, PRODUCT_VOLATILE_CACHE_KEY
+from app.core.redis import RedisClient
+from app.routes.admin_seller import ADMIN_SELLER_CACHE_KEY, ADMIN_SELLERS_CACHE_KEY
+from app.routes.product import PRODUCTS_CACHE_KEY
+from app.routes.seller import SELLER_CACHE_KEY, SELLER_PRODUCT_CACHE_KEY, SELLER_PRODUCTS_CACHE_KEY
+from app.routes.user_order import ORDER_CACHE_KEY, ORDERS_CACHE_KEY
+
+# Channel used by the notify_cache_invalidation() trigger on product, sellers
+# and orders; every writer (API, scripts, migrations) invalidates through it.
+CHANNEL = "cache_invalidation"
+
+
+def _keys_for(change: dict) -> tuple[set[str], set[str]]:
+    """Return (keys, patterns) to drop for one notification"""
+    table, row_id, owner_id = change["table"], change["id"], change["owner_id"]
+    keys: set[str] = set()
+    patterns: set[str] = set()
+
+    if table == "product":
+        keys.add(PRODUCT_VOLATILE_CACHE_KEY.format(id=row_id))
+        if change["scope"] == "all":
+            keys.add(PRODUCT_STATIC_CACHE_KEY.format(id=row_id))
+            keys.add(SELLER_PRODUCT_CACHE_KEY.format(id=row_id))
+            patterns.add(f"{SELLER_PRODUCTS_CACHE_KEY}:{owner_id}:page:*")
+        if change["op"] != "UPDATE":
+            # Catalog pages only hold ids, they change when rows come and go
+            patterns.add(f"{PRODUCTS_CACHE_KEY}:page:*")
+    elif table == "sellers":
+        keys.add(SELLER_CACHE_KEY.format(id=owner_id))
+        keys.add(ADMIN_SELLER_CACHE_KEY.format(id=row_id))
+        patterns.add(f"{ADMIN_SELLERS_CACHE_KEY}:page:*")
+    elif table == "orders":
+        keys.add(ORDER_CACHE_KEY.format(user_id=owner_id, order_id=row_id))
+        keys.add(ORDERS_CACHE_KEY.format(user_id=owner_id))
+
+    return keys, patterns
+
+
+async def invalidate(redis: Redis, changes: list[dict]) -> None:
+    keys: set[str] = set()
+    patterns: set[str] = set()
+    for change in changes:
+        change_keys, change_patterns = _keys_for(change)
+        keys |= change_keys
+        patterns |= change_patterns
+
+    for pattern in patterns:
+        keys.update([key async for key in redis.scan_iter(match=pattern, count=500)])
+    if keys:
+        await redis.delete(*keys)
+
+
+class CacheInvalidationListener:
+    """LISTENs on a dedicated connection and applies notifications in batches"""
+    _task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def start(cls) -> None:
+        if cls._task is None:
+            cls._task = asyncio.create_task(cls._run(), name="cache-invalidation-listener")
+
+    @classmethod
+    async def stop(cls) -> None:
+        if cls._task:
+            cls._task.cancel()
+            await asyncio.gather(cls._task, return_exceptions=True)
+            cls._task = None
+
+    @classmethod
+    async def _connect(cls, queue: asyncio.Queue) -> asyncpg.Connection:
+        # LISTEN needs a session of its own, outside the SQLAlchemy pool
+        url = get_async_engine().url.set(drivername="postgresql")
+        conn = await asyncpg.connect(url.render_as_string(hide_password=False))
+        await conn.add_listener(CHANNEL, lambda *args: queue.put_nowait(args[3]))
+        return conn
+
+    @classmethod
+    async def _run(cls) -> None:
+        queue: asyncio.Queue = asyncio.Queue()
+        conn: Optional[asyncpg.Connection] = None
+        redis = RedisClient.get()
+
+        while True:
+            try:
+                if conn is None or conn.is_closed():
+                    conn = await cls._connect(queue)
+
+                try:
+                    payload = await asyncio.wait_for(queue.get(), timeout=5)
+                except asyncio.TimeoutError:
+                    continue  # lets us notice a dropped connection
+
+                # Collect whatever else arrives within the window into one batch
+                changes = [json.loads(payload)]
+                await asyncio.sleep(settings.cache_listener_batch_window)
+                while not queue.empty() and len(changes) < 1000:
+                    changes.append(json.loads(queue.get_nowait()))
+
+                await invalidate(redis, changes)
+
+            except asyncio.CancelledError:
+                if conn is not None:
+                    await conn.close()
+                raise
+            except Exception as e:
+                # Notifications sent while disconnected are lost; cache TTLs bound the staleness
+                print(f"Cache invalidation listener error: {e}")
+                await asyncio.sleep(1)
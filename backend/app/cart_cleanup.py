@@ -0,0 +1,127 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, insert, literal
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import outbox
+from app.core.cart_store import CART_DISCARD_TOPIC, live_cart_enabled
+from app.core.config import settings
+from app.core.engine import new_async_session
+from app.core.redis import RedisClient
+from app.models.cart import CartItem, CartItemArchive
+from app.models.product import Product
+from app.routes.cart import CARTS_CACHE_KEY
+
+# Hash with the last run's figures and running totals
+CART_CLEANUP_METRICS_KEY = "metrics:cart_cleanup"
+
+
+def _abandoned(cutoff: datetime):
+    return select(CartItem.id).where(CartItem.updated_at < cutoff)
+
+
+def _inactive_product():
+    # Delisted by the seller; sold-out products are inactive too but keep their lines for a restock
+    return (
+        select(CartItem.id)
+        .join(Product, Product.id == CartItem.product_id)
+        .where(Product.delisted_at.is_not(None))
+    )
+
+
+async def archive_batch(session: AsyncSession, doomed, reason: str, batch_size: int) -> int:
+    """
+    Move up to `batch_size` lines selected by `doomed` into cart_item_archive
+    with one statement, returns the number of lines moved.
+    """
+    cart = CartItem.__table__
+    picked = (
+        doomed.order_by(CartItem.id)
+        .limit(batch_size)
+        .with_for_update(of=CartItem, skip_locked=True)
+        .cte("picked")
+    )
+    removed = (
+        delete(cart)
+        .where(cart.c.id == picked.c.id)
+        .returning(cart.c.id, cart.c.owner_id, cart.c.product_id, cart.c.quantity, cart.c.updated_at)
+        .cte("removed")
+    )
+    archive = CartItemArchive.__table__
+    result = await session.execute(
+        insert(archive)
+        .from_select(
+            ["id", "owner_id", "product_id", "quantity", "updated_at", "reason"],
+            select(
+                removed.c.id,
+                removed.c.owner_id,
+                removed.c.product_id,
+                removed.c.quantity,
+                removed.c.updated_at,
+                literal(reason),
+            ),
+        )
+        .returning(archive.c.owner_id, archive.c.product_id)
+    )
+    rows = result.all()
+    if not rows:
+        await session.commit()
+        return 0
+
+    # Drop stale copies: cached pages and (if enabled) the Redis live cart
+    owners: dict[int, list[int]] = {}
+    for row in rows:
+        owners.setdefault(row.owner_id, []).append(row.product_id)
+    outbox.invalidate(session, *[CARTS_CACHE_KEY.format(user_id=owner_id) for owner_id in owners])
+    if live_cart_enabled():
+        for owner_id, product_ids in owners.items():
+            outbox.add_event(session, CART_DISCARD_TOPIC, {"user_id": owner_id, "product_ids": product_ids})
+
+    await session.commit()
+    return len(rows)
+
+
+async def _record_metrics(redis: Redis, moved: dict[str, int], seconds: float) -> None:
+    total = sum(moved.values())
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(CART_CLEANUP_METRICS_KEY, mapping={
+        "last_run_at": datetime.now(timezone.utc).isoformat(),
+        "last_run_rows": total,
+        "last_run_seconds": round(seconds, 3),
+        "last_run_rows_per_second": round(total / seconds, 1) if seconds else 0,
+    })
+    for reason, count in moved.items():
+        pipe.hincrby(CART_CLEANUP_METRICS_KEY, f"total_{reason}", count)
+    await pipe.execute()
+
+
+async def cleanup_carts() -> None:
+    """
+    Background job: archive lines untouched for CART_RETENTION_DAYS and lines
+    of products the seller delisted. Batches are separate transactions with a pause in
+    between (CART_CLEANUP_PAUSE) so the job never competes for I/O for long.
+    """
+    cutoff = datetime.now(timezone.utc) - timedelta(days=settings.cart_retention_days)
+    batch_size = settings.cart_cleanup_batch_size
+    passes = {"abandoned": _abandoned(cutoff), "inactive_product": _inactive_product()}
+    moved = {reason: 0 for reason in passes}
+
+    started = time.monotonic()
+    async with new_async_session() as session:
+        for reason, doomed in passes.items():
+            while True:
+                count = await archive_batch(session, doomed, reason, batch_size)
+                moved[reason] += count
+                if count < batch_size:
+                    break
+                await asyncio.sleep(settings.cart_cleanup_pause)
+
+    seconds = time.monotonic() - started
+    await _record_metrics(RedisClient.get(), moved, seconds)
+    if any(moved.values()):
+        print(f"Cart cleanup archived {moved} in {seconds:.1f}s")
+        outbox.wake()
@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Date, Float, Integer, String, column, func, table, text
+from sqlalchemy.future import select
+
+from app.core.engine import new_async_session
+from app.core.redis import RedisClient
+
+# Platform aggregates for the admin dashboard live in materialized views
+# (created by migration d3f7b1e9a6c2) and are refreshed CONCURRENTLY by a
+# background job, so admin requests only read a few small tables and the
+# aggregation never runs on the request path.
+ADMIN_ANALYTICS_CACHE_KEY = "admin_analytics"  # hash: one field per view/range
+ADMIN_ANALYTICS_REFRESHED_KEY = "admin_analytics:refreshed_at"
+
+# Only one API process refreshes at a time; the others skip the tick
+REFRESH_LOCK_ID = 0x61646D76
+
+daily_gmv = table(
+    "mv_platform_daily_gmv",
+    column("day", Date),
+    column("orders", Integer),
+    column("cancelled_orders", Integer),
+    column("gmv", Float),
+    column("buyers", Integer),
+)
+orders_by_status = table(
+    "mv_orders_by_status",
+    column("status", String),
+    column("orders", Integer),
+    column("total", Float),
+)
+daily_signups = table(
+    "mv_daily_signups",
+    column("day", Date),
+    column("users", Integer),
+    column("sellers", Integer),
+)
+daily_category_sales = table(
+    "mv_daily_category_sales",
+    column("day", Date),
+    column("category", String),
+    column("orders", Integer),
+    column("units", Integer),
+    column("revenue", Float),
+)
+seller_funnel = table(
+    "mv_seller_funnel",
+    column("stage", String),
+    column("position", Integer),
+    column("sellers", Integer),
+)
+
+VIEWS = (daily_gmv, orders_by_status, daily_signups, daily_category_sales, seller_funnel)
+
+
+async def refresh_admin_views() -> None:
+    """Background job: refresh every view without blocking readers"""
+    async with new_async_session() as session:
+        # Transaction-level lock: released by the commit, even if a refresh fails
+        locked = await session.scalar(select(func.pg_try_advisory_xact_lock(REFRESH_LOCK_ID)))
+        if not locked:
+            await session.rollback()
+            return
+
+        for view in VIEWS:
+            await session.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {view.name}"))
+        await session.commit()
+
+    redis = RedisClient.get()
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(ADMIN_ANALYTICS_CACHE_KEY)
+    pipe.set(ADMIN_ANALYTICS_REFRESHED_KEY, datetime.now(timezone.utc).isoformat())
+    await pipe.execute()
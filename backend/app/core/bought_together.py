@@ -0,0 +1,98 @@
+from itertools import combinations
+
+from redis.asyncio import Redis
+
+from app.core import outbox
+
+# "Frequently bought together": one sorted set per product (member: other
+# product id, score: lift), so serving is a single ZREVRANGE. The sets are
+# rebuilt from the order extracts by app/analytics/bought_together.py; in
+# between, new orders raise the lift of pairs already in a product's set
+# (ZADD XX INCR). New pairs wait for the next rebuild: a single order is no
+# evidence, and the rebuild's minimum support would drop them anyway.
+BOUGHT_TOGETHER_KEY = "bought_together:{product_id}"
+BOUGHT_TOGETHER_ORDERS_KEY = "bought_together:orders"  # hash: product id → orders, "total" → all orders
+BOUGHT_TOGETHER_SEEN_KEY = "bought_together_seen:{order_id}"  # written with the counts, makes retries no-ops
+SEEN_TTL = 60 * 60 * 24 * 2
+TOP_K = 20  # neighbours kept per product
+MAX_BASKET = 50  # bulk orders pair everything with everything and would drown real signal
+STORE_CHUNK = 1000
+
+
+async def store(redis: Redis, result: dict) -> int:
+    """Replace all neighbour sets with a rebuild result, returns the number of products written"""
+    neighbours: dict = result["neighbours"]
+    old_keys = {
+        key async for key in redis.scan_iter(match=BOUGHT_TOGETHER_KEY.format(product_id="*"), count=1000)
+    }
+    old_keys.discard(BOUGHT_TOGETHER_ORDERS_KEY)
+    new_keys = {BOUGHT_TOGETHER_KEY.format(product_id=product_id): ranked for product_id, ranked in neighbours.items()}
+
+    stale = list(old_keys - new_keys.keys())
+    for start in range(0, len(stale), STORE_CHUNK):
+        await redis.delete(*stale[start:start + STORE_CHUNK])
+    # Each set is replaced inside one MULTI, readers never see it empty
+    items = list(new_keys.items())
+    for start in range(0, len(items), STORE_CHUNK):
+        pipe = redis.pipeline(transaction=True)
+        for key, ranked in items[start:start + STORE_CHUNK]:
+            pipe.delete(key)
+            pipe.zadd(key, {other: lift for other, lift, _ in ranked})
+        await pipe.execute()
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.delete(BOUGHT_TOGETHER_ORDERS_KEY)
+    if result["orders"]:
+        pipe.hset(BOUGHT_TOGETHER_ORDERS_KEY, mapping={**result["product_orders"], "total": result["orders"]})
+    await pipe.execute()
+    return len(new_keys)
+
+
+@outbox.handler(outbox.ORDER_PLACED_TOPIC)
+async def record_baskets(redis: Redis, payloads: list[dict]) -> None:
+    """
+    Outbox handler: strengthen existing pairs bought together in new orders.
+    A pair's lift is together × total / (orders of a × orders of b), so one
+    more order adds total / (orders of a × orders of b). Approximate by
+    design (the counts are read once per batch); the next rebuild is exact
+    again. Orders a failed batch already applied are skipped.
+    """
+    if not payloads:
+        return
+    seen = await redis.mget([BOUGHT_TOGETHER_SEEN_KEY.format(order_id=p["order_id"]) for p in payloads])
+    payloads = [p for p, was_seen in zip(payloads, seen) if not was_seen]
+
+    baskets = [sorted({item["product_id"] for item in payload["items"]}) for payload in payloads]
+    baskets = [basket for basket in baskets if len(basket) <= MAX_BASKET]
+    products = sorted({product_id for basket in baskets for product_id in basket})
+    if not products:
+        return
+
+    counts = await redis.hmget(BOUGHT_TOGETHER_ORDERS_KEY, ["total", *products])
+    if counts[0] is None:
+        return  # not built yet
+    total = int(counts[0]) + len(payloads)
+    orders = {product_id: int(count or 0) for product_id, count in zip(products, counts[1:])}
+    for basket in baskets:
+        for product_id in basket:
+            orders[product_id] += 1
+
+    # MULTI/EXEC: the markers are written only with the counts they guard
+    pipe = redis.pipeline(transaction=True)
+    pipe.hincrby(BOUGHT_TOGETHER_ORDERS_KEY, "total", len(payloads))
+    for basket in baskets:
+        for product_id in basket:
+            pipe.hincrby(BOUGHT_TOGETHER_ORDERS_KEY, product_id, 1)
+        for a, b in combinations(basket, 2):
+            step = total / (orders[a] * orders[b])
+            pipe.zadd(BOUGHT_TOGETHER_KEY.format(product_id=a), {b: step}, xx=True, incr=True)
+            pipe.zadd(BOUGHT_TOGETHER_KEY.format(product_id=b), {a: step}, xx=True, incr=True)
+    for payload in payloads:
+        pipe.set(BOUGHT_TOGETHER_SEEN_KEY.format(order_id=payload["order_id"]), 1, ex=SEEN_TTL)
+    await pipe.execute()
+
+
+async def neighbours(redis: Redis, product_id: int, limit: int) -> list[int]:
+    """Product ids bought together with `product_id`, best lift first"""
+    ranked = await redis.zrevrange(BOUGHT_TOGETHER_KEY.format(product_id=product_id), 0, limit - 1)
+    return [int(member) for member in ranked]
@@ -18,3 +18,17 @@ class CacheManager:
     async def get(self, key: str) -> Optional[str]:
         """Get a cached value"""
         return await self.redis.get(key)
+
+    async def set_field(self, key: str, field: str, value: str, ttl: Optional[int] = None) -> None:
+        """
+        Set one field of a cache hash. Variants of the same resource (pages,
+        summaries) share one key so a single invalidate() drops all of them.
+        """
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hset(key, field, value)
+        pipe.expire(key, ttl or CACHE_TTL)
+        await pipe.execute()
+
+    async def get_field(self, key: str, field: str) -> Optional[str]:
+        """Get one field of a cache hash"""
+        return await self.redis.hget(key, field)
@@ -0,0 +1,222 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import outbox
+from app.core.config import settings
+from app.core.engine import new_async_session
+from app.core.redis import RedisClient
+from app.models.cart import CartItem
+
+# Live cart: one hash per user (product_id -> quantity). The hash is the
+# source of truth while it exists; `cart_item` is a write-behind copy.
+LIVE_CART_KEY = "cart:live:{user_id}"
+DIRTY_CARTS_KEY = "cart:dirty"
+HYDRATED_FIELD = "__hydrated__"
+CART_DISCARD_TOPIC = "cart.discard"   # outbox payload: {"user_id", "product_ids"}
+LIVE_CART_TTL = 60 * 60 * 24 * 7
+
+# Applies one mutation and marks the cart dirty in a single round trip.
+# Returns nil when the hash has not been loaded from the database yet, and
+# OVER_LIMIT when an increment would take the line past ARGV[7] (if given).
+OVER_LIMIT = -1
+MUTATE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[5]) == 0 then
+    return nil
+end
+local result
+if ARGV[1] == 'incr' then
+    if ARGV[7] ~= '' then
+        local current = tonumber(redis.call('HGET', KEYS[1], ARGV[2]) or '0')
+        if current + tonumber(ARGV[3]) > tonumber(ARGV[7]) then
+            return -1
+        end
+    end
+    result = redis.call('HINCRBY', KEYS[1], ARGV[2], ARGV[3])
+elseif ARGV[1] == 'set' then
+    redis.call('HSET', KEYS[1], ARGV[2], ARGV[3])
+    result = tonumber(ARGV[3])
+else
+    result = redis.call('HDEL', KEYS[1], ARGV[2])
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('SADD', KEYS[2], ARGV[6])
+return result
+"""
+
+# Loads database rows only if nobody hydrated the hash in the meantime
+HYDRATE_SCRIPT = """
+if redis.call('HEXISTS', KEYS[1], ARGV[2]) == 0 then
+    redis.call('HSET', KEYS[1], unpack(ARGV, 2))
+    redis.call('EXPIRE', KEYS[1], ARGV[1])
+end
+return 1
+"""
+
+
+def live_cart_enabled() -> bool:
+    return settings.cart_store == "redis"
+
+
+class LiveCartStore:
+    """Redis-hosted cart with write-behind persistence to cart_item"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._mutate = redis.register_script(MUTATE_SCRIPT)
+        self._hydrate = redis.register_script(HYDRATE_SCRIPT)
+
+    async def _hydrate_from_db(self, session: AsyncSession, user_id: int) -> None:
+        result = await session.execute(
+            select(CartItem.product_id, CartItem.quantity)
+            .where(CartItem.owner_id == user_id)
+        )
+        args = [LIVE_CART_TTL, HYDRATED_FIELD, 1]
+        for row in result.all():
+            args += [row.product_id, row.quantity]
+        await self._hydrate(keys=[LIVE_CART_KEY.format(user_id=user_id)], args=args)
+
+    async def _apply(
+        self,
+        session: AsyncSession,
+        user_id: int,
+        op: str,
+        product_id: int,
+        quantity: int = 0,
+        limit: Optional[int] = None,
+    ) -> int:
+        keys = [LIVE_CART_KEY.format(user_id=user_id), DIRTY_CARTS_KEY]
+        args = [op, product_id, quantity, LIVE_CART_TTL, HYDRATED_FIELD, user_id, "" if limit is None else limit]
+
+        result = await self._mutate(keys=keys, args=args)
+        if result is None:
+            await self._hydrate_from_db(session, user_id)
+            result = await self._mutate(keys=keys, args=args)
+        return int(result)
+
+    async def add(
+        self, session: AsyncSession, user_id: int, product_id: int, quantity: int, limit: Optional[int] = None
+    ) -> Optional[int]:
+        """
+        Atomically increment a line, returns the new quantity, or None (and
+        leaves the line alone) when it would exceed `limit`
+        """
+        result = await self._apply(session, user_id, "incr", product_id, quantity, limit)
+        return None if result == OVER_LIMIT else result
+
+    async def set(self, session: AsyncSession, user_id: int, product_id: int, quantity: int) -> int:
+        return await self._apply(session, user_id, "set", product_id, quantity)
+
+    async def remove(self, session: AsyncSession, user_id: int, product_id: int) -> bool:
+        return await self._apply(session, user_id, "del", product_id) > 0
+
+    async def discard(self, user_id: int, product_ids: list[int]) -> None:
+        """Drop lines already removed from cart_item (e.g. after checkout)"""
+        if product_ids:
+            await self.redis.hdel(LIVE_CART_KEY.format(user_id=user_id), *product_ids)
+
+    async def items(self, session: AsyncSession, user_id: int) -> dict[int, int]:
+        """Return {product_id: quantity} for the user's live cart"""
+        key = LIVE_CART_KEY.format(user_id=user_id)
+        cart = await self.redis.hgetall(key)
+        if HYDRATED_FIELD not in cart:
+            await self._hydrate_from_db(session, user_id)
+            cart = await self.redis.hgetall(key)
+        return _lines(cart)
+
+    async def _persist(self, session: AsyncSession, user_ids: list[int]) -> None:
+        """Mirror the live carts of `user_ids` into cart_item in one transaction"""
+        pipe = self.redis.pipeline(transaction=False)
+        for user_id in user_ids:
+            pipe.hgetall(LIVE_CART_KEY.format(user_id=user_id))
+        carts = await pipe.execute()
+
+        owners: list[int] = []
+        rows: list[dict] = []
+        for user_id, cart in zip(user_ids, carts):
+            # An expired hash holds nothing newer than the database
+            if HYDRATED_FIELD not in cart:
+                continue
+            owners.append(user_id)
+            rows += [
+                {"owner_id": user_id, "product_id": product_id, "quantity": quantity}
+                for product_id, quantity in _lines(cart).items()
+            ]
+
+        if not owners:
+            return
+
+        # Drop lines that are no longer in the live cart
+        stmt = delete(CartItem).where(CartItem.owner_id.in_(owners))
+        if rows:
+            stmt = stmt.where(
+                tuple_(CartItem.owner_id, CartItem.product_id).not_in(
+                    [(r["owner_id"], r["product_id"]) for r in rows]
+                )
+            )
+        await session.execute(stmt.execution_options(synchronize_session=False))
+
+        # Upsert the remaining lines
+        if rows:
+            upsert = pg_insert(CartItem).values(rows)
+            upsert = upsert.on_conflict_do_update(
+                constraint="unique_cart_item_per_user",
+                set_={"quantity": upsert.excluded.quantity, "updated_at": func.now()},
+            )
+            await session.execute(upsert)
+
+        await session.commit()
+
+    async def flush_dirty(self, session: AsyncSession, batch_size: int) -> int:
+        """Persist up to `batch_size` dirty carts, returns how many were taken"""
+        user_ids = await self.redis.spop(DIRTY_CARTS_KEY, batch_size)
+        if not user_ids:
+            return 0
+
+        try:
+            await self._persist(session, [int(u) for u in user_ids])
+        except Exception:
+            await session.rollback()
+            await self.redis.sadd(DIRTY_CARTS_KEY, *user_ids)
+            raise
+        return len(user_ids)
+
+    async def flush_user(self, session: AsyncSession, user_id: int) -> None:
+        """Synchronously persist one user's cart (used right before checkout)"""
+        if not await self.redis.srem(DIRTY_CARTS_KEY, user_id):
+            return
+
+        try:
+            await self._persist(session, [user_id])
+        except Exception:
+            await session.rollback()
+            await self.redis.sadd(DIRTY_CARTS_KEY, user_id)
+            raise
+
+
+def _lines(cart: dict[str, str]) -> dict[int, int]:
+    return {
+        int(field): int(quantity)
+        for field, quantity in cart.items()
+        if not field.startswith("__") and int(quantity) > 0
+    }
+
+
+@outbox.handler(CART_DISCARD_TOPIC)
+async def _discard_lines(redis: Redis, payloads: list[dict]) -> None:
+    store = LiveCartStore(redis)
+    for payload in payloads:
+        await store.discard(payload["user_id"], payload["product_ids"])
+
+
+async def flush_live_carts() -> None:
+    """Background job: drain the dirty set in batches"""
+    store = LiveCartStore(RedisClient.get())
+    batch_size = settings.cart_flush_batch_size
+    async with new_async_session() as session:
+        while await store.flush_dirty(session, batch_size) == batch_size:
+            pass
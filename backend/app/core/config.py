@@ -27,6 +27,56 @@ class Settings(BaseSettings):
         f"redis://{os.getenv('REDIS_HOST', 'localhost')}:{os.getenv('REDIS_PORT', 6379)}/{os.getenv('REDIS_DB', 0)}"
     )
 
+    # Cart storage: "database" (cart_item rows) or "redis" (live hash per user,
+    # persisted to cart_item in the background and on checkout)
+    cart_store: str = os.getenv("CART_STORE", "database")
+    cart_flush_interval: float = float(os.getenv("CART_FLUSH_INTERVAL", 5))
+    cart_flush_batch_size: int = int(os.getenv("CART_FLUSH_BATCH_SIZE", 200))
+
+    # How often units sold in flash-sale mode are written back to Product.stock
+    flash_sale_reconcile_interval: float = float(os.getenv("FLASH_SALE_RECONCILE_INTERVAL", 2))
+
+    # Transactional outbox relay (app/core/outbox.py)
+    outbox_relay_interval: float = float(os.getenv("OUTBOX_RELAY_INTERVAL", 1))
+    outbox_batch_size: int = int(os.getenv("OUTBOX_BATCH_SIZE", 500))
+
+    # How long the LISTEN/NOTIFY cache listener gathers notifications into one batch
+    cache_listener_batch_window: float = float(os.getenv("CACHE_LISTENER_BATCH_WINDOW", 0.05))
+
+    # Pending orders older than this are cancelled and their stock released
+    order_expiry_minutes: int = int(os.getenv("ORDER_EXPIRY_MINUTES", 60))
+    order_expiry_interval: float = float(os.getenv("ORDER_EXPIRY_INTERVAL", 60))
+    order_expiry_batch_size: int = int(os.getenv("ORDER_EXPIRY_BATCH_SIZE", 500))
+
+    # Cart lines untouched this long, or pointing at inactive products, are archived
+    cart_retention_days: int = int(os.getenv("CART_RETENTION_DAYS", 90))
+    cart_cleanup_interval: float = float(os.getenv("CART_CLEANUP_INTERVAL", 60 * 60))
+    cart_cleanup_batch_size: int = int(os.getenv("CART_CLEANUP_BATCH_SIZE", 1000))
+    cart_cleanup_pause: float = float(os.getenv("CART_CLEANUP_PAUSE", 0.2))
+
+    # How often the admin analytics materialized views are refreshed
+    admin_analytics_refresh_interval: float = float(os.getenv("ADMIN_ANALYTICS_REFRESH_INTERVAL", 5 * 60))
+
+    # Product views are buffered per process and written this often
+    product_view_flush_interval: float = float(os.getenv("PRODUCT_VIEW_FLUSH_INTERVAL", 5))
+
+    # Daily unique buyer/visitor counters (HyperLogLog, app/core/unique_counts.py)
+    unique_counts_retention_days: int = int(os.getenv("UNIQUE_COUNTS_RETENTION_DAYS", 90))
+
+    # Daily order value t-digests (app/core/order_values.py)
+    order_value_retention_days: int = int(os.getenv("ORDER_VALUE_RETENTION_DAYS", 400))
+
+    # Columnar order extracts for the analytics reports (app/analytics, needs numpy)
+    analytics_data_dir: str = os.getenv("ANALYTICS_DATA_DIR", "data/analytics")
+    analytics_extract_interval: float = float(os.getenv("ANALYTICS_EXTRACT_INTERVAL", 60 * 60))
+    analytics_workers: int = int(os.getenv("ANALYTICS_WORKERS", 2))
+    bought_together_interval: float = float(os.getenv("BOUGHT_TOGETHER_INTERVAL", 6 * 60 * 60))
+
+    # Async checkout (POST /checkout/async + worker.py)
+    order_stream_max_backlog: int = int(os.getenv("ORDER_STREAM_MAX_BACKLOG", 5000))
+    order_worker_processes: int = int(os.getenv("ORDER_WORKER_PROCESSES", 2))
+    order_worker_batch_size: int = int(os.getenv("ORDER_WORKER_BATCH_SIZE", 50))
+
     cors_allowed_origins: list[str] = ["http://localhost:3000"]
 
 
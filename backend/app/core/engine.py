@@ -57,11 +57,14 @@ def get_async_engine() -> AsyncEngine:
     return SupabaseAsyncEngine.get_engine()
 
 
+def new_async_session() -> AsyncSession:
+    """Session for code running outside a request (background jobs, workers)."""
+    return AsyncSession(get_async_engine(), expire_on_commit=False)
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     """Dependency for getting async database sessions."""
-    async with AsyncSession(
-        get_async_engine(), expire_on_commit=False
-    ) as async_session:
+    async with new_async_session() as async_session:
         yield async_session
 
 
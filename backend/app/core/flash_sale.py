@@ -0,0 +1,240 @@
+from typing import Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import ARRAY, Integer, any_, case, column, func, literal, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.engine import new_async_session
+from app.core.redis import RedisClient
+from app.models.product import Product
+
+# While a product is in flash-sale mode its sellable stock lives in Redis and
+# checkout never locks the product row. Units sold accumulate in FLASH_SOLD_KEY
+# and are applied to Product.stock by the reconciliation job.
+FLASH_PRODUCTS_KEY = "flash:products"
+FLASH_CONFIG_KEY = "flash:{id}:config"   # hash: rate (tokens/s), burst
+FLASH_STOCK_KEY = "flash:{id}:stock"
+FLASH_BUCKET_KEY = "flash:{id}:bucket"   # hash: tokens, ts (ms)
+FLASH_SOLD_KEY = "flash:sold"            # hash: product_id -> units not yet in Postgres
+
+# KEYS: [config, bucket, stock] per product, then FLASH_SOLD_KEY
+# ARGV: product ids..., then quantities...
+# Returns {0} on success or {code, index}: 1 = sale ended, 2 = throttled, 3 = sold out.
+# Nothing is written unless every product is admitted and in stock.
+RESERVE_SCRIPT = """
+local n = #ARGV / 2
+local clock = redis.call('TIME')
+local now = clock[1] * 1000 + math.floor(clock[2] / 1000)
+local tokens = {}
+
+for i = 1, n do
+    local config = redis.call('HMGET', KEYS[i * 3 - 2], 'rate', 'burst')
+    local rate, burst = tonumber(config[1]), tonumber(config[2])
+    if not rate then
+        return {1, i}
+    end
+    local state = redis.call('HMGET', KEYS[i * 3 - 1], 'tokens', 'ts')
+    local available = tonumber(state[1]) or burst
+    local ts = tonumber(state[2]) or now
+    available = math.min(burst, available + (now - ts) * rate / 1000)
+    if available < 1 then
+        return {2, i}
+    end
+    tokens[i] = available
+end
+
+for i = 1, n do
+    local stock = tonumber(redis.call('GET', KEYS[i * 3]) or '0')
+    if stock < tonumber(ARGV[n + i]) then
+        return {3, i}
+    end
+end
+
+local sold = KEYS[n * 3 + 1]
+for i = 1, n do
+    redis.call('DECRBY', KEYS[i * 3], ARGV[n + i])
+    redis.call('HSET', KEYS[i * 3 - 1], 'tokens', tokens[i] - 1, 'ts', now)
+    redis.call('PEXPIRE', KEYS[i * 3 - 1], 60000)
+    redis.call('HINCRBY', sold, ARGV[i], ARGV[n + i])
+end
+return {0}
+"""
+
+# KEYS: [config, stock] per product, then FLASH_SOLD_KEY; ARGV as above.
+# Returns the product ids whose sale already ended (caller restores those in Postgres).
+RELEASE_SCRIPT = """
+local n = #ARGV / 2
+local ended = {}
+for i = 1, n do
+    if redis.call('EXISTS', KEYS[i * 2 - 1]) == 1 then
+        redis.call('INCRBY', KEYS[i * 2], ARGV[n + i])
+        redis.call('HINCRBY', KEYS[n * 2 + 1], ARGV[i], -tonumber(ARGV[n + i]))
+    else
+        table.insert(ended, ARGV[i])
+    end
+end
+return ended
+"""
+
+RESERVE_RESULTS = {1: "ended", 2: "throttled", 3: "sold_out"}
+
+
+class FlashSale:
+    """Redis-held inventory and admission control for hot products"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+        self._reserve = redis.register_script(RESERVE_SCRIPT)
+        self._release = redis.register_script(RELEASE_SCRIPT)
+
+    async def active(self, product_ids: list[int]) -> set[int]:
+        """Which of `product_ids` are currently in flash-sale mode"""
+        if not product_ids:
+            return set()
+        flags = await self.redis.smismember(FLASH_PRODUCTS_KEY, product_ids)
+        return {pid for pid, flag in zip(product_ids, flags) if flag}
+
+    async def reserve(self, quantities: dict[int, int]) -> tuple[str, Optional[int]]:
+        """
+        Atomically admit and decrement all products or none.
+        Returns ("ok", None) or (reason, product_id) with reason in
+        "ended", "throttled", "sold_out".
+        """
+        ids = sorted(quantities)
+        keys = []
+        for pid in ids:
+            keys += [FLASH_CONFIG_KEY.format(id=pid), FLASH_BUCKET_KEY.format(id=pid), FLASH_STOCK_KEY.format(id=pid)]
+        keys.append(FLASH_SOLD_KEY)
+
+        result = await self._reserve(keys=keys, args=ids + [quantities[pid] for pid in ids])
+        if int(result[0]) == 0:
+            return "ok", None
+        return RESERVE_RESULTS[int(result[0])], ids[int(result[1]) - 1]
+
+    async def release(self, quantities: dict[int, int]) -> dict[int, int]:
+        """
+        Give reserved units back (failed checkout, cancelled order).
+        Returns the quantities of products whose sale has ended in the
+        meantime; those must be restored in Postgres by the caller.
+        """
+        if not quantities:
+            return {}
+        ids = sorted(quantities)
+        keys = []
+        for pid in ids:
+            keys += [FLASH_CONFIG_KEY.format(id=pid), FLASH_STOCK_KEY.format(id=pid)]
+        keys.append(FLASH_SOLD_KEY)
+
+        ended = await self._release(keys=keys, args=ids + [quantities[pid] for pid in ids])
+        return {int(pid): quantities[int(pid)] for pid in ended}
+
+    async def start(self, session: AsyncSession, product_id: int, rate: float, burst: int) -> int:
+        """
+        Load the product's current stock into Redis and open the sale. A
+        running sale is not restarted: its Redis stock already accounts for
+        units Product.stock will only lose at the next reconciliation.
+        """
+        if await self.redis.sismember(FLASH_PRODUCTS_KEY, product_id):
+            raise ValueError("Flash sale already running")
+        # Units left over from an earlier sale (e.g. a failed stop) go to Postgres first
+        await self.reconcile(session)
+
+        product = await session.get(Product, product_id, with_for_update=True)
+        if not product:
+            raise LookupError("Product not found")
+
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.set(FLASH_STOCK_KEY.format(id=product_id), product.stock)
+        pipe.hset(FLASH_CONFIG_KEY.format(id=product_id), mapping={"rate": rate, "burst": burst})
+        pipe.delete(FLASH_BUCKET_KEY.format(id=product_id))
+        pipe.sadd(FLASH_PRODUCTS_KEY, product_id)
+        await pipe.execute()
+
+        # Release the row lock; from now on Postgres only receives reconciled deltas
+        await session.commit()
+        return product.stock
+
+    async def stop(self, session: AsyncSession, product_id: int) -> None:
+        """Close the sale and hand the stock back to Postgres"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.srem(FLASH_PRODUCTS_KEY, product_id)
+        pipe.delete(FLASH_CONFIG_KEY.format(id=product_id))
+        await pipe.execute()
+
+        await self.reconcile(session)
+        await self.redis.delete(FLASH_STOCK_KEY.format(id=product_id), FLASH_BUCKET_KEY.format(id=product_id))
+
+    async def status(self) -> list[dict]:
+        product_ids = sorted(int(pid) for pid in await self.redis.smembers(FLASH_PRODUCTS_KEY))
+        if not product_ids:
+            return []
+
+        pipe = self.redis.pipeline(transaction=False)
+        for pid in product_ids:
+            pipe.get(FLASH_STOCK_KEY.format(id=pid))
+            pipe.hgetall(FLASH_CONFIG_KEY.format(id=pid))
+        results = await pipe.execute()
+
+        return [
+            {
+                "product_id": pid,
+                "stock": int(results[i * 2] or 0),
+                "rate": float(results[i * 2 + 1].get("rate", 0)),
+                "burst": int(results[i * 2 + 1].get("burst", 0)),
+            }
+            for i, pid in enumerate(product_ids)
+        ]
+
+    async def reconcile(self, session: AsyncSession) -> int:
+        """Apply units sold in Redis to Product.stock, returns rows updated"""
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hgetall(FLASH_SOLD_KEY)
+        pipe.delete(FLASH_SOLD_KEY)
+        sold, _ = await pipe.execute()
+
+        deltas = sorted((int(pid), int(qty)) for pid, qty in sold.items() if int(qty) != 0)
+        if not deltas:
+            return 0
+
+        try:
+            product = Product.__table__
+            delta = values(column("id", Integer), column("qty", Integer), name="delta").data(deltas)
+            # Rows locked in id order like checkout; the old stock is kept to report shortfalls
+            locked = (
+                select(product.c.id, product.c.stock)
+                .where(product.c.id == any_(literal([pid for pid, _ in deltas], ARRAY(Integer))))
+                .order_by(product.c.id)
+                .with_for_update()
+                .cte("locked")
+            )
+            remaining = func.greatest(product.c.stock - delta.c.qty, 0)
+            result = await session.execute(
+                update(product)
+                .where(product.c.id == delta.c.id, product.c.id == locked.c.id)
+                .values(
+                    stock=remaining,
+                    is_active=case((remaining <= 0, False), else_=product.c.is_active),
+                )
+                .returning(product.c.id, locked.c.stock, delta.c.qty)
+            )
+            for row in result.all():
+                if row.qty > row.stock:
+                    print(f"Flash sale oversold product {row.id}: {row.qty} units sold, {row.stock} in stock")
+            await session.commit()
+        except Exception:
+            # Put the deltas back so the next run retries them
+            await session.rollback()
+            pipe = self.redis.pipeline(transaction=True)
+            for pid, qty in deltas:
+                pipe.hincrby(FLASH_SOLD_KEY, pid, qty)
+            await pipe.execute()
+            raise
+
+        return len(deltas)
+
+
+async def reconcile_flash_sales() -> None:
+    """Background job: push Redis-side sales into Postgres"""
+    async with new_async_session() as session:
+        await FlashSale(RedisClient.get()).reconcile(session)
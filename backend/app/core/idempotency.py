@@ -0,0 +1,166 @@
+import base64
+import hashlib
+import json
+from uuid import uuid4
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core.redis import RedisClient
+
+# Mutating requests carrying an Idempotency-Key header run once; retries get
+# the stored response back after a single Redis lookup.
+IDEMPOTENCY_HEADER = "idempotency-key"
+IDEMPOTENCY_KEY = "idempotency:{digest}"          # stored response (JSON)
+IDEMPOTENCY_LOCK_KEY = "idempotency:{digest}:lock"
+IDEMPOTENCY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TTL = 30  # longest a first request may run before a retry executes again
+
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+IDEMPOTENT_PATHS = ("/checkout", "/cart", "/seller/products")
+
+# Response headers worth replaying
+REPLAYED_HEADERS = {b"content-type", b"retry-after", b"location"}
+# Auth failures and transient refusals (timeout, conflict, rate limit) are not
+# stored: a retry after logging in or backing off should run again
+UNSTORED_STATUSES = {401, 403, 408, 409, 429}
+
+# KEYS: [lock]; ARGV: [value the request set]. Deletes the lock only if it is
+# still ours: a request that outlived IDEMPOTENCY_LOCK_TTL must not drop a retry's lock.
+RELEASE_LOCK_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+def _digest(scope: Scope, key: bytes) -> str:
+    """Keys are scoped to the caller's session, method and path"""
+    headers = dict(scope["headers"])
+    auth = b""
+    for part in headers.get(b"cookie", b"").split(b";"):
+        name, _, value = part.strip().partition(b"=")
+        if name == b"auth":
+            auth = value
+    raw = b"\0".join([auth, scope["method"].encode(), scope["path"].encode(), key])
+    return hashlib.sha256(raw).hexdigest()
+
+
+async def _read_body(receive: Receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        if message["type"] != "http.request":
+            break
+        body += message.get("body", b"")
+        if not message.get("more_body", False):
+            break
+    return body
+
+
+async def _send_json(send: Send, status: int, body: dict) -> None:
+    payload = json.dumps(body).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(payload)).encode())],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+class IdempotencyMiddleware:
+    """Replays the first response for repeated Idempotency-Key requests"""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in IDEMPOTENT_METHODS
+            or not scope["path"].startswith(IDEMPOTENT_PATHS)
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        key = dict(scope["headers"]).get(IDEMPOTENCY_HEADER.encode())
+        if not key:
+            await self.app(scope, receive, send)
+            return
+
+        redis = RedisClient.get()
+        digest = _digest(scope, key)
+        response_key = IDEMPOTENCY_KEY.format(digest=digest)
+        lock_key = IDEMPOTENCY_LOCK_KEY.format(digest=digest)
+
+        # The body is read up front to fingerprint it, then handed to the app unchanged
+        body = await _read_body(receive)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        body_sent = False
+
+        async def replay_body() -> Message:
+            nonlocal body_sent
+            if body_sent:
+                return await receive()
+            body_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        # 1️⃣ Replay a stored response, unless the key is reused for another request
+        stored = await redis.get(response_key)
+        if stored:
+            stored = json.loads(stored)
+            if stored.get("fingerprint", fingerprint) != fingerprint:
+                await _send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request body"})
+                return
+            await self._replay(send, stored)
+            return
+
+        # 2️⃣ Only one request per key runs at a time; the lock holds an owner token and the body fingerprint
+        lock_value = f"{uuid4().hex}:{fingerprint}"
+        if not await redis.set(lock_key, lock_value, nx=True, ex=IDEMPOTENCY_LOCK_TTL):
+            held = await redis.get(lock_key)
+            if held is not None and held.partition(":")[2] != fingerprint:
+                await _send_json(send, 422, {"detail": "Idempotency-Key was already used with a different request body"})
+                return
+            await _send_json(send, 409, {"detail": "A request with this Idempotency-Key is still in progress"})
+            return
+
+        # 3️⃣ Run the request, keeping a copy of the response
+        response = {"status": 500, "headers": [], "body": b""}
+
+        async def capture(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response["status"] = message["status"]
+                response["headers"] = [
+                    [name.decode(), value.decode()]
+                    for name, value in message.get("headers", [])
+                    if name.lower() in REPLAYED_HEADERS
+                ]
+            elif message["type"] == "http.response.body":
+                response["body"] += message.get("body", b"")
+            await send(message)
+
+        try:
+            await self.app(scope, replay_body, capture)
+        finally:
+            # Server errors and transient refusals are not stored so the client can retry them
+            if response["status"] < 500 and response["status"] not in UNSTORED_STATUSES:
+                await redis.set(
+                    response_key,
+                    json.dumps({
+                        "fingerprint": fingerprint,
+                        "status": response["status"],
+                        "headers": response["headers"],
+                        "body": base64.b64encode(response["body"]).decode(),
+                    }),
+                    ex=IDEMPOTENCY_TTL,
+                )
+            await redis.register_script(RELEASE_LOCK_SCRIPT)(keys=[lock_key], args=[lock_value])
+
+    @staticmethod
+    async def _replay(send: Send, stored: dict) -> None:
+        body = base64.b64decode(stored["body"])
+        headers = [(name.encode(), value.encode()) for name, value in stored["headers"]]
+        headers += [(b"content-length", str(len(body)).encode()), (b"idempotent-replayed", b"true")]
+        await send({"type": "http.response.start", "status": stored["status"], "headers": headers})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,167 @@
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from redis.asyncio import Redis
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import outbox
+from app.models.product import Product
+from app.models.user_order import Order, OrderItem
+
+# Best sellers by units sold, kept in Redis sorted sets (member: product id).
+# Every committed order adds its units to an hourly and a daily bucket per
+# scope: the whole catalog, the product's category and its seller. A window
+# is the union of its recent buckets; the oldest bucket is weighted by the
+# part of it still inside the window, which gives a rolling window without
+# per-minute buckets.
+TOP_BUCKET_KEY = "top:{scope}:{unit}:{bucket}"
+TOP_WINDOW_KEY = "top:{scope}:window:{window}"  # merged window, rebuilt every WINDOW_TTL
+TOP_SEEN_KEY = "top_seen:{order_id}"  # written with the counts, makes retries no-ops
+WINDOW_TTL = 60
+SEEN_TTL = 60 * 60 * 24 * 2
+
+Window = Literal["hour", "day", "week"]
+BUCKETS = {
+    # unit: (bucket length, key format, kept for)
+    "hour": (timedelta(hours=1), "%Y%m%d%H", timedelta(hours=26)),
+    "day": (timedelta(days=1), "%Y%m%d", timedelta(days=9)),
+}
+WINDOWS: dict[str, tuple[str, int]] = {
+    # window: (bucket unit, full buckets)
+    "hour": ("hour", 1),
+    "day": ("hour", 24),
+    "week": ("day", 7),
+}
+REBUILD_DAYS = 8
+
+
+def scopes(category: Optional[str], seller_id: Optional[int]) -> list[str]:
+    found = ["all"]
+    if category:
+        found.append(f"category:{category}")
+    if seller_id:
+        found.append(f"seller:{seller_id}")
+    return found
+
+
+def _bucket_key(scope: str, unit: str, at: datetime) -> str:
+    return TOP_BUCKET_KEY.format(scope=scope, unit=unit, bucket=at.strftime(BUCKETS[unit][1]))
+
+
+def _bucket_start(unit: str, at: datetime) -> datetime:
+    if unit == "hour":
+        return at.replace(minute=0, second=0, microsecond=0)
+    return at.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def _counts(items: list[dict]) -> dict[str, dict[int, int]]:
+    """Units per scope and product"""
+    counts: dict[str, dict[int, int]] = {}
+    for item in items:
+        for scope in scopes(item.get("category"), item.get("seller_id")):
+            per_scope = counts.setdefault(scope, {})
+            per_scope[item["product_id"]] = per_scope.get(item["product_id"], 0) + item["quantity"]
+    return counts
+
+
+async def _add(redis: Redis, counts: dict[str, dict[int, int]], at: datetime, order_ids: list[int] = ()) -> None:
+    # MULTI/EXEC so a retried outbox batch never finds half of it applied
+    pipe = redis.pipeline(transaction=True)
+    for scope, per_product in counts.items():
+        for unit, (_, _, keep) in BUCKETS.items():
+            key = _bucket_key(scope, unit, at)
+            for product_id, units in per_product.items():
+                pipe.zincrby(key, units, product_id)
+            pipe.expire(key, int(keep.total_seconds()))
+    for order_id in order_ids:
+        pipe.set(TOP_SEEN_KEY.format(order_id=order_id), 1, ex=SEEN_TTL)
+    await pipe.execute()
+
+
+@outbox.handler(outbox.ORDER_PLACED_TOPIC)
+async def record_orders(redis: Redis, payloads: list[dict]) -> None:
+    """
+    Outbox handler: count the units of newly placed orders in the buckets of
+    the hour they were placed, like rebuild(), skipping orders a failed batch
+    already counted
+    """
+    if not payloads:
+        return
+    seen = await redis.mget([TOP_SEEN_KEY.format(order_id=p["order_id"]) for p in payloads])
+    by_hour: dict[datetime, list[dict]] = {}
+    for payload, was_seen in zip(payloads, seen):
+        if not was_seen:
+            by_hour.setdefault(_bucket_start("hour", outbox.placed_at(payload)), []).append(payload)
+
+    for at, placed in sorted(by_hour.items()):
+        counts = _counts([item for payload in placed for item in payload["items"]])
+        if counts:
+            await _add(redis, counts, at, [p["order_id"] for p in placed])
+
+
+async def _window_key(redis: Redis, scope: str, window: Window) -> str:
+    """Merge the window's buckets into one sorted set, reused for WINDOW_TTL seconds"""
+    key = TOP_WINDOW_KEY.format(scope=scope, window=window)
+    if await redis.exists(key):
+        return key
+
+    unit, full = WINDOWS[window]
+    length = BUCKETS[unit][0]
+    now = datetime.now(timezone.utc)
+    elapsed = (now - _bucket_start(unit, now)) / length
+
+    weights = {_bucket_key(scope, unit, now - length * i): 1.0 for i in range(full)}
+    weights[_bucket_key(scope, unit, now - length * full)] = 1.0 - elapsed
+
+    pipe = redis.pipeline(transaction=True)
+    pipe.zunionstore(key, weights)
+    pipe.expire(key, WINDOW_TTL)
+    await pipe.execute()
+    return key
+
+
+async def top(redis: Redis, scope: str, window: Window, limit: int) -> list[tuple[int, int]]:
+    """(product_id, units) best first: one ZREVRANGE, O(log n + limit)"""
+    key = await _window_key(redis, scope, window)
+    ranked = await redis.zrevrange(key, 0, limit - 1, withscores=True)
+    return [(int(member), round(score)) for member, score in ranked if round(score) > 0]
+
+
+async def rebuild(session: AsyncSession, redis: Redis) -> int:
+    """
+    Recreate all buckets from order_item for the last REBUILD_DAYS days,
+    e.g. after a Redis flush. Returns the number of buckets written.
+    """
+    since = _bucket_start("day", datetime.now(timezone.utc) - timedelta(days=REBUILD_DAYS))
+    hour = func.date_trunc("hour", Order.created_at).label("hour")
+    result = await session.execute(
+        select(
+            hour,
+            OrderItem.product_id,
+            OrderItem.seller_id,
+            Product.category,
+            func.sum(OrderItem.quantity).label("units"),
+        )
+        .join(Order, Order.id == OrderItem.order_id)
+        .join(Product, Product.id == OrderItem.product_id)
+        .where(Order.created_at >= since)
+        .group_by(hour, OrderItem.product_id, OrderItem.seller_id, Product.category)
+    )
+
+    by_hour: dict[datetime, list[dict]] = {}
+    for row in result.all():
+        by_hour.setdefault(row.hour.astimezone(timezone.utc), []).append({
+            "product_id": row.product_id,
+            "seller_id": row.seller_id,
+            "category": row.category.value if row.category else None,
+            "quantity": row.units,
+        })
+
+    old_keys = [key async for key in redis.scan_iter(match="top:*", count=1000)]
+    if old_keys:
+        await redis.delete(*old_keys)
+    for at, items in sorted(by_hour.items()):
+        await _add(redis, _counts(items), at)
+    return len(by_hour)
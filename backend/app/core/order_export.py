@@ -0,0 +1,97 @@
+import csv
+import io
+import json
+from collections.abc import AsyncIterator
+from datetime import datetime
+from enum import Enum
+from typing import Literal, Optional
+
+from sqlalchemy.future import select
+
+from app.core.engine import new_async_session
+from app.models.user_order import Order, OrderItem
+
+# Exports hold one line per order item. Rows come from a server-side cursor
+# in partitions of EXPORT_CHUNK_ROWS and each partition is encoded and sent
+# before the next is fetched, so memory stays flat whatever the export size.
+EXPORT_CHUNK_ROWS = 1000
+ExportFormat = Literal["csv", "ndjson"]
+MEDIA_TYPES = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+EXPORT_COLUMNS = (
+    Order.id.label("order_id"),
+    Order.created_at.label("ordered_at"),
+    Order.status.label("order_status"),
+    Order.owner_name.label("buyer_name"),
+    OrderItem.id.label("item_id"),
+    OrderItem.seller_id,
+    OrderItem.product_id,
+    OrderItem.product_name,
+    OrderItem.quantity,
+    OrderItem.total_price,
+    OrderItem.status.label("item_status"),
+)
+HEADER = [column.key for column in EXPORT_COLUMNS]
+
+
+def _lines_statement(*criteria, since: Optional[datetime], until: Optional[datetime]):
+    stmt = (
+        select(*EXPORT_COLUMNS)
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .where(*criteria)
+        .order_by(OrderItem.order_id, OrderItem.id)
+    )
+    if since is not None:
+        stmt = stmt.where(Order.created_at >= since)
+    if until is not None:
+        stmt = stmt.where(Order.created_at < until)
+    return stmt
+
+
+def buyer_lines_statement(owner_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    return _lines_statement(Order.owner_id == owner_id, since=since, until=until)
+
+
+def seller_lines_statement(seller_id: int, since: Optional[datetime] = None, until: Optional[datetime] = None):
+    return _lines_statement(OrderItem.seller_id == seller_id, since=since, until=until)
+
+
+def _plain(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _encode(rows, fmt: ExportFormat) -> str:
+    if fmt == "ndjson":
+        return "".join(
+            json.dumps({key: _plain(value) for key, value in zip(HEADER, row)}) + "\n"
+            for row in rows
+        )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_plain(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(stmt, fmt: ExportFormat) -> AsyncIterator[str]:
+    """
+    Response body generator. Opens its own session: the request's session
+    is closed by the time a StreamingResponse body runs.
+    """
+    if fmt == "csv":
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(HEADER)
+        yield buffer.getvalue()
+
+    async with new_async_session() as session:
+        result = await session.stream(stmt.execution_options(yield_per=EXPORT_CHUNK_ROWS))
+        async for rows in result.partitions():
+            yield _encode(rows, fmt)
+
+
+def export_filename(prefix: str, fmt: ExportFormat) -> str:
+    return f"{prefix}-{datetime.now():%Y%m%d-%H%M%S}.{fmt}"
@@ -0,0 +1,100 @@
+from sqlalchemy import Text, case, func, literal_column, type_coerce
+from sqlalchemy.dialects.postgresql import JSON, aggregate_order_by
+from sqlalchemy.future import select
+
+from app.models.user_order import Order, OrderAddress, OrderItem
+
+# Postgres builds the OrderRead / OrderItemRead / OrderAddressRead documents
+# itself so list endpoints skip the selectin loads and per-row validation.
+# Keep the keys in sync with app/schemas/user_order.py.
+EMPTY_JSON_ARRAY = literal_column("'[]'::json")
+
+
+def items_json(outer, *criteria):
+    """Subquery correlated to `outer`: the matching items as a JSON array, ordered by id"""
+    return type_coerce(
+        select(
+            func.coalesce(
+                func.json_agg(
+                    aggregate_order_by(
+                        func.json_build_object(
+                            "id", OrderItem.id,
+                            "product_id", OrderItem.product_id,
+                            "seller_id", OrderItem.seller_id,
+                            "quantity", OrderItem.quantity,
+                            "total_price", OrderItem.total_price,
+                            "product_name", OrderItem.product_name,
+                            "image", OrderItem.image,
+                            "status", OrderItem.status,
+                        ),
+                        OrderItem.id,
+                    )
+                ),
+                EMPTY_JSON_ARRAY,
+            )
+        )
+        .where(*criteria)
+        .correlate(outer)
+        .scalar_subquery(),
+        JSON,
+    )
+
+
+def address_json():
+    """The shipping address of an OUTER JOINed OrderAddress, or null"""
+    return type_coerce(case(
+        (OrderAddress.id.is_(None), None),
+        else_=func.json_build_object(
+            "recipient_name", OrderAddress.recipient_name,
+            "phone", OrderAddress.phone,
+            "address_line1", OrderAddress.address_line1,
+            "address_line2", OrderAddress.address_line2,
+            "city", OrderAddress.city,
+            "province", OrderAddress.province,
+            "postal_code", OrderAddress.postal_code,
+            "country", OrderAddress.country,
+        ),
+    ), JSON)
+
+
+def order_document():
+    """One OrderRead document per Order row (needs the OrderAddress outer join)"""
+    return func.json_build_object(
+        "id", Order.id,
+        "owner_id", Order.owner_id,
+        "owner_name", Order.owner_name,
+        "status", Order.status,
+        "total_price", Order.total_price,
+        "items", items_json(Order, OrderItem.order_id == Order.id),
+        "shipping_address", address_json(),
+        "created_at", Order.created_at,
+        "updated_at", Order.updated_at,
+    )
+
+
+def orders_page_statement(owner_id: int, offset: int, limit: int):
+    """A page of the buyer's orders, newest first, as one JSON array (text)"""
+    page = (
+        select(Order.id, order_document().label("doc"))
+        .outerjoin(OrderAddress, OrderAddress.order_id == Order.id)
+        .where(Order.owner_id == owner_id)
+        .order_by(Order.id.desc())
+        .offset(offset)
+        .limit(limit)
+        .subquery("page")
+    )
+    return select(
+        func.coalesce(
+            func.json_agg(aggregate_order_by(page.c.doc, page.c.id.desc())),
+            EMPTY_JSON_ARRAY,
+        ).cast(Text)
+    )
+
+
+def order_statement(owner_id: int, order_id: int):
+    """One of the buyer's orders as a JSON document (text), no row if missing"""
+    return (
+        select(order_document().cast(Text))
+        .outerjoin(OrderAddress, OrderAddress.order_id == Order.id)
+        .where(Order.id == order_id, Order.owner_id == owner_id)
+    )
@@ -0,0 +1,240 @@
+from sqlalchemy import ARRAY, Integer, String, and_, any_, case, column, func, literal, update, values
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.flash_sale import FlashSale
+from app.core.seller_stats import record_cancelled
+from app.models.product import Product
+from app.models.seller import SellerOrder, SellerOrderStatus
+from app.models.user_order import Order, OrderItem, OrderStatus
+
+# Allowed item status changes; delivered and cancelled are final
+TRANSITIONS: dict[OrderStatus, set[OrderStatus]] = {
+    OrderStatus.PENDING: {OrderStatus.PROCESSING, OrderStatus.CANCELLED},
+    OrderStatus.PROCESSING: {OrderStatus.SHIPPED, OrderStatus.CANCELLED},
+    OrderStatus.SHIPPED: {OrderStatus.DELIVERED},
+    OrderStatus.DELIVERED: set(),
+    OrderStatus.CANCELLED: set(),
+}
+
+
+def can_transition(from_status: OrderStatus, to_status: OrderStatus) -> bool:
+    return to_status in TRANSITIONS[from_status]
+
+
+async def _restore_db_stock(session: AsyncSession, quantities: dict[int, int]) -> None:
+    """Add units back to Product.stock in one UPDATE, locking rows in id order like checkout"""
+    if not quantities:
+        return
+
+    product = Product.__table__
+    returned = values(column("id", Integer), column("qty", Integer), name="returned").data(
+        sorted(quantities.items())
+    )
+    locked = (
+        select(product.c.id)
+        .where(product.c.id == any_(literal(sorted(quantities), ARRAY(Integer))))
+        .order_by(product.c.id)
+        .with_for_update()
+        .cte("locked")
+    )
+    await session.execute(
+        update(product)
+        .where(product.c.id == returned.c.id, product.c.id == locked.c.id)
+        .values(
+            stock=product.c.stock + returned.c.qty,
+            # Checkout deactivates products that sell out; undo that only, never a seller's delisting
+            is_active=case(
+                (and_(product.c.stock <= 0, product.c.delisted_at.is_(None)), True),
+                else_=product.c.is_active,
+            ),
+        )
+    )
+
+
+async def restore_stock(session: AsyncSession, flash: FlashSale, quantities: dict[int, int]) -> dict[int, int]:
+    """
+    Return units to stock. Regular products are updated in the session's
+    transaction; the quantities of flash-sale products are returned so the
+    caller can hand them to release_flash_after_commit().
+    """
+    flash_ids = await flash.active(list(quantities))
+    await _restore_db_stock(session, {pid: qty for pid, qty in quantities.items() if pid not in flash_ids})
+    return {pid: quantities[pid] for pid in flash_ids}
+
+
+async def release_flash_after_commit(session: AsyncSession, flash: FlashSale, quantities: dict[int, int]) -> None:
+    """Give flash-sale units back to Redis, or to Postgres if the sale ended meanwhile"""
+    ended = await flash.release(quantities)
+    if ended:
+        await _restore_db_stock(session, ended)
+        await session.commit()
+
+
+async def cancel_items(
+    session: AsyncSession,
+    flash: FlashSale,
+    order_ids: list[int],
+) -> tuple[dict[int, int], list[int], list[int]]:
+    """
+    Cancel the pending items and seller orders of already-cancelled orders
+    and restore their stock, set-based. Returns the flash-sale quantities to
+    release after commit, the product ids and the seller ids touched.
+    """
+    # 1️⃣ Items still pending, with the quantities to give back
+    result = await session.execute(
+        update(OrderItem)
+        .where(
+            OrderItem.order_id == any_(literal(order_ids, ARRAY(Integer))),
+            OrderItem.status == OrderStatus.PENDING,
+            Order.id == OrderItem.order_id,
+        )
+        .values(status=OrderStatus.CANCELLED)
+        .returning(
+            OrderItem.seller_id, OrderItem.product_id, OrderItem.quantity, OrderItem.total_price, Order.created_at
+        )
+        .execution_options(synchronize_session=False)
+    )
+    rows = result.all()
+    quantities: dict[int, int] = {}
+    for row in rows:
+        quantities[row.product_id] = quantities.get(row.product_id, 0) + row.quantity
+
+    # 2️⃣ Seller orders
+    result = await session.execute(
+        update(SellerOrder)
+        .where(
+            SellerOrder.order_id == any_(literal(order_ids, ARRAY(Integer))),
+            SellerOrder.status == SellerOrderStatus.PENDING,
+        )
+        .values(status=SellerOrderStatus.CANCELLED)
+        .returning(SellerOrder.seller_id)
+        .execution_options(synchronize_session=False)
+    )
+    seller_ids = sorted({seller_id for seller_id in result.scalars().all() if seller_id})
+
+    # 3️⃣ Stock, then stats: product rows are always locked before stats rows
+    flash_quantities = await restore_stock(session, flash, quantities)
+    await record_cancelled(session, rows)
+    return flash_quantities, list(quantities), seller_ids
+
+
+def _rolled_up_status(status):
+    """Status derived from a group of items: the least advanced live item wins"""
+    return case(
+        (func.bool_and(status == OrderStatus.CANCELLED), OrderStatus.CANCELLED.value),
+        (func.bool_and(status.in_([OrderStatus.DELIVERED, OrderStatus.CANCELLED])), OrderStatus.DELIVERED.value),
+        (
+            func.bool_and(status.in_([OrderStatus.SHIPPED, OrderStatus.DELIVERED, OrderStatus.CANCELLED])),
+            OrderStatus.SHIPPED.value,
+        ),
+        # Only fulfillment moves an order on: [cancelled, pending] is still pending
+        (
+            func.bool_or(status.in_([OrderStatus.PROCESSING, OrderStatus.SHIPPED, OrderStatus.DELIVERED])),
+            OrderStatus.PROCESSING.value,
+        ),
+        else_=OrderStatus.PENDING.value,
+    )
+
+
+async def roll_up_orders(session: AsyncSession, order_ids: list[int]) -> list[tuple[int, int, str]]:
+    """
+    Recompute Order.status from the items in one UPDATE. Returns the
+    (id, owner_id, status) of orders whose status changed.
+    """
+    rolled = (
+        select(OrderItem.order_id, _rolled_up_status(OrderItem.status).label("status"))
+        .where(OrderItem.order_id == any_(literal(order_ids, ARRAY(Integer))))
+        .group_by(OrderItem.order_id)
+        .subquery("rolled")
+    )
+    new_status = rolled.c.status.cast(Order.__table__.c.status.type)
+    result = await session.execute(
+        update(Order)
+        .where(Order.id == rolled.c.order_id, Order.status != new_status)
+        .values(status=new_status)
+        .returning(Order.id, Order.owner_id, Order.status)
+        .execution_options(synchronize_session=False)
+    )
+    return [tuple(row) for row in result.all()]
+
+
+async def roll_up_seller_orders(session: AsyncSession, seller_id: int, order_ids: list[int]) -> None:
+    """Recompute the status of a seller's SellerOrder rows from that seller's items"""
+    rolled = (
+        select(OrderItem.order_id, _rolled_up_status(OrderItem.status).label("status"))
+        .where(
+            OrderItem.order_id == any_(literal(order_ids, ARRAY(Integer))),
+            OrderItem.seller_id == seller_id,
+        )
+        .group_by(OrderItem.order_id)
+        .subquery("rolled")
+    )
+    new_status = rolled.c.status.cast(SellerOrder.__table__.c.status.type)
+    await session.execute(
+        update(SellerOrder)
+        .where(
+            SellerOrder.order_id == rolled.c.order_id,
+            SellerOrder.seller_id == seller_id,
+            SellerOrder.status != new_status,
+        )
+        .values(status=new_status)
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def transition_items(
+    session: AsyncSession,
+    seller_id: int,
+    changes: list[tuple[int, OrderStatus, OrderStatus]],
+) -> tuple[list, dict[int, int]]:
+    """
+    Apply (item_id, from_status, to_status) changes of one seller's items in
+    a single UPDATE. `from_status` is compared in the WHERE clause
+    (optimistic concurrency): items changed by someone else meanwhile are
+    left alone and missing from the result. Transitions must already be
+    validated with can_transition(). Parent orders are locked first, in id
+    order, so concurrent sellers sharing an order roll it up one at a time.
+    Returns the updated rows (id, order_id, seller_id, product_id,
+    quantity, total_price, status, created_at of the order) and the owner of
+    every order involved ({order_id: owner_id}). The caller restores the
+    stock of cancelled rows, then counts them with record_cancelled().
+    """
+    item_ids = [item_id for item_id, _, _ in changes]
+
+    order_ids = (
+        select(OrderItem.order_id)
+        .where(OrderItem.id == any_(literal(item_ids, ARRAY(Integer))), OrderItem.seller_id == seller_id)
+        .scalar_subquery()
+    )
+    result = await session.execute(
+        select(Order.id, Order.owner_id).where(Order.id.in_(order_ids)).order_by(Order.id).with_for_update()
+    )
+    owners = {row.id: row.owner_id for row in result.all()}
+
+    status_type = OrderItem.__table__.c.status.type
+    wanted = values(
+        column("id", Integer), column("from_status", String), column("to_status", String), name="wanted"
+    ).data([(item_id, from_status.value, to_status.value) for item_id, from_status, to_status in changes])
+    result = await session.execute(
+        update(OrderItem)
+        .where(
+            OrderItem.id == wanted.c.id,
+            OrderItem.seller_id == seller_id,
+            OrderItem.status == wanted.c.from_status.cast(status_type),
+            Order.id == OrderItem.order_id,
+        )
+        .values(status=wanted.c.to_status.cast(status_type))
+        .returning(
+            OrderItem.id,
+            OrderItem.order_id,
+            OrderItem.seller_id,
+            OrderItem.product_id,
+            OrderItem.quantity,
+            OrderItem.total_price,
+            OrderItem.status,
+            Order.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.all(), owners
@@ -0,0 +1,73 @@
+import json
+from typing import Optional
+from uuid import uuid4
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+# Async checkout: the API appends order commands to a Redis Stream and the
+# workers started by worker.py persist them (see app/order_worker.py).
+ORDER_STREAM_KEY = "orders:stream"
+ORDER_STREAM_GROUP = "order-workers"
+ORDER_STATUS_KEY = "orders:async:{token}"   # hash: user_id, status, order_id, detail
+ORDER_RESULTS_CHANNEL = "orders:results"
+
+ORDER_STATUS_TTL = 60 * 60 * 24
+
+
+async def ensure_group(redis: Redis) -> None:
+    try:
+        await redis.xgroup_create(ORDER_STREAM_KEY, ORDER_STREAM_GROUP, id="0", mkstream=True)
+    except ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+
+async def backlog(redis: Redis) -> int:
+    """Commands not yet persisted: undelivered (lag) plus delivered but unacked"""
+    try:
+        groups = await redis.xinfo_groups(ORDER_STREAM_KEY)
+    except ResponseError:
+        return 0  # stream does not exist yet
+
+    for group in groups:
+        if group["name"] == ORDER_STREAM_GROUP:
+            lag = group.get("lag")
+            if lag is None:  # Redis can't tell after trims/deletes, fall back to length
+                lag = await redis.xlen(ORDER_STREAM_KEY)
+            return int(lag) + int(group["pending"])
+    return await redis.xlen(ORDER_STREAM_KEY)
+
+
+async def enqueue(redis: Redis, command: dict) -> str:
+    """Queue an order command, returns the token clients poll with"""
+    token = uuid4().hex
+    pipe = redis.pipeline(transaction=True)
+    pipe.hset(
+        ORDER_STATUS_KEY.format(token=token),
+        mapping={"user_id": command["user_id"], "status": "queued"},
+    )
+    pipe.expire(ORDER_STATUS_KEY.format(token=token), ORDER_STATUS_TTL)
+    pipe.xadd(ORDER_STREAM_KEY, {"token": token, "command": json.dumps(command)})
+    await pipe.execute()
+    return token
+
+
+async def get_status(redis: Redis, token: str) -> Optional[dict]:
+    status = await redis.hgetall(ORDER_STATUS_KEY.format(token=token))
+    return status or None
+
+
+async def publish_result(redis: Redis, results: list[dict]) -> None:
+    """Store and broadcast the outcome of processed commands"""
+    if not results:
+        return
+
+    pipe = redis.pipeline(transaction=False)
+    for result in results:
+        key = ORDER_STATUS_KEY.format(token=result["token"])
+        fields = {k: v for k, v in result.items() if k != "token" and v is not None}
+        pipe.hset(key, mapping=fields)
+        pipe.expire(key, ORDER_STATUS_TTL)
+        pipe.publish(ORDER_RESULTS_CHANNEL, json.dumps(result))
+    await pipe.execute()
@@ -0,0 +1,176 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+
+from redis.asyncio import Redis
+from redis.exceptions import WatchError
+from sqlalchemy import func
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import outbox
+from app.core.config import settings
+from app.core.sketch import TDigest
+from app.models.product import Product
+from app.models.user_order import Order, OrderItem
+
+# Order value distributions as one t-digest per scope and UTC day:
+#   all              whole order totals
+#   seller:{id}      the seller's part of each order
+#   category:{name}  the category's part of each order
+# Checkout feeds them through the order.placed outbox handler. A range query
+# merges one small digest per day, so its cost depends on the number of days,
+# not orders. Cancellations are not taken out: the digests describe orders
+# as placed.
+ORDER_VALUE_KEY = "sketch:order_value:{scope}:{day}"
+ORDER_VALUE_SEEN_KEY = "sketch:order_value_seen:{order_id}"  # written with the digests, makes retries no-ops
+SEEN_TTL = 60 * 60 * 24 * 2
+WATCH_RETRIES = 5
+
+QUANTILES = (0.25, 0.5, 0.75, 0.9, 0.95, 0.99)
+
+
+def day_key(scope: str, day: date) -> str:
+    return ORDER_VALUE_KEY.format(scope=scope, day=day.strftime("%Y%m%d"))
+
+
+def _retention() -> int:
+    return settings.order_value_retention_days * 24 * 60 * 60
+
+
+def _values(payload: dict) -> dict[str, float]:
+    """Value of one order per scope"""
+    values = {"all": float(payload["total_price"])}
+    for item in payload["items"]:
+        scopes = [f"seller:{item['seller_id']}"]
+        if item.get("category"):
+            scopes.append(f"category:{item['category']}")
+        for scope in scopes:
+            values[scope] = values.get(scope, 0.0) + float(item["total_price"])
+    return values
+
+
+async def _add(redis: Redis, orders: dict[int, dict[str, float]], day: date) -> None:
+    """Add order values to the day's digests; optimistic read-modify-write so parallel relays never lose updates"""
+    keys = sorted({day_key(scope, day) for values in orders.values() for scope in values})
+    for _ in range(WATCH_RETRIES):
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(*keys)
+                stored = await pipe.mget(keys)
+                digests = {key: TDigest.loads(text) if text else TDigest() for key, text in zip(keys, stored)}
+                for values in orders.values():
+                    for scope, value in values.items():
+                        digests[day_key(scope, day)].add(value)
+
+                pipe.multi()
+                for key, digest in digests.items():
+                    pipe.set(key, digest.dumps(), ex=_retention())
+                for order_id in orders:
+                    pipe.set(ORDER_VALUE_SEEN_KEY.format(order_id=order_id), 1, ex=SEEN_TTL)
+                await pipe.execute()
+                return
+            except WatchError:
+                continue
+    raise RuntimeError(f"Order value digests kept changing, {len(orders)} orders not added")
+
+
+@outbox.handler(outbox.ORDER_PLACED_TOPIC)
+async def record_order_values(redis: Redis, payloads: list[dict]) -> None:
+    """
+    Outbox handler: add new orders to the digests of the UTC day they were
+    placed, like rebuild(), skipping orders a failed batch already added
+    """
+    if not payloads:
+        return
+    seen = await redis.mget([ORDER_VALUE_SEEN_KEY.format(order_id=p["order_id"]) for p in payloads])
+    by_day: dict[date, dict[int, dict[str, float]]] = {}
+    for payload, was_seen in zip(payloads, seen):
+        if not was_seen:
+            by_day.setdefault(outbox.placed_at(payload).date(), {})[payload["order_id"]] = _values(payload)
+    for day, orders in sorted(by_day.items()):
+        await _add(redis, orders, day)
+
+
+async def distribution(redis: Redis, scope: str, since: date, until: date) -> TDigest:
+    """Merged digest over [since, until], one MGET"""
+    days = [since + timedelta(days=i) for i in range((until - since).days + 1)]
+    merged = TDigest()
+    for text in await redis.mget([day_key(scope, day) for day in days]):
+        if text:
+            merged.merge(TDigest.loads(text))
+    return merged
+
+
+def summarize(digest: TDigest) -> dict:
+    count = int(digest.count)
+    return {
+        "orders": count,
+        "mean": round(digest.mean(), 2) if count else None,
+        "min": round(digest.min, 2) if count else None,
+        "max": round(digest.max, 2) if count else None,
+        "quantiles": {
+            f"p{round(q * 100)}": round(value, 2) if value is not None else None
+            for q, value in zip(QUANTILES, digest.quantiles(QUANTILES))
+        },
+    }
+
+
+async def rebuild(session: AsyncSession, redis: Redis, days: Optional[int] = None) -> int:
+    """
+    Recreate the digests of the last `days` days from order_item, e.g. after
+    a Redis flush or when the digests are first deployed. Returns the
+    number of digests written.
+    """
+    days = days or settings.order_value_retention_days
+    since = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=days - 1)
+    day = func.date(func.timezone("UTC", Order.created_at)).label("day")
+    result = await session.stream(
+        select(
+            Order.id,
+            day,
+            Order.total_price,
+            OrderItem.seller_id,
+            Product.category,
+            func.sum(OrderItem.total_price).label("value"),
+        )
+        .select_from(OrderItem)
+        .join(Order, Order.id == OrderItem.order_id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+        .where(Order.created_at >= since)
+        .group_by(Order.id, day, Order.total_price, OrderItem.seller_id, Product.category)
+        .order_by(day)
+        .execution_options(yield_per=5000)
+    )
+
+    digests: dict[str, TDigest] = {}
+    # Values per scope and order for the day being read; rows come day by day
+    current: Optional[date] = None
+    orders: dict[str, dict[int, float]] = {}
+
+    def close_day() -> None:
+        for scope, per_order in orders.items():
+            digests.setdefault(day_key(scope, current), TDigest()).update(per_order.values())
+        orders.clear()
+
+    async for row in result:
+        if row.day != current:
+            close_day()
+            current = row.day
+        # The order total once; a seller's or category's rows within one order add up
+        orders.setdefault("all", {})[row.id] = row.total_price
+        scopes = [f"seller:{row.seller_id}"]
+        if row.category:
+            scopes.append(f"category:{row.category.value}")
+        for scope in scopes:
+            per_order = orders.setdefault(scope, {})
+            per_order[row.id] = per_order.get(row.id, 0.0) + row.value
+    close_day()
+
+    old_keys = [key async for key in redis.scan_iter(match=ORDER_VALUE_KEY.format(scope="*", day="*"), count=1000)]
+    pipe = redis.pipeline(transaction=True)
+    if old_keys:
+        pipe.delete(*old_keys)
+    for key, digest in digests.items():
+        pipe.set(key, digest.dumps(), ex=_retention())
+    await pipe.execute()
+    return len(digests)
@@ -0,0 +1,160 @@
+import asyncio
+import json
+from collections.abc import Awaitable, Callable
+from datetime import datetime, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.engine import new_async_session
+from app.core.redis import RedisClient
+from app.models.outbox import OutboxEvent
+
+# Routes record side effects (cache invalidation, events) as outbox rows in the
+# same transaction as their change; relay_outbox() applies them after commit.
+# A topic may have several handlers; a failure retries the whole batch, so
+# handlers must tolerate seeing a payload twice. Database handlers (db_handler)
+# write in the relay's own transaction instead: their rows commit together with
+# the events' deletion, or not at all, so they apply every event exactly once.
+# Topics without a handler are published on EVENTS_CHANNEL.
+EVENTS_CHANNEL = "events:{topic}"
+INVALIDATE_TOPIC = "cache.invalidate"   # payload: {"keys": [...]}
+ORDER_PLACED_TOPIC = "order.placed"     # payload: {"order_id", "user_id", "total_price", "created_at", "items": [...]}
+ORDER_CANCELLED_TOPIC = "order.cancelled"   # payload: {"order_ids", "reason"}
+ORDER_ITEMS_TOPIC = "order.items"           # payload: {"seller_id", "items": [{"id", "order_id", "status"}]}
+MAX_ATTEMPTS = 10  # rows failing more often stay in the table for inspection
+
+Handler = Callable[[Redis, list[dict]], Awaitable[None]]
+DbHandler = Callable[[AsyncSession, list[dict]], Awaitable[None]]
+_handlers: dict[str, list[Handler]] = {}
+_db_handlers: dict[str, list[DbHandler]] = {}
+_wake = asyncio.Event()
+
+
+def handler(topic: str) -> Callable[[Handler], Handler]:
+    """Register a function applying a batch of payloads for `topic`"""
+    def register(fn: Handler) -> Handler:
+        _handlers.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+
+def db_handler(topic: str) -> Callable[[DbHandler], DbHandler]:
+    """Register a function writing a batch of payloads for `topic` to the database (no commit)"""
+    def register(fn: DbHandler) -> DbHandler:
+        _db_handlers.setdefault(topic, []).append(fn)
+        return fn
+    return register
+
+
+def add_event(session: AsyncSession, topic: str, payload: dict) -> None:
+    """Record an event; it is written by the caller's commit"""
+    session.add(OutboxEvent(topic=topic, payload=payload))
+
+
+def invalidate(session: AsyncSession, *keys: str) -> None:
+    """Record cache keys to drop once the transaction commits"""
+    add_event(session, INVALIDATE_TOPIC, {"keys": list(keys)})
+
+
+def placed_at(payload: dict) -> datetime:
+    """UTC time an order.placed payload's order was placed; relay time for events queued without it"""
+    if payload.get("created_at"):
+        return datetime.fromisoformat(payload["created_at"]).astimezone(timezone.utc)
+    return datetime.now(timezone.utc)
+
+
+def wake() -> None:
+    """Run the relay now instead of waiting for the next tick (call after commit)"""
+    _wake.set()
+
+
+@handler(INVALIDATE_TOPIC)
+async def _invalidate(redis: Redis, payloads: list[dict]) -> None:
+    keys = {key for payload in payloads for key in payload["keys"]}
+    if keys:
+        await redis.delete(*keys)
+
+
+async def _publish(redis: Redis, topic: str, payloads: list[dict]) -> None:
+    pipe = redis.pipeline(transaction=False)
+    for payload in payloads:
+        pipe.publish(EVENTS_CHANNEL.format(topic=topic), json.dumps(payload))
+    await pipe.execute()
+
+
+@handler(ORDER_PLACED_TOPIC)
+async def _publish_order_placed(redis: Redis, payloads: list[dict]) -> None:
+    # Subscribers keep receiving order.placed next to the in-process handlers
+    await _publish(redis, ORDER_PLACED_TOPIC, payloads)
+
+
+async def relay_batch(session: AsyncSession, redis: Redis, batch_size: int) -> int:
+    """Apply up to `batch_size` pending events, returns how many succeeded"""
+    # SKIP LOCKED lets several API processes relay without double work
+    result = await session.execute(
+        select(OutboxEvent.id, OutboxEvent.topic, OutboxEvent.payload)
+        .where(OutboxEvent.attempts < MAX_ATTEMPTS)
+        .order_by(OutboxEvent.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    rows = result.all()
+    if not rows:
+        await session.commit()
+        return 0
+
+    by_topic: dict[str, list] = {}
+    for row in rows:
+        by_topic.setdefault(row.topic, []).append(row)
+
+    done: list[int] = []
+    for topic, events in by_topic.items():
+        ids = [event.id for event in events]
+        payloads = [event.payload for event in events]
+        try:
+            # A failing handler also rolls back what the database handlers wrote
+            async with session.begin_nested():
+                for fn in _db_handlers.get(topic, []):
+                    await fn(session, payloads)
+                fns = _handlers.get(topic)
+                if fns:
+                    for fn in fns:
+                        await fn(redis, payloads)
+                else:
+                    await _publish(redis, topic, payloads)
+            done += ids
+        except Exception as e:
+            print(f"Outbox topic {topic} failed: {e}")
+            await session.execute(
+                update(OutboxEvent)
+                .where(OutboxEvent.id.in_(ids))
+                .values(attempts=OutboxEvent.attempts + 1, last_error=str(e))
+            )
+
+    if done:
+        await session.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(done)))
+    await session.commit()
+    return len(done)
+
+
+async def relay_outbox() -> None:
+    """Background job: drain the outbox in batches"""
+    _wake.clear()
+    redis = RedisClient.get()
+    batch_size = settings.outbox_batch_size
+    async with new_async_session() as session:
+        while await relay_batch(session, redis, batch_size) == batch_size:
+            pass
+
+
+async def wait_for_wake(seconds: float) -> None:
+    """Sleep until the next tick or until a request calls wake()"""
+    try:
+        await asyncio.wait_for(_wake.wait(), seconds)
+    except asyncio.TimeoutError:
+        pass
+
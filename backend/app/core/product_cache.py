@@ -0,0 +1,120 @@
+import json
+from typing import Iterable, Optional, Sequence
+
+from fastapi.encoders import jsonable_encoder
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.models.product import Product
+from app.schemas.product import PublicProductRead
+
+# Static document (name, description, image, category, rating...) changes only
+# when a seller edits the product, so it can live for a long time. The volatile
+# record (stock, status, price, is_active) is what checkout touches and is kept
+# small and short-lived so it can be dropped without evicting the static part.
+PRODUCT_STATIC_CACHE_KEY = "products:{id}:static"
+PRODUCT_VOLATILE_CACHE_KEY = "products:{id}:volatile"
+
+STATIC_TTL = 60 * 60 * 24
+VOLATILE_TTL = 60 * 10  # writers are covered by the pg_notify listener (app/cache_listener.py)
+
+VOLATILE_FIELDS = ("stock", "status", "price", "is_active")
+
+
+def split_product(product: Product) -> tuple[dict, dict]:
+    """
+    Serialize a product and split it into (static, volatile) documents.
+    seller_id is kept for internal use (view counting); public response
+    models drop it.
+    """
+    data = jsonable_encoder(PublicProductRead.model_validate(product))
+    data["seller_id"] = product.seller_id
+    volatile = {field: data.pop(field) for field in VOLATILE_FIELDS}
+    return data, volatile
+
+
+class ProductCache:
+    """Two-part product cache merged at response time"""
+
+    def __init__(self, redis: Redis):
+        self.redis = redis
+
+    @staticmethod
+    def static_keys(ids: Iterable[int]) -> list[str]:
+        return [PRODUCT_STATIC_CACHE_KEY.format(id=i) for i in ids]
+
+    @staticmethod
+    def volatile_keys(ids: Iterable[int]) -> list[str]:
+        return [PRODUCT_VOLATILE_CACHE_KEY.format(id=i) for i in ids]
+
+    async def prime(self, products: Sequence[Product]) -> None:
+        """Write both documents for already loaded products in one round trip"""
+        if not products:
+            return
+
+        pipe = self.redis.pipeline(transaction=False)
+        for product in products:
+            static, volatile = split_product(product)
+            pipe.set(PRODUCT_STATIC_CACHE_KEY.format(id=product.id), json.dumps(static), ex=STATIC_TTL)
+            pipe.set(PRODUCT_VOLATILE_CACHE_KEY.format(id=product.id), json.dumps(volatile), ex=VOLATILE_TTL)
+        await pipe.execute()
+
+    async def get_many(self, session: AsyncSession, ids: Sequence[int]) -> list[dict]:
+        """
+        Return merged product documents in the order of `ids`.
+        Missing static documents load the full row, missing volatile
+        records only load the volatile columns. Unknown ids are skipped.
+        """
+        if not ids:
+            return []
+
+        cached = await self.redis.mget(self.static_keys(ids) + self.volatile_keys(ids))
+        statics = {i: json.loads(c) for i, c in zip(ids, cached[: len(ids)]) if c}
+        volatiles = {i: json.loads(c) for i, c in zip(ids, cached[len(ids):]) if c}
+
+        # 1️⃣ Cold products: load the whole row and cache both parts
+        missing_static = [i for i in ids if i not in statics]
+        if missing_static:
+            result = await session.execute(select(Product).where(Product.id.in_(missing_static)))
+            products = result.scalars().all()
+            for product in products:
+                statics[product.id], volatiles[product.id] = split_product(product)
+            await self.prime(products)
+
+        # 2️⃣ Warm products whose volatile record expired: tiny column read
+        missing_volatile = [i for i in ids if i in statics and i not in volatiles]
+        if missing_volatile:
+            result = await session.execute(
+                select(Product.id, *(getattr(Product, f) for f in VOLATILE_FIELDS))
+                .where(Product.id.in_(missing_volatile))
+            )
+            pipe = self.redis.pipeline(transaction=False)
+            for row in result.all():
+                volatile = jsonable_encoder({f: getattr(row, f) for f in VOLATILE_FIELDS})
+                volatiles[row.id] = volatile
+                pipe.set(PRODUCT_VOLATILE_CACHE_KEY.format(id=row.id), json.dumps(volatile), ex=VOLATILE_TTL)
+            await pipe.execute()
+
+        return [
+            {**statics[i], **volatiles[i]}
+            for i in ids
+            if i in statics and i in volatiles
+        ]
+
+    async def get(self, session: AsyncSession, product_id: int) -> Optional[dict]:
+        found = await self.get_many(session, [product_id])
+        return found[0] if found else None
+
+    async def invalidate_volatile(self, ids: Iterable[int]) -> None:
+        """Drop only stock/price data, the static document stays warm"""
+        keys = self.volatile_keys(ids)
+        if keys:
+            await self.redis.delete(*keys)
+
+    async def invalidate(self, ids: Iterable[int]) -> None:
+        """Drop both documents, used when the product itself is edited"""
+        ids = list(ids)
+        keys = self.static_keys(ids) + self.volatile_keys(ids)
+        if keys:
+            await self.redis.delete(*keys)
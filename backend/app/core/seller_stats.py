@@ -0,0 +1,98 @@
+from datetime import date, datetime, timezone
+
+from sqlalchemy import func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import outbox
+from app.models.seller_stats import SellerDailyStats, SellerProductDailyStats
+
+# Exact rollups, a year of analytics is a few hundred rows. New orders are
+# counted from order.placed in the outbox relay's transaction, a batch of
+# orders per upsert: checkouts never wait on a seller's row of the day.
+# Cancellations are counted by the transaction that cancels, after it has
+# locked the products. Rows are upserted in key order so concurrent writers
+# touching the same rows cannot deadlock.
+COUNTERS = ("orders", "units", "revenue", "cancelled_units", "cancelled_revenue")
+
+
+def stats_day(created_at: datetime) -> date:
+    """Day an order is counted on"""
+    return created_at.astimezone(timezone.utc).date()
+
+
+def _add_on_conflict(stmt, table, extra: dict | None = None):
+    return stmt.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={**{name: table.c[name] + stmt.excluded[name] for name in COUNTERS}, **(extra or {})},
+    )
+
+
+async def _upsert(session: AsyncSession, products: dict[tuple, dict], sellers: dict[tuple, dict]) -> None:
+    product_table = SellerProductDailyStats.__table__
+    seller_table = SellerDailyStats.__table__
+
+    if products:
+        stmt = insert(product_table).values([
+            {"seller_id": seller_id, "day": day, "product_id": product_id, **counters}
+            for (seller_id, day, product_id), counters in sorted(products.items())
+        ])
+        await session.execute(_add_on_conflict(
+            stmt,
+            product_table,
+            {"category": func.coalesce(stmt.excluded.category, product_table.c.category)},
+        ))
+    if sellers:
+        stmt = insert(seller_table).values([
+            {"seller_id": seller_id, "day": day, **counters}
+            for (seller_id, day), counters in sorted(sellers.items())
+        ])
+        await session.execute(_add_on_conflict(stmt, seller_table))
+
+
+def _empty() -> dict:
+    return {name: 0 for name in COUNTERS}
+
+
+@outbox.db_handler(outbox.ORDER_PLACED_TOPIC)
+async def record_placed(session: AsyncSession, payloads: list[dict]) -> None:
+    """Outbox handler: count the items (seller_id, product_id, category, quantity, total_price) of new orders"""
+    products: dict[tuple, dict] = {}
+    sellers: dict[tuple, dict] = {}
+    for payload in payloads:
+        if "created_at" not in payload:
+            continue  # queued before this handler existed, checkout counted it already
+        day = stats_day(datetime.fromisoformat(payload["created_at"]))
+        for item in payload["items"]:
+            product = products.setdefault((item["seller_id"], day, item["product_id"]), _empty())
+            product["category"] = item.get("category")
+            product["orders"] += 1
+            product["units"] += item["quantity"]
+            product["revenue"] += item["total_price"]
+
+            seller = sellers.setdefault((item["seller_id"], day), _empty())
+            seller["units"] += item["quantity"]
+            seller["revenue"] += item["total_price"]
+        # One order per seller in it, however many of the seller's products it holds
+        for seller_id in {item["seller_id"] for item in payload["items"]}:
+            sellers[(seller_id, day)]["orders"] += 1
+    await _upsert(session, products, sellers)
+
+
+async def record_cancelled(session: AsyncSession, lines: list) -> None:
+    """
+    Count cancelled items (seller_id, product_id, quantity, total_price,
+    created_at of their order) on the day their order was placed.
+    """
+    products: dict[tuple, dict] = {}
+    sellers: dict[tuple, dict] = {}
+    for line in lines:
+        day = stats_day(line.created_at)
+        product = products.setdefault((line.seller_id, day, line.product_id), {**_empty(), "category": None})
+        product["cancelled_units"] += line.quantity
+        product["cancelled_revenue"] += line.total_price
+
+        seller = sellers.setdefault((line.seller_id, day), _empty())
+        seller["cancelled_units"] += line.quantity
+        seller["cancelled_revenue"] += line.total_price
+    await _upsert(session, products, sellers)
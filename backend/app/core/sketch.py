@@ -0,0 +1,155 @@
+import base64
+import math
+import struct
+from array import array
+from typing import Iterable, Optional
+
+# Version byte, compression, min, max, centroid count
+_HEADER = struct.Struct("<BHddI")
+_VERSION = 1
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning): a mergeable sketch of a distribution that
+    answers quantile queries with error proportional to q(1 - q), so tails
+    are more accurate than the middle. Size is bounded by about
+    2 × compression centroids however many values were added, and two
+    digests merge into one with the same bounds, which is what makes
+    per-day digests combinable over any date range.
+    """
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self._means: list[float] = []
+        self._weights: list[float] = []
+        self._buffer: list[tuple[float, float]] = []
+        self.min = math.inf
+        self.max = -math.inf
+
+    # ---------- building ----------
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        self._buffer.append((value, weight))
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def update(self, values: Iterable[float]) -> None:
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "TDigest") -> None:
+        if not other.count:
+            return
+        self._buffer.extend(zip(other._means, other._weights))
+        self._buffer.extend(other._buffer)
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+
+    def _k_limit(self, q: float) -> float:
+        """Inverse of the k1 scale function after one step: q where the next centroid must end"""
+        k = self.compression / (2 * math.pi) * math.asin(2 * q - 1) + 1
+        if k >= self.compression / 4:
+            return 1.0
+        return (math.sin(k * 2 * math.pi / self.compression) + 1) / 2
+
+    def _compress(self) -> None:
+        if not self._buffer:
+            return
+        points = sorted([*zip(self._means, self._weights), *self._buffer])
+        self._buffer = []
+
+        total = sum(weight for _, weight in points)
+        means: list[float] = []
+        weights: list[float] = []
+        mean, weight = points[0]
+        done = 0.0
+        limit = total * self._k_limit(0.0)
+        for next_mean, next_weight in points[1:]:
+            if done + weight + next_weight <= limit:
+                # Weighted running mean keeps the centroid exact
+                weight += next_weight
+                mean += (next_mean - mean) * next_weight / weight
+            else:
+                means.append(mean)
+                weights.append(weight)
+                done += weight
+                limit = total * self._k_limit(done / total)
+                mean, weight = next_mean, next_weight
+        means.append(mean)
+        weights.append(weight)
+        self._means, self._weights = means, weights
+
+    # ---------- queries ----------
+
+    @property
+    def count(self) -> float:
+        return sum(self._weights) + sum(weight for _, weight in self._buffer)
+
+    def mean(self) -> Optional[float]:
+        self._compress()
+        total = self.count
+        if not total:
+            return None
+        return sum(m * w for m, w in zip(self._means, self._weights)) / total
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Value below which a fraction q of the added values falls, None when empty"""
+        self._compress()
+        total = self.count
+        if not total:
+            return None
+        if len(self._means) == 1 or q <= 0:
+            return self.min if q <= 0 else self._means[0]
+        if q >= 1:
+            return self.max
+
+        # Interpolate between centroid centres; the halves outside the
+        # first and last centres are interpolated against min and max
+        target = q * total
+        centre = self._weights[0] / 2
+        if target < centre:
+            return self.min + (self._means[0] - self.min) * target / centre
+        for i in range(len(self._means) - 1):
+            next_centre = centre + (self._weights[i] + self._weights[i + 1]) / 2
+            if target < next_centre:
+                fraction = (target - centre) / (next_centre - centre)
+                return self._means[i] + (self._means[i + 1] - self._means[i]) * fraction
+            centre = next_centre
+        last_half = self._weights[-1] / 2
+        fraction = min((target - centre) / last_half, 1.0)
+        return self._means[-1] + (self.max - self._means[-1]) * fraction
+
+    def quantiles(self, qs: Iterable[float]) -> list[Optional[float]]:
+        return [self.quantile(q) for q in qs]
+
+    # ---------- serialization ----------
+
+    def to_bytes(self) -> bytes:
+        """Header plus float64 means and weights, ~16 bytes per centroid"""
+        self._compress()
+        header = _HEADER.pack(_VERSION, self.compression, self.min, self.max, len(self._means))
+        return header + array("d", self._means).tobytes() + array("d", self._weights).tobytes()
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "TDigest":
+        version, compression, low, high, size = _HEADER.unpack_from(data)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported t-digest version {version}")
+        digest = cls(compression)
+        digest.min, digest.max = low, high
+        body = array("d")
+        body.frombytes(data[_HEADER.size:_HEADER.size + size * 16])
+        digest._means, digest._weights = body[:size].tolist(), body[size:].tolist()
+        return digest
+
+    def dumps(self) -> str:
+        """Text form for Redis clients with decode_responses=True"""
+        return base64.b64encode(self.to_bytes()).decode()
+
+    @classmethod
+    def loads(cls, text: str) -> "TDigest":
+        return cls.from_bytes(base64.b64decode(text))
@@ -0,0 +1,42 @@
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Optional
+
+
+class BackgroundRunner:
+    """Runs periodic jobs for the lifetime of the API process"""
+    _tasks: dict[str, asyncio.Task] = {}
+
+    @classmethod
+    def every(
+        cls,
+        name: str,
+        seconds: float,
+        job: Callable[[], Awaitable[None]],
+        wait: Optional[Callable[[float], Awaitable[None]]] = None,
+    ) -> None:
+        """
+        Schedule `job` to run every `seconds`, errors are logged and retried next tick.
+        `wait` replaces the sleep between runs, e.g. to let requests trigger a run early.
+        """
+        if name in cls._tasks:
+            return
+
+        async def loop() -> None:
+            while True:
+                await (wait or asyncio.sleep)(seconds)
+                try:
+                    await job()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    print(f"Background job {name} failed: {e}")
+
+        cls._tasks[name] = asyncio.create_task(loop(), name=name)
+
+    @classmethod
+    async def stop(cls) -> None:
+        for task in cls._tasks.values():
+            task.cancel()
+        await asyncio.gather(*cls._tasks.values(), return_exceptions=True)
+        cls._tasks.clear()
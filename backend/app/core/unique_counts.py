@@ -0,0 +1,104 @@
+import hashlib
+from datetime import date, datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from redis.asyncio import Redis
+from starlette.requests import Request
+
+from app.core import outbox
+from app.core.config import settings
+
+# Unique buyers and visitors per product and per seller, per UTC day, as
+# HyperLogLog counters: about 12KB per dense key whatever the traffic, with
+# ~0.81% standard error. Buyers come from the order.placed outbox handler
+# (PFADD is idempotent, so relay retries cannot inflate them); visitors from
+# product detail views. Ranges are PFMERGEd into a short-lived key.
+UNIQUE_DAY_KEY = "hll:{kind}:{scope}:{day}"                 # scope: product:{id} | seller:{id}
+UNIQUE_RANGE_KEY = "hll:{kind}:{scope}:range:{since}:{until}"
+RANGE_TTL = 60
+
+Kind = Literal["buyers", "visitors"]
+
+
+def _day(at: Optional[datetime] = None) -> date:
+    return (at or datetime.now(timezone.utc)).date()
+
+
+def day_key(kind: Kind, scope: str, day: date) -> str:
+    return UNIQUE_DAY_KEY.format(kind=kind, scope=scope, day=day.strftime("%Y%m%d"))
+
+
+def _retention() -> int:
+    return settings.unique_counts_retention_days * 24 * 60 * 60
+
+
+def visitor_id(request: Request) -> str:
+    """
+    Stable id without a database lookup: the session cookie for signed-in
+    users, client address and user agent otherwise. Only the hash is stored.
+    """
+    auth = request.cookies.get("auth")
+    if auth:
+        raw = f"session:{auth}"
+    else:
+        client = request.client.host if request.client else ""
+        raw = f"anon:{client}:{request.headers.get('user-agent', '')}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+async def add_view(redis: Redis, product_id: int, seller_id: Optional[int], visitor: str) -> None:
+    """Count a product detail view, one round trip"""
+    today = _day()
+    keys = [day_key("visitors", f"product:{product_id}", today)]
+    if seller_id:
+        keys.append(day_key("visitors", f"seller:{seller_id}", today))
+
+    pipe = redis.pipeline(transaction=False)
+    for key in keys:
+        pipe.pfadd(key, visitor)
+        pipe.expire(key, _retention())
+    await pipe.execute()
+
+
+@outbox.handler(outbox.ORDER_PLACED_TOPIC)
+async def add_buyers(redis: Redis, payloads: list[dict]) -> None:
+    """Outbox handler: add the buyer of each new order to its products and sellers, on the day it was placed"""
+    members: dict[str, set[str]] = {}
+    for payload in payloads:
+        buyer = str(payload["user_id"])
+        day = _day(outbox.placed_at(payload))
+        for item in payload["items"]:
+            members.setdefault(day_key("buyers", f"product:{item['product_id']}", day), set()).add(buyer)
+            members.setdefault(day_key("buyers", f"seller:{item['seller_id']}", day), set()).add(buyer)
+    if not members:
+        return
+
+    pipe = redis.pipeline(transaction=False)
+    for key, buyers in members.items():
+        pipe.pfadd(key, *buyers)
+        pipe.expire(key, _retention())
+    await pipe.execute()
+
+
+def _days(since: date, until: date) -> list[date]:
+    return [since + timedelta(days=i) for i in range((until - since).days + 1)]
+
+
+async def count_range(redis: Redis, kind: Kind, scope: str, since: date, until: date) -> int:
+    """Distinct members over [since, until], merged once and reused for RANGE_TTL seconds"""
+    key = UNIQUE_RANGE_KEY.format(kind=kind, scope=scope, since=since, until=until)
+    if not await redis.exists(key):
+        pipe = redis.pipeline(transaction=True)
+        pipe.pfmerge(key, *[day_key(kind, scope, day) for day in _days(since, until)])
+        pipe.expire(key, RANGE_TTL)
+        await pipe.execute()
+    return await redis.pfcount(key)
+
+
+async def count_daily(redis: Redis, kind: Kind, scope: str, since: date, until: date) -> list[tuple[date, int]]:
+    """Distinct members of each day in [since, until]"""
+    days = _days(since, until)
+    pipe = redis.pipeline(transaction=False)
+    for day in days:
+        pipe.pfcount(day_key(kind, scope, day))
+    return list(zip(days, await pipe.execute()))
@@ -0,0 +1,66 @@
+from collections import Counter
+from datetime import date, datetime, timezone
+
+from sqlalchemy import Date, Integer, column, values
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app.core.engine import new_async_session
+from app.models.product import Product
+from app.models.product_views import ProductDailyViews
+
+# Three bind parameters per row, well under the driver's 32767 limit
+FLUSH_BATCH_ROWS = 5000
+
+
+def _upsert(items: list[tuple[tuple[int, date], int]]):
+    table = ProductDailyViews.__table__
+    rows = values(
+        column("product_id", Integer), column("day", Date), column("views", Integer), name="pending"
+    ).data([(product_id, day, views) for (product_id, day), views in items])
+    # Products deleted since they were viewed are skipped instead of failing the batch;
+    # rows in key order so concurrent flushes from other workers lock them in the same order
+    stmt = insert(table).from_select(
+        ["product_id", "day", "views"],
+        select(rows.c.product_id, rows.c.day, rows.c.views)
+        .join(Product, Product.id == rows.c.product_id)
+        .order_by(rows.c.product_id, rows.c.day),
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=["product_id", "day"],
+        set_={"views": table.c.views + stmt.excluded.views},
+    )
+
+
+class ViewCounter:
+    """
+    Product view counts buffered in this process. Counting a view is a dict
+    increment on the request path; a background job (and the lifespan
+    shutdown) adds the buffered counts to product_daily_views in batched
+    upserts, so N views of a product cost one row update per flush instead
+    of N.
+    """
+    _pending: Counter[tuple[int, date]] = Counter()
+
+    @classmethod
+    def add(cls, product_id: int) -> None:
+        cls._pending[(product_id, datetime.now(timezone.utc).date())] += 1
+
+    @classmethod
+    async def flush(cls) -> None:
+        """Background job: write and clear the buffer, counts are kept for the next run on failure or cancellation"""
+        if not cls._pending:
+            return
+        # Swapped before the first await: views counted meanwhile go to the new buffer
+        pending, cls._pending = cls._pending, Counter()
+
+        try:
+            async with new_async_session() as session:
+                items = sorted(pending.items())
+                for start in range(0, len(items), FLUSH_BATCH_ROWS):
+                    await session.execute(_upsert(items[start:start + FLUSH_BATCH_ROWS]))
+                await session.commit()
+        except BaseException:
+            # Also when cancelled (BackgroundRunner.stop at shutdown): the final flush writes them
+            cls._pending.update(pending)
+            raise
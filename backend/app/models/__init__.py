@@ -4,4 +4,7 @@ from app.models.product import Product
 from app.models.user_order import Order
 from app.models.cart import CartItem
 from app.models.todo import Todo
-from app.models.seller import SellerOrder, Seller
\ No newline at end of file
+from app.models.seller import SellerOrder, Seller
+from app.models.outbox import OutboxEvent
+from app.models.seller_stats import SellerDailyStats, SellerProductDailyStats
+from app.models.product_views import ProductDailyViews
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint, DateTime, func
 from sqlalchemy.orm import relationship
 from app.db import Base
 
@@ -11,4 +11,20 @@ class CartItem(Base):
     product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
     quantity = Column(Integer, nullable=False, default=1)
 
-    product = relationship("Product", lazy="joined") 
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False, index=True)
+
+    product = relationship("Product", lazy="joined")
+
+
+class CartItemArchive(Base):
+    """Cart lines removed by the cleanup job (app/cart_cleanup.py)"""
+    __tablename__ = "cart_item_archive"
+
+    id = Column(Integer, primary_key=True, autoincrement=False)  # id the line had in cart_item
+    owner_id = Column(Integer, nullable=False, index=True)
+    product_id = Column(Integer, nullable=False)
+    quantity = Column(Integer, nullable=False)
+    updated_at = Column(DateTime(timezone=True), nullable=False)
+    reason = Column(String, nullable=False)  # "abandoned" or "inactive_product"
+    archived_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, BigInteger, Integer, String, Text, DateTime, func
+from sqlalchemy.dialects.postgresql import JSONB
+from app.db import Base
+
+
+class OutboxEvent(Base):
+    """Side effect written in the same transaction as the change it belongs to"""
+    __tablename__ = "outbox_event"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    topic = Column(String, nullable=False)
+    payload = Column(JSONB, nullable=False)
+    attempts = Column(Integer, nullable=False, server_default="0")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
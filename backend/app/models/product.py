@@ -23,6 +23,8 @@ class Product(Base):
     price = Column(Float, nullable=False, default=0.0)
     stock = Column(Integer, nullable=False, default=0)
     is_active = Column(Boolean, default=True)
+    # Set when the seller takes the product off sale; checkout's sold-out toggle of is_active leaves it alone
+    delisted_at = Column(DateTime(timezone=True), nullable=True)
     image = Column(String, nullable=True)
     rating = Column(Float, nullable=False, default=0.0)
     reviews = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,14 @@
+from sqlalchemy import BigInteger, Column, Date, ForeignKey, Integer
+from app.db import Base
+
+
+class ProductDailyViews(Base):
+    """
+    Product detail views per UTC day. Written only by app/core/view_counter.py,
+    which buffers views in each API process and adds them in batches.
+    """
+    __tablename__ = "product_daily_views"
+
+    product_id = Column(Integer, ForeignKey("product.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    views = Column(BigInteger, nullable=False, default=0, server_default="0")
@@ -1,5 +1,5 @@
 # models/seller.py
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Enum as SqlEnum, Float
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Enum as SqlEnum, Float, Index
 from sqlalchemy.orm import relationship
 from app.db import Base
 from enum import Enum
@@ -43,14 +43,21 @@ class Seller(Base):
     owner = relationship("User", back_populates="seller")
     products = relationship("Product", back_populates="seller")
     order_items = relationship("OrderItem", back_populates="seller")
+    seller_orders = relationship("SellerOrder", back_populates="seller")
 
 
 ## SELLER ORDER
 class SellerOrder(Base):
     __tablename__ = "seller_orders"
+    __table_args__ = (
+        # Seller inbox: one seller's orders by status, newest first
+        Index("ix_seller_orders_seller_id_status_created_at", "seller_id", "status", "created_at"),
+    )
 
     id = Column(Integer, primary_key=True, autoincrement=True)
-    owner_id = Column(Integer, ForeignKey("user.id"), nullable=False)
+    owner_id = Column(Integer, ForeignKey("user.id"), nullable=False)  # the buyer
+    seller_id = Column(Integer, ForeignKey("sellers.id"), nullable=True)  # null only for rows the backfill could not match
+    order_id = Column(Integer, ForeignKey("orders.id", ondelete="CASCADE"), nullable=True, index=True)
     owner_name = Column(String, nullable=False)
     total_price = Column(Float, nullable=False, default=0.0)
     status = Column(
@@ -64,5 +71,7 @@ class SellerOrder(Base):
 
     # Relationships
     owner = relationship("User", back_populates="seller_orders")
+    seller = relationship("Seller", back_populates="seller_orders")
+    order = relationship("Order", back_populates="seller_orders")
     shipping_address = relationship("OrderAddress", uselist=False, back_populates="seller_order", cascade="all, delete-orphan")
 
@@ -0,0 +1,38 @@
+from sqlalchemy import Column, Integer, String, Float, Date, ForeignKey
+from app.db import Base
+
+
+class SellerProductDailyStats(Base):
+    """
+    Sales of one product on one day (UTC, by order date), maintained by
+    app/core/seller_stats.py from the order.placed outbox events and in the
+    same transaction as cancellations. Cancelled lines stay in units/revenue
+    and are also counted in cancelled_units/cancelled_revenue.
+    """
+    __tablename__ = "seller_product_daily_stats"
+
+    # Key order serves "one seller, a range of days"
+    seller_id = Column(Integer, ForeignKey("sellers.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    product_id = Column(Integer, ForeignKey("product.id"), primary_key=True)
+    category = Column(String, nullable=True)
+
+    orders = Column(Integer, nullable=False, default=0, server_default="0")
+    units = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Float, nullable=False, default=0.0, server_default="0")
+    cancelled_units = Column(Integer, nullable=False, default=0, server_default="0")
+    cancelled_revenue = Column(Float, nullable=False, default=0.0, server_default="0")
+
+
+class SellerDailyStats(Base):
+    """Per seller and day; `orders` counts distinct orders, which product rows cannot"""
+    __tablename__ = "seller_daily_stats"
+
+    seller_id = Column(Integer, ForeignKey("sellers.id"), primary_key=True)
+    day = Column(Date, primary_key=True)
+
+    orders = Column(Integer, nullable=False, default=0, server_default="0")
+    units = Column(Integer, nullable=False, default=0, server_default="0")
+    revenue = Column(Float, nullable=False, default=0.0, server_default="0")
+    cancelled_units = Column(Integer, nullable=False, default=0, server_default="0")
+    cancelled_revenue = Column(Float, nullable=False, default=0.0, server_default="0")
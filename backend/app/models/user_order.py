@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, func, Enum as SqlEnum
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, DateTime, func, Enum as SqlEnum, Index, text
 from sqlalchemy.orm import relationship
 from app.db import Base
 from enum import Enum
@@ -32,10 +32,23 @@ class OrderAddress(Base):
 
 class Order(Base):
     __tablename__ = "orders"
+    __table_args__ = (
+        # Only unpaid orders are scanned by the expiry job
+        Index("ix_orders_pending_created_at", "created_at", postgresql_where=text("status = 'pending'")),
+        # Order history pages are a range scan over one buyer's ids
+        Index("ix_orders_owner_id_id", "owner_id", "id"),
+        # One order per async checkout token, however often the command is redelivered
+        Index("ix_orders_checkout_token", "checkout_token", unique=True),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
     owner_id = Column(Integer, ForeignKey("user.id"), nullable=False)
     owner_name = Column(String, nullable=False)
     total_price = Column(Float, nullable=False, default=0.0)
+    # Denormalized at checkout so order lists never touch order_item
+    item_count = Column(Integer, nullable=False, default=0, server_default="0")
+    first_item_image = Column(String, nullable=True)
+    # Stream token of the async checkout command that placed the order
+    checkout_token = Column(String(32), nullable=True)
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     status = Column(
@@ -51,6 +64,7 @@ class Order(Base):
 
     owner = relationship("User", back_populates="orders")
     items = relationship("OrderItem", back_populates="order", cascade="all, delete-orphan")
+    seller_orders = relationship("SellerOrder", back_populates="order", cascade="all, delete-orphan")
     shipping_address = relationship(
         "OrderAddress",
         uselist=False,
@@ -61,8 +75,12 @@ class Order(Base):
 
 class OrderItem(Base):
     __tablename__ = "order_item"
+    __table_args__ = (
+        # Seller exports and stats walk one seller's lines in order id order
+        Index("ix_order_item_seller_id_order_id", "seller_id", "order_id"),
+    )
     id = Column(Integer, primary_key=True, autoincrement=True)
-    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False)
+    order_id = Column(Integer, ForeignKey("orders.id"), nullable=False, index=True)
     seller_id = Column(Integer, ForeignKey("sellers.id"), nullable=False)
     product_id = Column(Integer, ForeignKey("product.id"), nullable=False)
     quantity = Column(Integer, nullable=False)
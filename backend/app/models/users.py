@@ -1,4 +1,4 @@
-from sqlalchemy import Integer, Column, String, Enum as SQLEnum
+from sqlalchemy import Integer, Column, String, DateTime, func, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from fastapi_users.db import SQLAlchemyBaseUserTable
 from app.db import Base
@@ -16,6 +16,7 @@ class User(SQLAlchemyBaseUserTable[int], Base):
     first_name = Column(String, nullable=False)
     last_name = Column(String, nullable=False)
     role = Column(SQLEnum(UserRole), nullable=False, default=UserRole.customer)
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False)
 
     todos = relationship("Todo", back_populates="owner", cascade="all, delete-orphan")
     orders = relationship("Order", back_populates="owner")
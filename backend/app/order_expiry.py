@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+
+from redis.asyncio import Redis
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from app.core import outbox
+from app.core.config import settings
+from app.core.engine import new_async_session
+from app.core.flash_sale import FlashSale
+from app.core.order_state import cancel_items, release_flash_after_commit
+from app.core.product_cache import ProductCache
+from app.core.redis import RedisClient
+from app.models.user_order import Order, OrderStatus
+from app.routes.checkout import SELLER_ORDERS_CACHE_KEY
+from app.routes.user_order import ORDER_CACHE_KEY, ORDERS_CACHE_KEY
+
+
+async def expire_batch(session: AsyncSession, redis: Redis, cutoff: datetime, batch_size: int) -> int:
+    """
+    Cancel up to `batch_size` orders pending since before `cutoff` in one
+    short transaction, returns how many were cancelled. SKIP LOCKED keeps
+    concurrent runs (several API processes) and buyers' own updates apart.
+    """
+    flash = FlashSale(redis)
+    stale = (
+        select(Order.id)
+        .where(Order.status == OrderStatus.PENDING, Order.created_at < cutoff)
+        .order_by(Order.created_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+        .cte("stale")
+    )
+    result = await session.execute(
+        update(Order)
+        .where(Order.id == stale.c.id)
+        .values(status=OrderStatus.CANCELLED)
+        .returning(Order.id, Order.owner_id)
+        .execution_options(synchronize_session=False)
+    )
+    orders = result.all()
+    if not orders:
+        await session.commit()
+        return 0
+
+    order_ids = [order.id for order in orders]
+    flash_quantities, product_ids, seller_ids = await cancel_items(session, flash, order_ids)
+
+    outbox.invalidate(
+        session,
+        *[SELLER_ORDERS_CACHE_KEY.format(seller_id=seller_id) for seller_id in seller_ids],
+        *[ORDER_CACHE_KEY.format(user_id=order.owner_id, order_id=order.id) for order in orders],
+        *{ORDERS_CACHE_KEY.format(user_id=order.owner_id) for order in orders},
+        *ProductCache.volatile_keys(product_ids),
+    )
+    outbox.add_event(session, outbox.ORDER_CANCELLED_TOPIC, {
+        "order_ids": order_ids,
+        "reason": "expired",
+    })
+    await session.commit()
+
+    if flash_quantities:
+        await release_flash_after_commit(session, flash, flash_quantities)
+    return len(orders)
+
+
+async def expire_stale_orders() -> None:
+    """Background job: cancel unpaid orders older than ORDER_EXPIRY_MINUTES"""
+    redis = RedisClient.get()
+    cutoff = datetime.now(timezone.utc) - timedelta(minutes=settings.order_expiry_minutes)
+    batch_size = settings.order_expiry_batch_size
+    async with new_async_session() as session:
+        total = 0
+        while (expired := await expire_batch(session, redis, cutoff, batch_size)) > 0:
+            total += expired
+            if expired < batch_size:
+                break
+        if total:
+            print(f"Expired {total} stale orders")
+            outbox.wake()
@@ -0,0 +1,163 @@
+import asyncio
+import json
+import os
+
+from redis.asyncio import Redis
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import order_stream
+from app.core.config import settings
+from app.core.engine import new_async_session
+from app.core.flash_sale import FlashSale
+from app.core.redis import RedisClient
+from app.routes.checkout import (
+    AlreadyPlaced,
+    PlacedOrder,
+    place_order,
+    release_flash_stock,
+)
+
+# Messages delivered to a worker that died are reclaimed after this long
+CLAIM_IDLE_MS = 60_000
+
+
+def _command(fields: dict) -> dict:
+    command = json.loads(fields["command"])
+    # JSON object keys are strings
+    command["reserved_flash"] = {int(pid): qty for pid, qty in command["reserved_flash"].items()}
+    return command
+
+
+async def _place(session: AsyncSession, flash: FlashSale, token: str, command: dict) -> PlacedOrder:
+    return await place_order(
+        session,
+        user_id=command["user_id"],
+        owner_name=command["owner_name"],
+        user_address_id=command["user_address_id"],
+        cart_item_ids=command["cart_item_ids"],
+        product_ids=command["product_ids"],
+        flash=flash,
+        reserved_flash=command["reserved_flash"],
+        checkout_token=token,
+    )
+
+
+async def _process_one(session: AsyncSession, flash: FlashSale, token: str, command: dict) -> dict:
+    """Place one order in its own transaction"""
+    try:
+        placed = await _place(session, flash, token, command)
+    except AlreadyPlaced as e:
+        await session.rollback()
+        return {"token": token, "status": "completed", "order_id": e.order_id}
+    except Exception as e:
+        # place_order already gave the flash-sale units back
+        await session.rollback()
+        return {"token": token, "status": "failed", "detail": str(e)}
+
+    try:
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        await release_flash_stock(flash, placed.flash_quantities)
+        return {"token": token, "status": "failed", "detail": str(e)}
+    return {"token": token, "status": "completed", "order_id": placed.order_id}
+
+
+async def process_batch(session: AsyncSession, redis: Redis, commands: dict[str, dict]) -> list[dict]:
+    """
+    Persist a batch of order commands (token -> command) with a single commit.
+    Every command runs in a savepoint so a failed one (stock ran out, bad
+    address) does not undo the others. If the commit itself fails, the batch
+    is replayed one command per transaction. A command whose token already
+    has an order (redelivered after a crash) reports that order again.
+    """
+    flash = FlashSale(redis)
+    results: list[dict] = []
+    for token, command in commands.items():
+        try:
+            async with session.begin_nested():
+                placed = await _place(session, flash, token, command)
+        except AlreadyPlaced as e:
+            results.append({"token": token, "status": "completed", "order_id": e.order_id})
+            continue
+        except Exception as e:
+            results.append({"token": token, "status": "failed", "detail": str(e)})
+            continue
+        results.append({"token": token, "status": "completed", "order_id": placed.order_id})
+
+    try:
+        await session.commit()
+    except Exception as e:
+        await session.rollback()
+        print(f"Order batch commit failed, retrying one by one: {e}")
+        retried = [
+            await _process_one(session, flash, result["token"], commands[result["token"]])
+            for result in results
+            if result["status"] == "completed"
+        ]
+        results = [result for result in results if result["status"] == "failed"] + retried
+
+    return results
+
+
+async def consume(consumer: str) -> None:
+    """Read, persist and acknowledge order commands until cancelled"""
+    redis = RedisClient.get()
+    await order_stream.ensure_group(redis)
+
+    while True:
+        # Take over messages left pending by a crashed worker before reading new ones
+        _, claimed, *_ = await redis.xautoclaim(
+            order_stream.ORDER_STREAM_KEY,
+            order_stream.ORDER_STREAM_GROUP,
+            consumer,
+            min_idle_time=CLAIM_IDLE_MS,
+            count=settings.order_worker_batch_size,
+        )
+        messages = [(message_id, fields) for message_id, fields in claimed if fields]
+        if not messages:
+            response = await redis.xreadgroup(
+                order_stream.ORDER_STREAM_GROUP,
+                consumer,
+                {order_stream.ORDER_STREAM_KEY: ">"},
+                count=settings.order_worker_batch_size,
+                block=5000,
+            )
+            messages = response[0][1] if response else []
+        if not messages:
+            continue
+
+        # Redelivered messages are replayed too: the order's checkout_token,
+        # committed with it, tells place_order the command already went through
+        commands = {fields["token"]: _command(fields) for _, fields in messages}
+
+        try:
+            async with new_async_session() as session:
+                results = await process_batch(session, redis, commands)
+        except Exception as e:
+            # Left pending; another worker (or this one) reclaims the batch later
+            print(f"Order worker {consumer} failed a batch: {e}")
+            await asyncio.sleep(1)
+            continue
+
+        # Cache invalidations were committed to the outbox with the orders
+        await order_stream.publish_result(redis, results)
+
+        ids = [message_id for message_id, _ in messages]
+        pipe = redis.pipeline(transaction=True)
+        pipe.xack(order_stream.ORDER_STREAM_KEY, order_stream.ORDER_STREAM_GROUP, *ids)
+        pipe.xdel(order_stream.ORDER_STREAM_KEY, *ids)
+        await pipe.execute()
+
+
+async def run_worker(consumer: str) -> None:
+    await RedisClient.init()
+    try:
+        await consume(consumer)
+    finally:
+        await RedisClient.close()
+
+
+def start_worker(index: int) -> None:
+    """Process entry point used by worker.py"""
+    asyncio.run(run_worker(f"{os.uname().nodename}-{os.getpid()}-{index}"))
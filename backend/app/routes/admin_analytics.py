@@ -0,0 +1,363 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import func
+from sqlalchemy.future import select
+from typing import List, Optional
+from datetime import date, datetime, timedelta, timezone
+
+from app.db import get_async_session
+from app.models.users import User
+from app.schemas.admin_analytics import (
+    PlatformDailyGmvRead,
+    OrderStatusCountRead,
+    DailySignupsRead,
+    CategorySalesRead,
+    SellerFunnelStageRead,
+)
+from app.schemas.product import CategoryLiteral
+from app.schemas.seller import OrderValueDistributionRead
+from app.core.dependencies import admin_required
+
+import json
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.core.cache import CacheManager
+from app.core import order_values
+from app.analytics import analytics_enabled
+from app.analytics.engine import ANALYTICS_REPORTS_CACHE_KEY, run_report
+from app.core.admin_views import (
+    ADMIN_ANALYTICS_CACHE_KEY,
+    ADMIN_ANALYTICS_REFRESHED_KEY,
+    daily_category_sales,
+    daily_gmv,
+    daily_signups,
+    orders_by_status,
+    seller_funnel,
+)
+
+router = APIRouter(prefix="/admin/analytics", tags=["admin"])
+
+# Views only change when the refresh job runs, which also drops this cache
+ADMIN_ANALYTICS_TTL = int(settings.admin_analytics_refresh_interval)
+ADMIN_ANALYTICS_MAX_DAYS = 366 * 2
+ANALYTICS_REPORTS_TTL = int(settings.analytics_extract_interval)
+ORDER_VALUES_CACHE_KEY = "admin_analytics:order_values"  # hash: one field per scope/range
+ORDER_VALUES_TTL = 60  # digests change with every order
+MONTH_PATTERN = r"^\d{4}-(0[1-9]|1[0-2])$"
+
+
+def _range(since: Optional[date], until: Optional[date]) -> tuple[date, date]:
+    """Inclusive day range, the last 30 days by default"""
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=29)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if (until - since).days >= ADMIN_ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {ADMIN_ANALYTICS_MAX_DAYS} days")
+    return since, until
+
+
+async def _respond(cache: CacheManager, cache_field: str, encoded: str) -> Response:
+    """Cache a view response and tell the client how fresh the views are"""
+    await cache.set_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field, encoded, ttl=ADMIN_ANALYTICS_TTL)
+    return await _cached_response(cache, encoded)
+
+
+async def _cached_response(cache: CacheManager, encoded: str) -> Response:
+    refreshed_at = await cache.get(ADMIN_ANALYTICS_REFRESHED_KEY)
+    headers = {"X-Refreshed-At": refreshed_at} if refreshed_at else None
+    return Response(content=encoded, media_type="application/json", headers=headers)
+
+
+@router.get("/gmv", response_model=List[PlatformDailyGmvRead])
+async def get_daily_gmv(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """GMV, orders and buyers per day"""
+    try:
+        since, until = _range(since, until)
+        cache = CacheManager(redis)
+        cache_field = f"gmv:{since}:{until}"
+
+        cached = await cache.get_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field)
+        if cached:
+            return await _cached_response(cache, cached)
+
+        result = await session.execute(
+            select(daily_gmv).where(daily_gmv.c.day.between(since, until)).order_by(daily_gmv.c.day)
+        )
+        data = [
+            PlatformDailyGmvRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        return await _respond(cache, cache_field, json.dumps(data))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/orders-by-status", response_model=List[OrderStatusCountRead])
+async def get_orders_by_status(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    """Number and value of all orders per status"""
+    try:
+        cache = CacheManager(redis)
+        cache_field = "orders_by_status"
+
+        cached = await cache.get_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field)
+        if cached:
+            return await _cached_response(cache, cached)
+
+        result = await session.execute(select(orders_by_status).order_by(orders_by_status.c.status))
+        data = [
+            OrderStatusCountRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        return await _respond(cache, cache_field, json.dumps(data))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/signups", response_model=List[DailySignupsRead])
+async def get_daily_signups(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """New users and seller registrations per day"""
+    try:
+        since, until = _range(since, until)
+        cache = CacheManager(redis)
+        cache_field = f"signups:{since}:{until}"
+
+        cached = await cache.get_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field)
+        if cached:
+            return await _cached_response(cache, cached)
+
+        result = await session.execute(
+            select(daily_signups)
+            .where(daily_signups.c.day.between(since, until))
+            .order_by(daily_signups.c.day)
+        )
+        data = [
+            DailySignupsRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        return await _respond(cache, cache_field, json.dumps(data))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/categories", response_model=List[CategorySalesRead])
+async def get_top_categories(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Categories by net revenue in the range"""
+    try:
+        since, until = _range(since, until)
+        cache = CacheManager(redis)
+        cache_field = f"categories:{since}:{until}:{limit}"
+
+        cached = await cache.get_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field)
+        if cached:
+            return await _cached_response(cache, cached)
+
+        view = daily_category_sales
+        revenue = func.sum(view.c.revenue)
+        result = await session.execute(
+            select(
+                view.c.category,
+                func.sum(view.c.orders).label("orders"),
+                func.sum(view.c.units).label("units"),
+                revenue.label("revenue"),
+            )
+            .where(view.c.day.between(since, until))
+            .group_by(view.c.category)
+            .order_by(revenue.desc())
+            .limit(limit)
+        )
+        data = [
+            CategorySalesRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        return await _respond(cache, cache_field, json.dumps(data))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/seller-funnel", response_model=List[SellerFunnelStageRead])
+async def get_seller_funnel(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    """Sellers registered → approved → listing products → selling, then pending and declined"""
+    try:
+        cache = CacheManager(redis)
+        cache_field = "seller_funnel"
+
+        cached = await cache.get_field(ADMIN_ANALYTICS_CACHE_KEY, cache_field)
+        if cached:
+            return await _cached_response(cache, cached)
+
+        result = await session.execute(
+            select(seller_funnel.c.stage, seller_funnel.c.sellers).order_by(seller_funnel.c.position)
+        )
+        data = [
+            SellerFunnelStageRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        return await _respond(cache, cache_field, json.dumps(data))
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/order-values", response_model=OrderValueDistributionRead)
+async def get_order_values(
+    _: User = Depends(admin_required),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+    category: Optional[CategoryLiteral] = Query(None),
+):
+    """Order value quantiles for the platform, or the category's part of each order"""
+    try:
+        since, until = _range(since, until)
+        if (until - since).days >= settings.order_value_retention_days:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Order value digests are kept for {settings.order_value_retention_days} days",
+            )
+        scope = f"category:{category}" if category else "all"
+        cache = CacheManager(redis)
+        cache_field = f"{scope}:{since}:{until}"
+
+        cached = await cache.get_field(ORDER_VALUES_CACHE_KEY, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        digest = await order_values.distribution(redis, scope, since, until)
+        data = OrderValueDistributionRead(
+            since=since, until=until, **order_values.summarize(digest)
+        ).model_dump(mode="json")
+
+        encoded = json.dumps(data)
+        await cache.set_field(ORDER_VALUES_CACHE_KEY, cache_field, encoded, ttl=ORDER_VALUES_TTL)
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/order-values/rebuild")
+async def rebuild_order_values(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    """Recreate the order value digests from orders, e.g. after losing Redis data"""
+    try:
+        digests = await order_values.rebuild(session, redis)
+        await CacheManager(redis).invalidate(ORDER_VALUES_CACHE_KEY)
+        return {"success": True, "digests": digests}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+async def _report(redis, name: str, since: Optional[str], until: Optional[str]) -> Response:
+    """Serve a report computed over the monthly extracts, cached until the next extract"""
+    if not analytics_enabled():
+        raise HTTPException(status_code=503, detail="Analytics reports need the optional numpy dependency")
+
+    cache = CacheManager(redis)
+    cache_field = f"{name}:{since}:{until}"
+    cached = await cache.get_field(ANALYTICS_REPORTS_CACHE_KEY, cache_field)
+    if cached:
+        return Response(content=cached, media_type="application/json")
+
+    encoded = json.dumps(await run_report(name, since=since, until=until))
+    await cache.set_field(ANALYTICS_REPORTS_CACHE_KEY, cache_field, encoded, ttl=ANALYTICS_REPORTS_TTL)
+    return Response(content=encoded, media_type="application/json")
+
+
+@router.get("/reports/cohorts")
+async def get_cohort_report(
+    _: User = Depends(admin_required),
+    redis=Depends(get_redis),
+    since: Optional[str] = Query(None, pattern=MONTH_PATTERN),  # YYYY-MM
+    until: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+):
+    """Monthly buyer cohorts and the share of each ordering again in later months"""
+    try:
+        return await _report(redis, "cohorts", since, until)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/reports/repeat-purchases")
+async def get_repeat_purchase_report(
+    _: User = Depends(admin_required),
+    redis=Depends(get_redis),
+    since: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    until: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+):
+    """Repeat purchase rate, orders per buyer and days to the second order"""
+    try:
+        return await _report(redis, "repeat_purchases", since, until)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/reports/revenue-distribution")
+async def get_revenue_distribution_report(
+    _: User = Depends(admin_required),
+    redis=Depends(get_redis),
+    since: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+    until: Optional[str] = Query(None, pattern=MONTH_PATTERN),
+):
+    """Order value percentiles and histogram, lines and units per order"""
+    try:
+        return await _report(redis, "revenue_distribution", since, until)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
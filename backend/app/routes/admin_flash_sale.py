@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Body
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_async_session
+from app.models.users import User
+from app.core.dependencies import admin_required
+from app.core.redis import get_redis
+from app.core.flash_sale import FlashSale
+from app.core.product_cache import ProductCache
+
+router = APIRouter(prefix="/admin/flash-sale", tags=["admin"])
+
+
+@router.get("")
+async def get_flash_sales(
+    _: User = Depends(admin_required),
+    redis=Depends(get_redis),
+):
+    """Active flash sales with the stock left in Redis"""
+    try:
+        return await FlashSale(redis).status()
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/{product_id}")
+async def start_flash_sale(
+    product_id: int,
+    rate: float = Body(100.0, embed=True, gt=0),  # checkouts admitted per second
+    burst: int = Body(200, embed=True, ge=1),     # short spikes allowed above the rate
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    try:
+        stock = await FlashSale(redis).start(session, product_id, rate, burst)
+
+        return {"success": True, "product_id": product_id, "stock": stock}
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{product_id}")
+async def stop_flash_sale(
+    product_id: int,
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    try:
+        await FlashSale(redis).stop(session, product_id)
+        await ProductCache(redis).invalidate_volatile([product_id])
+
+        return {"success": True, "message": "Flash sale ended"}
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -11,6 +11,7 @@ from app.models.users import User, UserRole
 from app.core.dependencies import admin_required
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
+from app.core import outbox
 import json
 
 router = APIRouter(prefix="/admin/seller", tags=["admin"])
@@ -116,15 +117,14 @@ async def toggle_seller_status(
             seller.owner.role = UserRole.seller if status == SellerStatus.approved else UserRole.customer
             session.add(seller.owner)
 
+        # 🔄 Invalidate cache once the change is committed
+        outbox.invalidate(session, ADMIN_SELLERS_CACHE_KEY, ADMIN_SELLER_CACHE_KEY.format(id=seller.id))
+
         # Commit changes
         session.add(seller)
         await session.commit()
         await session.refresh(seller)
-
-        # 🔄 Invalidate cache using your CacheManager
-        cache = CacheManager(redis)
-        await cache.invalidate(ADMIN_SELLERS_CACHE_KEY)
-        await cache.invalidate(ADMIN_SELLER_CACHE_KEY.format(id=seller.id))
+        outbox.wake()
 
         return SellerRead.model_validate(seller)
 
@@ -10,6 +10,7 @@ from app.core.dependencies import admin_required
 import json
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
+from app.core import outbox
 
 router = APIRouter(prefix="/admin/users", tags=["admin"])
 
@@ -101,8 +102,6 @@ async def delete_user(
     redis=Depends(get_redis),
 ):
     try:
-        cache = CacheManager(redis)
-
         user = await session.get(User, user_id)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -117,11 +116,10 @@ async def delete_user(
             )
 
         await session.delete(user)
+        # Invalidate cache once committed
+        outbox.invalidate(session, ADMIN_USERS_CACHE_KEY, ADMIN_USER_CACHE_KEY.format(id=user_id))
         await session.commit()
-
-        # Invalidate cache
-        await cache.invalidate(ADMIN_USERS_CACHE_KEY)
-        await cache.invalidate(ADMIN_USER_CACHE_KEY.format(id=user_id))
+        outbox.wake()
 
         return {"success": True, "message": "User successfully deleted"}
 
@@ -138,8 +136,6 @@ async def update_user_role(
     redis=Depends(get_redis),
 ):
     try:
-        cache = CacheManager(redis)
-
         # Prevent admin from changing their own role
         if current_admin.id == user_id:
             raise HTTPException(
@@ -158,12 +154,11 @@ async def update_user_role(
             )
 
         user.role = role
+        # Invalidate caches once committed
+        outbox.invalidate(session, ADMIN_USERS_CACHE_KEY, ADMIN_USER_CACHE_KEY.format(id=user_id))
         await session.commit()
         await session.refresh(user)
-
-        # Invalidate caches
-        await cache.invalidate(ADMIN_USERS_CACHE_KEY)
-        await cache.invalidate(ADMIN_USER_CACHE_KEY.format(id=user_id))
+        outbox.wake()
 
         return {
             "success": True,
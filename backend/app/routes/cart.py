@@ -1,25 +1,35 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import Integer, and_, case, column, delete, func, literal, literal_column, values
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from app.db import get_async_session
 from app.models.product import Product
 from app.models.cart import CartItem
-from app.schemas.cart import CartItemCreate, CartItemRead, CartItemUpdate
+from app.models.seller import Seller
+from app.schemas.cart import (
+    CartItemCreate,
+    CartItemRead,
+    CartItemUpdate,
+    CartBulkUpdate,
+    CartBulkResult,
+    CartSummary,
+)
 from app.routes.users import fastapi_users
 from app.models.users import User
-from typing import List
+from typing import List, Optional
 
 from redis.asyncio import Redis
 import json
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
 
-router = APIRouter(prefix="/cart/items", tags=["cart"])
+router = APIRouter(prefix="/cart", tags=["cart"])
 
-CARTS_CACHE_KEY = "carts:{user_id}" 
+CARTS_CACHE_KEY = "carts:{user_id}"  # hash: one field per page + "summary"
 
-@router.get("", response_model=List[CartItemRead])
+@router.get("/items", response_model=List[CartItemRead])
 async def get_cart_items(
     current_user: User = Depends(fastapi_users.current_user()),
     session: AsyncSession = Depends(get_async_session),
@@ -30,10 +40,11 @@ async def get_cart_items(
     try:
         cache = CacheManager(redis)
         offset = (page - 1) * limit  # calculate offset from page
-        cache_key = f"CARTS:{current_user.id}:page:{page}:limit:{limit}"
+        cache_key = CARTS_CACHE_KEY.format(user_id=current_user.id)
+        cache_field = f"page:{page}:limit:{limit}"
 
         # 1️⃣ Check cache first
-        cached = await cache.get(cache_key)
+        cached = await cache.get_field(cache_key, cache_field)
         if cached:
             return [CartItemRead(**c) for c in json.loads(cached)]
 
@@ -50,7 +61,7 @@ async def get_cart_items(
         data = [CartItemRead.model_validate(c).model_dump() for c in items]
 
         # 3️⃣ Save to cache (with datetime serialization fix)
-        await cache.set(cache_key, json.dumps(data, default=str))
+        await cache.set_field(cache_key, cache_field, json.dumps(data, default=str))
 
         return data
 
@@ -58,7 +69,7 @@ async def get_cart_items(
         raise HTTPException(status_code=500, detail=str(e))
     
 
-@router.get("/{cart_item_id}", response_model=CartItemRead)
+@router.get("/items/{cart_item_id}", response_model=CartItemRead)
 async def get_cart_item(
     cart_item_id: int,
     session: AsyncSession = Depends(get_async_session),
@@ -81,60 +92,173 @@ async def get_cart_item(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.post("", response_model=CartItemRead)
+def _cart_lines_statement(owner_id: int, lines: dict[int, int], mode: str):
+    """
+    Build one statement that upserts (and in "set" mode deletes) cart lines.
+    Each requested line comes back with its outcome: upserted row, removed, or
+    neither (unknown product / not enough stock).
+    """
+    cart = CartItem.__table__
+    product = Product.__table__
+
+    requested = select(
+        values(column("product_id", Integer), column("quantity", Integer), name="requested")
+        .data(list(lines.items()))
+    ).cte("lines")
+
+    # Insert new lines, bump or overwrite existing ones, but only while in stock
+    insert = pg_insert(cart).from_select(
+        ["owner_id", "product_id", "quantity"],
+        select(literal(owner_id), product.c.id, requested.c.quantity)
+        .join_from(requested, product, product.c.id == requested.c.product_id)
+        .where(requested.c.quantity > 0, product.c.stock >= requested.c.quantity),
+    )
+    new_quantity = cart.c.quantity + insert.excluded.quantity if mode == "add" else insert.excluded.quantity
+    # `excluded` is spelled out so it is not pulled into the subquery's FROM
+    stock = (
+        select(product.c.stock)
+        .where(product.c.id == literal_column("excluded.product_id"))
+        .scalar_subquery()
+    )
+    upserted = (
+        insert.on_conflict_do_update(
+            constraint="unique_cart_item_per_user",
+            set_={"quantity": new_quantity, "updated_at": func.now()},
+            where=stock >= new_quantity,
+        )
+        .returning(cart.c.id, cart.c.product_id, cart.c.quantity)
+        .cte("upserted")
+    )
+
+    columns = [
+        requested.c.product_id,
+        requested.c.quantity.label("requested"),
+        upserted.c.id,
+        upserted.c.quantity,
+        product.c.name,
+        product.c.price,
+        product.c.image,
+    ]
+    stmt = (
+        select(*columns)
+        .select_from(requested)
+        .outerjoin(upserted, upserted.c.product_id == requested.c.product_id)
+        .outerjoin(product, product.c.id == requested.c.product_id)
+    )
+
+    if mode == "set":
+        removed = (
+            delete(cart)
+            .where(
+                cart.c.owner_id == owner_id,
+                cart.c.product_id == requested.c.product_id,
+                requested.c.quantity == 0,
+            )
+            .returning(cart.c.product_id)
+            .cte("removed")
+        )
+        stmt = stmt.add_columns(removed.c.product_id.label("removed_id")).outerjoin(
+            removed, removed.c.product_id == requested.c.product_id
+        )
+
+    return stmt
+
+
+def _cart_item_read(row) -> dict:
+    return {
+        "id": row.id,
+        "quantity": row.quantity,
+        "product": {"id": row.product_id, "name": row.name, "price": row.price, "image": row.image},
+    }
+
+
+@router.post("/items", response_model=CartItemRead)
 async def add_to_cart(
     item: CartItemCreate,
     session: AsyncSession = Depends(get_async_session),
     current_user: User = Depends(fastapi_users.current_user()),
     redis: Redis = Depends(get_redis)
 ):
+    """
+    Add a product to the cart in a single INSERT ... ON CONFLICT statement.
+    Concurrent double-clicks increment the same row instead of racing
+    on the unique constraint.
+    """
     try:
         cache = CacheManager(redis)
-        # 1️⃣ Check product
+
+        # 1️⃣ Upsert with stock check
         result = await session.execute(
-            select(Product).where(Product.id == item.product_id)
+            _cart_lines_statement(current_user.id, {item.product_id: item.quantity}, "add")
         )
-        product = result.scalars().first()
+        row = result.first()
 
-        if not product:
-            raise HTTPException(404, "Product not found")
-
-        if product.stock < item.quantity:
+        # 2️⃣ Nothing written: tell a missing product from a stock problem
+        if row.id is None:
+            await session.rollback()
+            if row.name is None:
+                raise HTTPException(404, "Product not found")
             raise HTTPException(400, "Not enough stock")
 
-        # 2️⃣ Check existing cart item
-        result = await session.execute(
-            select(CartItem)
-            .where(CartItem.product_id == item.product_id)
-            .where(CartItem.owner_id == current_user.id)
-        )
-        existing_item = result.scalars().first()
-
-        if existing_item:
-            existing_item.quantity += item.quantity
-            session.add(existing_item)
-        else:
-            existing_item = CartItem(
-                owner_id=current_user.id,
-                product_id=item.product_id,
-                quantity=item.quantity
-            )
-            session.add(existing_item)
-
         # 3️⃣ Commit to DB
         await session.commit()
-        await session.refresh(existing_item)
         await cache.invalidate(CARTS_CACHE_KEY.format(user_id=current_user.id))
 
-        return existing_item
+        return _cart_item_read(row)
 
+    except HTTPException:
+        raise
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/items/bulk", response_model=CartBulkResult)
+async def bulk_update_cart(
+    body: CartBulkUpdate,
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(fastapi_users.current_user()),
+    redis: Redis = Depends(get_redis)
+):
+    """
+    Add, update or remove many cart lines in one statement
+    ("buy again", merging a guest cart after login).
+    """
+    try:
+        cache = CacheManager(redis)
+
+        # Collapse duplicate products: "add" sums them, "set" keeps the last one
+        lines: dict[int, int] = {}
+        for line in body.items:
+            if body.mode == "add":
+                lines[line.product_id] = lines.get(line.product_id, 0) + line.quantity
+            else:
+                lines[line.product_id] = line.quantity
+
+        if body.mode == "add":
+            lines = {product_id: quantity for product_id, quantity in lines.items() if quantity > 0}
+            if not lines:
+                return {"items": [], "removed": [], "rejected": []}
+
+        result = await session.execute(_cart_lines_statement(current_user.id, lines, body.mode))
+        rows = result.all()
+        await session.commit()
+        await cache.invalidate(CARTS_CACHE_KEY.format(user_id=current_user.id))
+
+        return {
+            "items": [_cart_item_read(r) for r in rows if r.id is not None],
+            # Only lines the delete actually hit; a zero for a product not in the cart is a no-op
+            "removed": [r.product_id for r in rows if body.mode == "set" and r.removed_id is not None],
+            "rejected": [r.product_id for r in rows if r.id is None and r.requested > 0],
+        }
+
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
 
-@router.put("/{cart_item_id}", response_model=CartItemRead)
+
+@router.put("/items/{cart_item_id}", response_model=CartItemRead)
 async def update_quantity(
     cart_item_id: int,
     item: CartItemUpdate,
@@ -196,7 +320,7 @@ async def update_quantity(
         raise HTTPException(status_code=500, detail=str(e))
 
 
-@router.delete("/{cart_item_id}")
+@router.delete("/items/{cart_item_id}")
 async def remove_product(
     cart_item_id: int,
     session: AsyncSession = Depends(get_async_session),
@@ -235,3 +359,107 @@ async def remove_product(
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+def _line_issue(row) -> Optional[str]:
+    if row.is_active is False:
+        return "inactive"
+    if row.stock <= 0:
+        return "out_of_stock"
+    if row.stock < row.quantity:
+        return "insufficient_stock"
+    return None
+
+
+@router.get("/summary", response_model=CartSummary)
+async def get_cart_summary(
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+    cart_item_ids: Optional[List[int]] = Query(None),  # validate a checkout selection
+):
+    """
+    Totals per seller, item count and per-line stock problems for the cart,
+    computed in one query. The full-cart summary is cached with the cart pages
+    and dropped by every cart write.
+    """
+    try:
+        cache = CacheManager(redis)
+        cache_key = CARTS_CACHE_KEY.format(user_id=current_user.id)
+
+        # 1️⃣ Check cache first (only the full cart is cached)
+        if not cart_item_ids:
+            cached = await cache.get_field(cache_key, "summary")
+            if cached:
+                return json.loads(cached)
+
+        # 2️⃣ One query: lines joined with products, seller totals as window sums
+        line_total = Product.price * CartItem.quantity
+        available = and_(Product.is_active.is_not(False), Product.stock >= CartItem.quantity)
+        per_seller = {"partition_by": Product.seller_id}
+
+        stmt = (
+            select(
+                CartItem.id,
+                CartItem.product_id,
+                CartItem.quantity,
+                Product.name,
+                Product.image,
+                Product.price,
+                Product.stock,
+                Product.is_active,
+                Product.seller_id,
+                Seller.store_name,
+                line_total.label("line_total"),
+                func.sum(case((available, line_total), else_=0)).over(**per_seller).label("seller_subtotal"),
+                func.sum(case((available, CartItem.quantity), else_=0)).over(**per_seller).label("seller_item_count"),
+            )
+            .join(Product, Product.id == CartItem.product_id)
+            .join(Seller, Seller.id == Product.seller_id)
+            .where(CartItem.owner_id == current_user.id)
+            .order_by(Product.seller_id, CartItem.id)
+        )
+        if cart_item_ids:
+            stmt = stmt.where(CartItem.id.in_(cart_item_ids))
+
+        rows = (await session.execute(stmt)).all()
+
+        # 3️⃣ Shape the response
+        sellers: dict[int, dict] = {}
+        for row in rows:
+            seller = sellers.setdefault(row.seller_id, {
+                "seller_id": row.seller_id,
+                "store_name": row.store_name,
+                "item_count": row.seller_item_count,
+                "subtotal": row.seller_subtotal,
+                "lines": [],
+            })
+            issue = _line_issue(row)
+            seller["lines"].append({
+                "cart_item_id": row.id,
+                "product_id": row.product_id,
+                "name": row.name,
+                "image": row.image,
+                "quantity": row.quantity,
+                "unit_price": row.price,
+                "line_total": row.line_total,
+                "stock": row.stock,
+                "available": issue is None,
+                "issue": issue,
+            })
+
+        data = CartSummary(
+            item_count=sum(s["item_count"] for s in sellers.values()),
+            subtotal=sum(s["subtotal"] for s in sellers.values()),
+            has_issues=any(not l["available"] for s in sellers.values() for l in s["lines"]),
+            sellers=list(sellers.values()),
+        ).model_dump(mode="json")
+
+        # 4️⃣ Cache alongside the cart pages, short TTL since other buyers move stock
+        if not cart_item_ids:
+            await cache.set_field(cache_key, "summary", json.dumps(data), ttl=60)
+
+        return data
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
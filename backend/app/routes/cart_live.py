@@ -0,0 +1,116 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List
+
+from app.db import get_async_session
+from app.schemas.cart import CartItemCreate, LiveCartItemRead, LiveCartItemUpdate
+from app.routes.users import fastapi_users
+from app.models.users import User
+
+from redis.asyncio import Redis
+from app.core.redis import get_redis
+from app.core.cart_store import LiveCartStore, live_cart_enabled
+from app.core.product_cache import ProductCache
+
+router = APIRouter(prefix="/cart/live", tags=["cart"])
+
+
+def live_cart_required() -> None:
+    if not live_cart_enabled():
+        raise HTTPException(status_code=404, detail="Live cart is not enabled")
+
+
+async def _stock(session: AsyncSession, redis: Redis, product_id: int) -> int:
+    # Validated against the cached volatile record, checkout re-checks in SQL
+    product = await ProductCache(redis).get(session, product_id)
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product["stock"]
+
+
+async def _check_stock(session: AsyncSession, redis: Redis, product_id: int, quantity: int) -> None:
+    if await _stock(session, redis, product_id) < quantity:
+        raise HTTPException(status_code=400, detail="Not enough stock")
+
+
+@router.get("", response_model=List[LiveCartItemRead], dependencies=[Depends(live_cart_required)])
+async def get_live_cart(
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        lines = await LiveCartStore(redis).items(session, current_user.id)
+        products = await ProductCache(redis).get_many(session, list(lines))
+
+        return [
+            {"product_id": p["id"], "quantity": lines[p["id"]], "product": p}
+            for p in products
+        ]
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("", dependencies=[Depends(live_cart_required)])
+async def add_to_live_cart(
+    item: CartItemCreate,
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        # The line after the increment must fit in stock, checked inside the script
+        stock = await _stock(session, redis, item.product_id)
+        quantity = await LiveCartStore(redis).add(
+            session, current_user.id, item.product_id, item.quantity, limit=stock
+        )
+        if quantity is None:
+            raise HTTPException(status_code=400, detail="Not enough stock")
+
+        return {"product_id": item.product_id, "quantity": quantity}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.put("/{product_id}", dependencies=[Depends(live_cart_required)])
+async def update_live_cart_quantity(
+    product_id: int,
+    item: LiveCartItemUpdate,
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        await _check_stock(session, redis, product_id, item.quantity)
+        quantity = await LiveCartStore(redis).set(session, current_user.id, product_id, item.quantity)
+
+        return {"product_id": product_id, "quantity": quantity}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.delete("/{product_id}", dependencies=[Depends(live_cart_required)])
+async def remove_from_live_cart(
+    product_id: int,
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        removed = await LiveCartStore(redis).remove(session, current_user.id, product_id)
+        if not removed:
+            raise HTTPException(status_code=404, detail="Product not in cart")
+
+        return {"success": True, "message": "Product successfully removed from the cart"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
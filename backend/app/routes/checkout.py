@@ -1,11 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, Body, status
+from datetime import datetime
+from typing import List, NamedTuple, Optional
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import ARRAY, Integer, any_, case, column, delete, func, insert, literal, or_, update, values
 
 from app.db import get_async_session
 from app.models.users import User
+from app.models.product import Product
 from app.models.user_order import Order, OrderItem, OrderAddress
 from app.models.user_address import UserAddress
 from app.models.cart import CartItem
@@ -14,84 +16,315 @@ from app.routes.users import fastapi_users
 
 from redis.asyncio import Redis
 from app.core.redis import get_redis
-from app.core.cache import CacheManager
+from app.core.product_cache import ProductCache
+from app.core.cart_store import CART_DISCARD_TOPIC, LiveCartStore, live_cart_enabled
+from app.core.flash_sale import FlashSale
+from app.core.config import settings
+from app.core import order_stream, outbox
+from app.core.engine import new_async_session
+from app.core.order_state import release_flash_after_commit
 
-PRODUCTS_CACHE_KEY = "products:all"
-PRODUCT_CACHE_KEY = "products:{id}"
 CARTS_CACHE_KEY = "carts:{user_id}"
 ORDERS_CACHE_KEY = "orders:user:{user_id}"
-SELLER_ORDERS_CACHE_KEY = "seller_orders:all"
+SELLER_ORDERS_CACHE_KEY = "seller_orders:{seller_id}"
 
 router = APIRouter(prefix="/checkout", tags=["checkout"])
 
 
-@router.post("")
-async def checkout(
-    cart_item_ids: List[int] = Body(..., embed=True),
-    user_address_id: int = Body(..., embed=True),
-    session: AsyncSession = Depends(get_async_session),
-    current_user: User = Depends(fastapi_users.current_user()),
-    redis: Redis = Depends(get_redis),
-):
+class CheckoutError(Exception):
+    """Checkout cannot go through (bad input, stock ran out, flash sale throttling)"""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(detail)
+        self.status_code = status_code
+
+
+class AlreadyPlaced(Exception):
+    """The async checkout token already has an order: its command was delivered again"""
+
+    def __init__(self, order_id: int):
+        super().__init__(f"Order {order_id} was already placed")
+        self.order_id = order_id
+
+
+class PlacedOrder(NamedTuple):
+    order_id: int
+    total_price: float
+    created_at: datetime
+    lines: list[dict]  # one dict per order item (product_id, seller_id, quantity, total_price, ...)
+    flash_quantities: dict[int, int] = {}  # units reserved in Redis, released if the commit fails
+
+    @property
+    def product_ids(self) -> list[int]:
+        return [line["product_id"] for line in self.lines]
+
+
+def _product_columns(product):
+    return (
+        product.c.id,
+        product.c.name,
+        product.c.price,
+        product.c.image,
+        product.c.category,
+        product.c.seller_id,
+    )
+
+
+async def _reserve_stock(session: AsyncSession, quantities: dict[int, int]) -> dict[int, dict]:
+    """
+    Decrement stock for every product in one conditional UPDATE.
+    Rows are locked in product id order so concurrent checkouts touching
+    the same products queue up instead of deadlocking, and the
+    `stock >= qty` guard makes overselling impossible.
+    """
+    product = Product.__table__
+    wanted = values(column("id", Integer), column("qty", Integer), name="wanted").data(
+        sorted(quantities.items())
+    )
+    locked = (
+        select(product.c.id)
+        .where(product.c.id == any_(literal(sorted(quantities), ARRAY(Integer))))
+        .order_by(product.c.id)
+        .with_for_update()
+        .cte("locked")
+    )
+    remaining = product.c.stock - wanted.c.qty
+
+    result = await session.execute(
+        update(product)
+        .where(
+            product.c.id == wanted.c.id,
+            product.c.id == locked.c.id,
+            product.c.stock >= wanted.c.qty,
+        )
+        .values(
+            stock=remaining,
+            is_active=case((remaining <= 0, False), else_=product.c.is_active),
+        )
+        .returning(*_product_columns(product))
+    )
+    return {row.id: row._asdict() for row in result.all()}
+
+
+async def _reserve_flash_stock(flash: FlashSale, quantities: dict[int, int]) -> dict[int, int]:
+    """Take flash-sale products out of `quantities` and reserve them in Redis"""
+    flash_ids = await flash.active(list(quantities))
+    if not flash_ids:
+        return {}
+
+    flash_quantities = {pid: quantities.pop(pid) for pid in flash_ids}
+    outcome, product_id = await flash.reserve(flash_quantities)
+    if outcome == "ok":
+        return flash_quantities
+
+    # The sale just ended: fall back to the regular row update
+    if outcome == "ended":
+        quantities.update(flash_quantities)
+        return {}
+    if outcome == "throttled":
+        raise CheckoutError("Too many buyers right now, please try again", status_code=429)
+    raise CheckoutError(f"Product {product_id} is sold out")
+
+
+async def release_flash_stock(flash: FlashSale, quantities: dict[int, int]) -> None:
+    """
+    Give reserved flash-sale units back. Units of a sale that ended in the
+    meantime go back to Product.stock, in a session of their own because the
+    checkout's transaction has usually failed at this point.
+    """
+    if not quantities:
+        return
+    async with new_async_session() as session:
+        await release_flash_after_commit(session, flash, quantities)
+
+
+async def _load_cart_and_address(
+    session: AsyncSession,
+    user_id: int,
+    user_address_id: int,
+    cart_item_ids: List[int],
+    product_ids: List[int],
+) -> tuple[list, UserAddress]:
+    # 1️⃣ Cart lines, ordered by product for deterministic locking
+    result = await session.execute(
+        select(CartItem.id, CartItem.product_id, CartItem.quantity)
+        .where(
+            CartItem.owner_id == user_id,
+            or_(CartItem.id.in_(cart_item_ids), CartItem.product_id.in_(product_ids)),
+        )
+        .order_by(CartItem.product_id)
+    )
+    cart_lines = result.all()
+    if not cart_lines:
+        raise CheckoutError("No valid cart items found")
+
+    # 2️⃣ Shipping address
+    result = await session.execute(
+        select(UserAddress).where(
+            UserAddress.user_id == user_id,
+            UserAddress.id == user_address_id
+        )
+    )
+    user_address = result.scalars().first()
+    if not user_address:
+        raise CheckoutError("Invalid user address")
+
+    return cart_lines, user_address
+
+
+def _queue_checkout_events(session: AsyncSession, user_id: int, placed: PlacedOrder) -> None:
+    """Cache invalidations and the order.placed event, committed with the order"""
+    seller_ids = {line["seller_id"] for line in placed.lines}
+    # Only stock/price changed, static product documents stay cached
+    outbox.invalidate(
+        session,
+        CARTS_CACHE_KEY.format(user_id=user_id),
+        ORDERS_CACHE_KEY.format(user_id=user_id),
+        *[SELLER_ORDERS_CACHE_KEY.format(seller_id=seller_id) for seller_id in seller_ids],
+        *ProductCache.volatile_keys(placed.product_ids),
+    )
+    if live_cart_enabled():
+        outbox.add_event(session, CART_DISCARD_TOPIC, {"user_id": user_id, "product_ids": placed.product_ids})
+    outbox.add_event(session, outbox.ORDER_PLACED_TOPIC, {
+        "order_id": placed.order_id,
+        "user_id": user_id,
+        "total_price": placed.total_price,
+        "created_at": placed.created_at.isoformat(),
+        "items": [
+            {k: line[k] for k in ("product_id", "seller_id", "category", "quantity", "total_price")}
+            for line in placed.lines
+        ],
+    })
+
+
+async def place_order(
+    session: AsyncSession,
+    user_id: int,
+    owner_name: str,
+    user_address_id: int,
+    cart_item_ids: List[int],
+    product_ids: List[int],
+    flash: Optional[FlashSale] = None,
+    reserved_flash: Optional[dict[int, int]] = None,
+    checkout_token: Optional[str] = None,
+) -> PlacedOrder:
+    """
+    Turn cart lines into an order with set-based statements; the round trip
+    count does not grow with the number of items. Does not commit.
+    Products in flash-sale mode are reserved in Redis instead of locking
+    their rows; those reservations are released again if this raises.
+    Cache invalidations are queued in the outbox within the same transaction.
+    `reserved_flash` carries units already reserved by the async checkout,
+    `checkout_token` its stream token; raises AlreadyPlaced (and keeps the
+    reservation, that order holds it) when the token already has an order.
+    """
+    if checkout_token is not None:
+        await _check_token(session, checkout_token)
+
+    try:
+        cart_lines, user_address = await _load_cart_and_address(
+            session, user_id, user_address_id, cart_item_ids, product_ids
+        )
+    except Exception:
+        if reserved_flash:
+            await release_flash_stock(flash, reserved_flash)
+        raise
+
+    # 3️⃣ Flash-sale products are admitted and decremented in Redis
+    quantities = {line.product_id: line.quantity for line in cart_lines}
+    if reserved_flash is not None:
+        flash_quantities = dict(reserved_flash)
+        for product_id in flash_quantities:
+            quantities.pop(product_id, None)
+    else:
+        flash_quantities = await _reserve_flash_stock(flash, quantities) if flash else {}
+
     try:
-        cache = CacheManager(redis)
+        placed = await _create_order(
+            session, user_id, owner_name, user_address, cart_lines, quantities, flash_quantities, checkout_token
+        )
+    except Exception:
+        if flash_quantities:
+            await release_flash_stock(flash, flash_quantities)
+        raise
+
+    _queue_checkout_events(session, user_id, placed)
+    return placed
 
-        # Validate cart items
-        if not cart_item_ids:
-            raise HTTPException(status_code=400, detail="No cart items provided")
 
+async def _check_token(session: AsyncSession, checkout_token: str) -> None:
+    """
+    Serialize on the token until the end of the transaction, then look for
+    its order. A worker that reclaimed the command from a stalled one waits
+    here for that one's commit instead of running the cart a second time.
+    """
+    await session.execute(select(func.pg_advisory_xact_lock(func.hashtext(checkout_token))))
+    order_id = await session.scalar(select(Order.id).where(Order.checkout_token == checkout_token))
+    if order_id is not None:
+        raise AlreadyPlaced(order_id)
+
+
+async def _create_order(
+    session: AsyncSession,
+    user_id: int,
+    owner_name: str,
+    user_address: UserAddress,
+    cart_lines: list,
+    quantities: dict[int, int],
+    flash_quantities: dict[int, int],
+    checkout_token: Optional[str] = None,
+) -> PlacedOrder:
+    # 4️⃣ Conditional stock decrement; any missing row means not enough stock
+    products = await _reserve_stock(session, quantities) if quantities else {}
+    if len(products) != len(quantities):
         result = await session.execute(
-            select(CartItem)
-            .options(selectinload(CartItem.product))
-            .where(
-                CartItem.owner_id == current_user.id,
-                CartItem.id.in_(cart_item_ids)
-            )
+            select(Product.name).where(Product.id.in_(set(quantities) - set(products)))
         )
-        cart_items = result.scalars().all()
-        if not cart_items:
-            raise HTTPException(status_code=400, detail="No valid cart items found")
+        names = ", ".join(result.scalars().all()) or "a removed product"
+        raise CheckoutError(f"Not enough stock for {names}")
 
-        # Validate user address
+    if flash_quantities:
         result = await session.execute(
-            select(UserAddress).where(
-                UserAddress.user_id == current_user.id,
-                UserAddress.id == user_address_id
-            )
+            select(*_product_columns(Product.__table__)).where(Product.id.in_(flash_quantities))
         )
-        user_address = result.scalars().first()
-        if not user_address:
-            raise HTTPException(status_code=400, detail="Invalid user address")
-
-        total_price = 0
-        product_ids: set[int] = set()
-        seller_items: dict[int, list[CartItem]] = {}
-
-        # Group items by seller and check stock
-        for item in cart_items:
-            product = item.product
-            if product.stock < item.quantity:
-                raise HTTPException(
-                    status_code=400,
-                    detail=f"Not enough stock for {product.name}"
-                )
-            total_price += product.price * item.quantity
-            product_ids.add(product.id)
-            seller_items.setdefault(product.seller_id, []).append(item)
-
-        # Create main order
-        new_order = Order(
-            owner_id=current_user.id,
-            owner_name=" ".join(filter(None, [current_user.first_name, current_user.last_name])),
+        products.update({row.id: row._asdict() for row in result.all()})
+        quantities = {**quantities, **flash_quantities}
+
+    lines = [
+        {
+            "product_id": product_id,
+            "seller_id": products[product_id]["seller_id"],
+            "category": products[product_id]["category"],
+            "product_name": products[product_id]["name"],
+            "image": products[product_id]["image"],
+            "quantity": quantity,
+            "total_price": products[product_id]["price"] * quantity,
+        }
+        for product_id, quantity in quantities.items()
+    ]
+    seller_totals: dict[int, float] = {}
+    for line in lines:
+        seller_totals[line["seller_id"]] = seller_totals.get(line["seller_id"], 0) + line["total_price"]
+    total_price = sum(seller_totals.values())
+
+    # 5️⃣ Main order and its shipping address snapshot
+    result = await session.execute(
+        insert(Order)
+        .values(
+            owner_id=user_id,
+            owner_name=owner_name,
             status="pending",
             total_price=total_price,
+            item_count=len(lines),
+            first_item_image=lines[0]["image"] if lines else None,
+            checkout_token=checkout_token,
         )
-        session.add(new_order)
-        await session.flush()  # Get new_order.id
-
-        # Create shipping address snapshot
-        order_address = OrderAddress(
-            order_id=new_order.id,
+        .returning(Order.id, Order.created_at)
+    )
+    order_id, created_at = result.one()
+    await session.execute(
+        insert(OrderAddress).values(
+            order_id=order_id,
             recipient_name=user_address.recipient_name,
             phone=user_address.phone,
             address_line1=user_address.address_line1,
@@ -101,59 +334,195 @@ async def checkout(
             postal_code=user_address.postal_code,
             country=user_address.country or "PH",
         )
-        session.add(order_address)
+    )
+
+    # 6️⃣ Seller orders and order items, one multi-row INSERT each
+    await session.execute(
+        insert(SellerOrder),
+        [
+            {
+                "owner_id": user_id,
+                "owner_name": owner_name,
+                "seller_id": seller_id,
+                "order_id": order_id,
+                "total_price": seller_total,
+            }
+            for seller_id, seller_total in seller_totals.items()
+        ],
+    )
+    await session.execute(
+        insert(OrderItem),
+        [
+            {
+                "order_id": order_id,
+                "product_id": line["product_id"],
+                "product_name": line["product_name"],
+                "quantity": line["quantity"],
+                "total_price": line["total_price"],
+                "seller_id": line["seller_id"],
+                "image": line["image"],
+                "status": "pending",
+            }
+            for line in lines
+        ],
+    )
+
+    # 7️⃣ Remove the purchased cart lines in one statement
+    await session.execute(
+        delete(CartItem)
+        .where(CartItem.id == any_(literal([line.id for line in cart_lines], ARRAY(Integer))))
+        .execution_options(synchronize_session=False)
+    )
+
+    return PlacedOrder(
+        order_id=order_id,
+        total_price=total_price,
+        created_at=created_at,
+        lines=lines,
+        flash_quantities=flash_quantities,
+    )
+
+
+def _owner_name(user: User) -> str:
+    return " ".join(filter(None, [user.first_name, user.last_name]))
+
+
+@router.post("")
+async def checkout(
+    cart_item_ids: List[int] = Body([], embed=True),
+    product_ids: List[int] = Body([], embed=True),  # live cart lines are keyed by product
+    user_address_id: int = Body(..., embed=True),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(fastapi_users.current_user()),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        # Validate cart items
+        if not cart_item_ids and not product_ids:
+            raise HTTPException(status_code=400, detail="No cart items provided")
 
-        # Create order items and seller orders
-        for seller_id, items in seller_items.items():
-            seller_total_price = sum(item.product.price * item.quantity for item in items)
+        # Persist the live cart first so its lines exist in cart_item
+        if live_cart_enabled():
+            await LiveCartStore(redis).flush_user(session, current_user.id)
 
-            # Create seller order
-            seller_order = SellerOrder(
-                owner_id=current_user.id,
-                owner_name=" ".join(filter(None, [current_user.first_name, current_user.last_name])),
-                total_price=seller_total_price,
+        flash = FlashSale(redis)
+        try:
+            placed = await place_order(
+                session,
+                user_id=current_user.id,
+                owner_name=_owner_name(current_user),
+                user_address_id=user_address_id,
+                cart_item_ids=cart_item_ids,
+                product_ids=product_ids,
+                flash=flash,
             )
-            session.add(seller_order)
-            await session.flush()
-
-            for item in items:
-                product = item.product
-
-                # Create order item
-                session.add(
-                    OrderItem(
-                        order_id=new_order.id,
-                        product_id=product.id,
-                        product_name=product.name,
-                        quantity=item.quantity,
-                        total_price=product.price * item.quantity,
-                        seller_id=product.seller_id,
-                        image=product.image,
-                        status="pending",
-                    )
-                )
-
-                # Deduct stock
-                product.stock -= item.quantity
-                if product.stock <= 0:
-                    product.is_active = False
-                session.add(product)
-
-                # Remove cart item
-                await session.delete(item)
-
-        await session.commit()
-
-        # Invalidate caches
-        await cache.invalidate(CARTS_CACHE_KEY.format(user_id=current_user.id))
-        for product_id in product_ids:
-            await cache.invalidate(PRODUCTS_CACHE_KEY)
-            await cache.invalidate(PRODUCT_CACHE_KEY.format(id=product_id))
-        await cache.invalidate(ORDERS_CACHE_KEY.format(user_id=current_user.id))
-        await cache.invalidate(SELLER_ORDERS_CACHE_KEY)
-
-        return {"success": True, "message": "Checkout successful!"}
+        except CheckoutError as e:
+            await session.rollback()
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+        try:
+            await session.commit()
+        except Exception:
+            await release_flash_stock(flash, placed.flash_quantities)
+            raise
+
+        # Caches are invalidated by the outbox relay
+        outbox.wake()
 
+        return {"success": True, "message": "Checkout successful!", "order_id": placed.order_id}
+
+    except HTTPException:
+        raise
     except Exception as e:
         await session.rollback()
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/async", status_code=status.HTTP_202_ACCEPTED)
+async def checkout_async(
+    cart_item_ids: List[int] = Body([], embed=True),
+    product_ids: List[int] = Body([], embed=True),
+    user_address_id: int = Body(..., embed=True),
+    session: AsyncSession = Depends(get_async_session),
+    current_user: User = Depends(fastapi_users.current_user()),
+    redis: Redis = Depends(get_redis),
+):
+    """
+    Validate, reserve flash-sale stock and queue the order for the workers
+    (worker.py). Returns a token to poll GET /checkout/async/{token} with.
+    """
+    try:
+        if not cart_item_ids and not product_ids:
+            raise HTTPException(status_code=400, detail="No cart items provided")
+
+        # 1️⃣ Backpressure: refuse early instead of growing an unbounded queue
+        if await order_stream.backlog(redis) >= settings.order_stream_max_backlog:
+            raise HTTPException(
+                status_code=503,
+                detail="Checkout is busy, please retry shortly",
+                headers={"Retry-After": "5"},
+            )
+
+        if live_cart_enabled():
+            await LiveCartStore(redis).flush_user(session, current_user.id)
+
+        # 2️⃣ Validate: cheap indexed reads only, no locks
+        try:
+            cart_lines, _ = await _load_cart_and_address(
+                session, current_user.id, user_address_id, cart_item_ids, product_ids
+            )
+        except CheckoutError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+        quantities = {line.product_id: line.quantity for line in cart_lines}
+
+        # 3️⃣ Reserve flash-sale units now, regular stock is taken by the worker
+        flash = FlashSale(redis)
+        try:
+            reserved = await _reserve_flash_stock(flash, quantities)
+        except CheckoutError as e:
+            raise HTTPException(status_code=e.status_code, detail=str(e))
+
+        # 4️⃣ Enqueue
+        try:
+            token = await order_stream.enqueue(redis, {
+                "user_id": current_user.id,
+                "owner_name": _owner_name(current_user),
+                "user_address_id": user_address_id,
+                "cart_item_ids": cart_item_ids,
+                "product_ids": product_ids,
+                "reserved_flash": reserved,
+            })
+        except Exception:
+            await release_flash_stock(flash, reserved)
+            raise
+
+        return {"success": True, "status": "queued", "token": token}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/async/{token}")
+async def get_checkout_status(
+    token: str,
+    current_user: User = Depends(fastapi_users.current_user()),
+    redis: Redis = Depends(get_redis),
+):
+    try:
+        result = await order_stream.get_status(redis, token)
+        if not result or int(result["user_id"]) != current_user.id:
+            raise HTTPException(status_code=404, detail="Checkout not found")
+
+        return {
+            "token": token,
+            "status": result["status"],  # queued, completed or failed
+            "order_id": int(result["order_id"]) if result.get("order_id") else None,
+            "detail": result.get("detail"),
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -1,25 +1,27 @@
-from fastapi import APIRouter, HTTPException, Depends, Query
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Depends, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import List
+from typing import List, Optional
 
 from app.db import get_async_session
 from app.models.product import Product
-from app.schemas.product import PublicProductRead
-from typing import List
-from fastapi.encoders import jsonable_encoder
+from app.schemas.product import CategoryLiteral, PublicProductRead, TopProductRead
+from app.models.users import User
+from app.core.dependencies import admin_required
 
 from redis.asyncio import Redis
 import json
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
+from app.core.product_cache import ProductCache, split_product
+from app.core.view_counter import ViewCounter
+from app.core import bought_together, leaderboard, unique_counts
 
 
 router = APIRouter(prefix="/product", tags=["product"])
 
-# Cache keys
+# Cache keys (single product documents live in app.core.product_cache)
 PRODUCTS_CACHE_KEY = "products:all"
-PRODUCT_CACHE_KEY = "products:{id}"
 
 
 @router.get("", response_model=List[PublicProductRead])
@@ -31,55 +33,125 @@ async def get_products(
 ):
     try:
         cache = CacheManager(redis)
+        product_cache = ProductCache(redis)
         offset = (page - 1) * limit
 
         # Include page and limit in cache key
         cache_key = f"{PRODUCTS_CACHE_KEY}:page:{page}:limit:{limit}"
 
-        # 1️⃣ Return cached products if available
+        # 1️⃣ Pages only cache product ids, documents come from the product cache
         cached = await cache.get(cache_key)
         if cached:
-            return json.loads(cached)
+            return await product_cache.get_many(session, json.loads(cached))
 
         # 2️⃣ Query database with pagination
-        result = await session.execute(select(Product).offset(offset).limit(limit))
+        result = await session.execute(
+            select(Product).order_by(Product.id).offset(offset).limit(limit)
+        )
         products = result.scalars().all()
 
-        # 3️⃣ Serialize using Pydantic
-        data = [PublicProductRead.model_validate(p) for p in products]
-        encoded = jsonable_encoder(data)
+        # 3️⃣ Prime static/volatile documents and cache the page
+        await product_cache.prime(products)
+        await cache.set(cache_key, json.dumps([p.id for p in products]))
 
-        # 4️⃣ Cache the page
-        await cache.set(cache_key, json.dumps(encoded, default=str))
+        return [{**static, **volatile} for static, volatile in map(split_product, products)]
 
-        return encoded
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/top", response_model=List[TopProductRead])
+async def get_top_products(
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+    window: leaderboard.Window = Query("day"),
+    category: Optional[CategoryLiteral] = Query(None),
+    seller_id: Optional[int] = Query(None),
+    limit: int = Query(10, ge=1, le=100),
+):
+    """Best sellers by units over the last hour, day or week (catalog, category or seller)"""
+    try:
+        if category and seller_id:
+            raise HTTPException(status_code=400, detail="Filter by category or by seller, not both")
+
+        scope = f"category:{category}" if category else f"seller:{seller_id}" if seller_id else "all"
+
+        # 1️⃣ Ranking from the sorted set, documents from the product cache
+        ranked = await leaderboard.top(redis, scope, window, limit)
+        products = await ProductCache(redis).get_many(session, [product_id for product_id, _ in ranked])
+
+        units = dict(ranked)
+        return [{**product, "units_sold": units[product["id"]]} for product in products]
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/top/rebuild")
+async def rebuild_top_products(
+    _: User = Depends(admin_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+):
+    """Recreate the best-seller sorted sets from orders, e.g. after losing Redis data"""
+    try:
+        buckets = await leaderboard.rebuild(session, redis)
+        return {"success": True, "hours": buckets}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _count_view(redis: Redis, product_id: int, seller_id: Optional[int], visitor: str) -> None:
+    # Runs after the response is sent; a lost view is not worth an error
+    try:
+        await unique_counts.add_view(redis, product_id, seller_id, visitor)
+    except Exception as e:
+        print(f"Unique visitor count failed for product {product_id}: {e}")
+
+
 @router.get("/{product_id}", response_model=PublicProductRead)
 async def get_product(
     product_id: int,
+    request: Request,
+    background_tasks: BackgroundTasks,
     session: AsyncSession = Depends(get_async_session),
     redis: Redis = Depends(get_redis)
 ):
     try:
-        cache = CacheManager(redis)
-        cache_key = PRODUCT_CACHE_KEY.format(id=product_id)
-        cached = await cache.get(cache_key)
-        if cached:
-            return json.loads(cached)
-
-        product = await session.get(Product, product_id)
+        product = await ProductCache(redis).get(session, product_id)
         if not product:
             raise HTTPException(status_code=404, detail="Product not found")
 
-        data = PublicProductRead.model_validate(product)
-        encoded = jsonable_encoder(data)
+        ViewCounter.add(product_id)
+        # Static documents cached before seller_id was added only count per product
+        background_tasks.add_task(
+            _count_view, redis, product_id, product.get("seller_id"), unique_counts.visitor_id(request)
+        )
+        return product
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{product_id}/bought-together", response_model=List[PublicProductRead])
+async def get_bought_together(
+    product_id: int,
+    session: AsyncSession = Depends(get_async_session),
+    redis: Redis = Depends(get_redis),
+    limit: int = Query(8, ge=1, le=bought_together.TOP_K),
+):
+    """Products often ordered with this one, strongest association first"""
+    try:
+        # One ZREVRANGE for the ids, one MGET for the cached products
+        ids = await bought_together.neighbours(redis, product_id, limit)
+        products = await ProductCache(redis).get_many(session, ids)
 
-        await cache.set(cache_key, json.dumps(encoded))
-        return encoded
+        return [product for product in products if product["is_active"]]
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,12 +1,29 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from sqlalchemy.orm import selectinload
-from typing import List
+from typing import List, Literal, Optional
+from sqlalchemy import func
 from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from datetime import date, datetime, timedelta, timezone
 from app.db import get_async_session
-from app.models.seller import Seller, SellerOrder
-from app.schemas.seller import SellerRead, SellerOrderRead, SellerCreate
+from app.models.seller import Seller, SellerOrder, SellerOrderStatus
+from app.models.seller_stats import SellerDailyStats, SellerProductDailyStats
+from app.models.product_views import ProductDailyViews
+from app.schemas.seller import (
+    SellerRead,
+    SellerOrderRead,
+    SellerCreate,
+    OrderItemBulkTransition,
+    OrderItemBulkTransitionResult,
+    SellerAnalyticsSummary,
+    SellerDailyStatsRead,
+    SellerTopProductRead,
+    SellerCategorySalesRead,
+    SellerUniquesRead,
+    OrderValueDistributionRead,
+)
+from app.models.user_order import OrderAddress, OrderItem, OrderStatus
 from app.models.product import Product
 from app.schemas.product import SellerProductRead, ProductCreate, ProductUpdate
 from app.core.dependencies import seller_required
@@ -14,13 +31,32 @@ from app.routes.users import fastapi_users
 from app.models.users import User
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
+from app.core.product_cache import ProductCache
+from app.core import order_values, outbox, unique_counts
+from app.core.config import settings
+from app.core.flash_sale import FlashSale
+from app.core.order_export import MEDIA_TYPES, ExportFormat, export_filename, seller_lines_statement, stream_export
+from app.core.order_json import address_json, items_json
+from app.core.order_state import (
+    can_transition,
+    release_flash_after_commit,
+    restore_stock,
+    roll_up_orders,
+    roll_up_seller_orders,
+    transition_items,
+)
+from app.core.seller_stats import record_cancelled
+from app.routes.user_order import ORDER_CACHE_KEY, ORDERS_CACHE_KEY
 import json
 
 router = APIRouter(prefix="/seller", tags=["seller"])
 
 # Cache keys
 SELLER_CACHE_KEY = "sellers:{id}"
-SELLER_ORDERS_CACHE_KEY = "seller_orders:{id}"
+SELLER_ID_CACHE_KEY = "sellers:{id}:id"
+SELLER_ORDERS_CACHE_KEY = "seller_orders:{seller_id}"  # hash: one field per status/page
+SELLER_ANALYTICS_CACHE_KEY = "seller_analytics:{seller_id}"  # hash: one field per view/range
+SELLER_ANALYTICS_TTL = 60  # rollups change with every order, serve them slightly stale
 
 
 @router.get("", response_model=SellerRead)
@@ -62,11 +98,57 @@ async def get_seller(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _seller_inbox_statement(seller_id: int, status: Optional[SellerOrderStatus], offset: int, limit: int):
+    """Seller orders with their lines and shipping address, one round trip"""
+    items = items_json(
+        SellerOrder, OrderItem.order_id == SellerOrder.order_id, OrderItem.seller_id == SellerOrder.seller_id
+    )
+    address = address_json()
+
+    stmt = (
+        select(
+            SellerOrder.id,
+            SellerOrder.owner_id,
+            SellerOrder.owner_name,
+            SellerOrder.seller_id,
+            SellerOrder.order_id,
+            SellerOrder.status,
+            SellerOrder.total_price,
+            SellerOrder.created_at,
+            SellerOrder.updated_at,
+            items.label("items"),
+            address.label("shipping_address"),
+        )
+        .outerjoin(OrderAddress, OrderAddress.order_id == SellerOrder.order_id)
+        .where(SellerOrder.seller_id == seller_id)
+        .order_by(SellerOrder.created_at.desc(), SellerOrder.id.desc())
+        .offset(offset)
+        .limit(limit)
+    )
+    if status:
+        stmt = stmt.where(SellerOrder.status == status)
+    return stmt
+
+
+async def _seller_id(session: AsyncSession, cache: CacheManager, user_id: int) -> Optional[int]:
+    """A user's seller id never changes, so it is cached for a day"""
+    cache_key = SELLER_ID_CACHE_KEY.format(id=user_id)
+    cached = await cache.get(cache_key)
+    if cached:
+        return int(cached)
+
+    seller_id = await session.scalar(select(Seller.id).where(Seller.owner_id == user_id))
+    if seller_id:
+        await cache.set(cache_key, str(seller_id), ttl=60 * 60 * 24)
+    return seller_id
+
+
 @router.get("/order", response_model=List[SellerOrderRead])
 async def get_seller_orders(
     current_user: User = Depends(fastapi_users.current_user()),
     session: AsyncSession = Depends(get_async_session),
     redis=Depends(get_redis),
+    status: Optional[SellerOrderStatus] = Query(None),
     page: int = Query(1, ge=1),                 # page number, default 1
     limit: int = Query(20, ge=1, le=100),       # items per page, default 20, max 100
 ):
@@ -76,36 +158,497 @@ async def get_seller_orders(
             raise HTTPException(status_code=403, detail="User is not a seller")
 
         cache = CacheManager(redis)
-        offset = (page - 1) * limit
-        cache_key = f"{SELLER_ORDERS_CACHE_KEY}:{current_user.id}:page:{page}:limit:{limit}"
+        seller_id = await _seller_id(session, cache, current_user.id)
+        if not seller_id:
+            raise HTTPException(status_code=404, detail="Seller not found")
+
+        # One hash per seller: checkout and status changes drop every page at once
+        cache_key = SELLER_ORDERS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"status:{status.value if status else 'all'}:page:{page}:limit:{limit}"
 
         # Return cached orders if available
-        cached = await cache.get(cache_key)
+        cached = await cache.get_field(cache_key, cache_field)
         if cached:
-            return json.loads(cached)
+            return Response(content=cached, media_type="application/json")
 
-        # Fetch orders where owner_id is the seller's user id with pagination
         result = await session.execute(
-            select(SellerOrder)
-            .options(selectinload(SellerOrder.shipping_address))
-            .where(SellerOrder.owner_id == current_user.id)
-            .offset(offset)
+            _seller_inbox_statement(seller_id, status, (page - 1) * limit, limit)
+        )
+        data = [
+            SellerOrderRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
+
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded)
+
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/order/export")
+async def export_seller_orders(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    export_format: ExportFormat = Query("csv", alias="format"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+):
+    """Stream the seller's order lines as CSV or NDJSON for accounting, oldest first"""
+    try:
+        seller_id = await _seller_id(session, CacheManager(redis), current_user.id)
+        if not seller_id:
+            raise HTTPException(status_code=404, detail="Seller not found")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return StreamingResponse(
+        stream_export(seller_lines_statement(seller_id, since, until), export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename("seller-orders", export_format)}"'
+        },
+    )
+
+
+@router.post("/order/items/status", response_model=OrderItemBulkTransitionResult)
+async def transition_order_items(
+    body: OrderItemBulkTransition,
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+):
+    """
+    Move many order items through pending → processing → shipped → delivered
+    (or cancelled) in one transaction. Each item carries the status the
+    seller last saw; items changed meanwhile are rejected, not overwritten.
+    """
+    try:
+        seller_id = await session.scalar(select(Seller.id).where(Seller.owner_id == current_user.id))
+        if not seller_id:
+            raise HTTPException(status_code=404, detail="Seller profile not found")
+
+        # 1️⃣ Validate against the state machine
+        rejected: list[dict] = []
+        changes: dict[int, tuple[OrderStatus, OrderStatus]] = {}
+        for item in body.items:
+            from_status, to_status = OrderStatus(item.from_status), OrderStatus(item.to_status)
+            if item.order_item_id in changes:
+                rejected.append({"order_item_id": item.order_item_id, "reason": "Duplicate item"})
+            elif not can_transition(from_status, to_status):
+                rejected.append({
+                    "order_item_id": item.order_item_id,
+                    "reason": f"Cannot go from {from_status.value} to {to_status.value}",
+                })
+            else:
+                changes[item.order_item_id] = (from_status, to_status)
+
+        if not changes:
+            return {"updated": [], "rejected": rejected}
+
+        # 2️⃣ One compare-and-set UPDATE for all items
+        rows, owners = await transition_items(
+            session, seller_id, [(item_id, f, t) for item_id, (f, t) in changes.items()]
+        )
+        updated_ids = {row.id for row in rows}
+        rejected += [
+            {"order_item_id": item_id, "reason": "Not found or status changed since it was read"}
+            for item_id in changes
+            if item_id not in updated_ids
+        ]
+        if not rows:
+            await session.rollback()
+            return {"updated": [], "rejected": rejected}
+
+        # 3️⃣ Cancelled items give their stock back, then count in the stats (product locks first)
+        flash = FlashSale(redis)
+        cancelled = [row for row in rows if row.status == OrderStatus.CANCELLED]
+        quantities: dict[int, int] = {}
+        for row in cancelled:
+            quantities[row.product_id] = quantities.get(row.product_id, 0) + row.quantity
+        flash_quantities = await restore_stock(session, flash, quantities) if quantities else {}
+        await record_cancelled(session, cancelled)
+
+        # 4️⃣ Parent orders follow their items
+        order_ids = sorted({row.order_id for row in rows})
+        await roll_up_orders(session, order_ids)
+        await roll_up_seller_orders(session, seller_id, order_ids)
+
+        updated = [{"id": row.id, "order_id": row.order_id, "status": row.status.value} for row in rows]
+        outbox.invalidate(
+            session,
+            SELLER_ORDERS_CACHE_KEY.format(seller_id=seller_id),
+            *[ORDER_CACHE_KEY.format(user_id=owners[order_id], order_id=order_id) for order_id in order_ids],
+            # Buyers' order lists show item counts and statuses too
+            *{ORDERS_CACHE_KEY.format(user_id=owners[order_id]) for order_id in order_ids},
+            *ProductCache.volatile_keys(quantities),
+        )
+        outbox.add_event(session, outbox.ORDER_ITEMS_TOPIC, {"seller_id": seller_id, "items": updated})
+        await session.commit()
+        outbox.wake()
+
+        if flash_quantities:
+            await release_flash_after_commit(session, flash, flash_quantities)
+
+        return {"updated": updated, "rejected": rejected}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        await session.rollback()
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+ANALYTICS_MAX_DAYS = 366 * 2
+
+
+def _analytics_range(since: Optional[date], until: Optional[date]) -> tuple[date, date]:
+    """Inclusive day range, the last 30 days by default"""
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=29)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if (until - since).days >= ANALYTICS_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Ranges are limited to {ANALYTICS_MAX_DAYS} days")
+    return since, until
+
+
+async def _analytics_seller(session: AsyncSession, cache: CacheManager, user_id: int) -> int:
+    seller_id = await _seller_id(session, cache, user_id)
+    if not seller_id:
+        raise HTTPException(status_code=404, detail="Seller not found")
+    return seller_id
+
+
+def _period_stats(row, prefix: str) -> dict:
+    orders, units, revenue = row[f"{prefix}orders"], row[f"{prefix}units"], row[f"{prefix}revenue"]
+    cancelled_units, cancelled_revenue = row[f"{prefix}cancelled_units"], row[f"{prefix}cancelled_revenue"]
+    return {
+        "orders": orders,
+        "units": units,
+        "revenue": revenue,
+        "net_revenue": revenue - cancelled_revenue,
+        "average_order_value": revenue / orders if orders else 0.0,
+        "cancellation_rate": cancelled_units / units if units else 0.0,
+    }
+
+
+@router.get("/analytics/summary", response_model=SellerAnalyticsSummary)
+async def get_seller_analytics_summary(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """Revenue, order volume, AOV and cancellations, with the previous period for comparison"""
+    try:
+        since, until = _analytics_range(since, until)
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        cache_key = SELLER_ANALYTICS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"summary:{since}:{until}"
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        # 1️⃣ Both periods in one pass over at most 2 × days rows
+        previous_since = since - (until - since) - timedelta(days=1)
+        current = SellerDailyStats.day >= since
+        columns = []
+        for name in ("orders", "units", "revenue", "cancelled_units", "cancelled_revenue"):
+            column = getattr(SellerDailyStats, name)
+            columns.append(func.coalesce(func.sum(column).filter(current), 0).label(name))
+            columns.append(func.coalesce(func.sum(column).filter(~current), 0).label(f"previous_{name}"))
+        result = await session.execute(
+            select(*columns).where(
+                SellerDailyStats.seller_id == seller_id,
+                SellerDailyStats.day.between(previous_since, until),
+            )
+        )
+        row = result.mappings().one()
+
+        data = SellerAnalyticsSummary(
+            since=since,
+            until=until,
+            current=_period_stats(row, ""),
+            previous=_period_stats(row, "previous_"),
+        ).model_dump(mode="json")
+
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded, ttl=SELLER_ANALYTICS_TTL)
+
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/daily", response_model=List[SellerDailyStatsRead])
+async def get_seller_analytics_daily(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """One row per day with sales; days without sales are omitted"""
+    try:
+        since, until = _analytics_range(since, until)
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        cache_key = SELLER_ANALYTICS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"daily:{since}:{until}"
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        result = await session.execute(
+            select(SellerDailyStats)
+            .where(SellerDailyStats.seller_id == seller_id, SellerDailyStats.day.between(since, until))
+            .order_by(SellerDailyStats.day)
+        )
+        data = [
+            SellerDailyStatsRead.model_validate(stats).model_dump(mode="json")
+            for stats in result.scalars().all()
+        ]
+
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded, ttl=SELLER_ANALYTICS_TTL)
+
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/top-products", response_model=List[SellerTopProductRead])
+async def get_seller_top_products(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+    sort: Literal["revenue", "units"] = Query("revenue"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Best selling products in the range, net of cancellations"""
+    try:
+        since, until = _analytics_range(since, until)
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        cache_key = SELLER_ANALYTICS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"top:{sort}:{since}:{until}:{limit}"
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        stats = SellerProductDailyStats
+        units = func.sum(stats.units - stats.cancelled_units).label("units")
+        revenue = func.sum(stats.revenue - stats.cancelled_revenue).label("revenue")
+        ranked = (
+            select(
+                stats.product_id,
+                func.max(stats.category).label("category"),
+                func.sum(stats.orders).label("orders"),
+                units,
+                revenue,
+            )
+            .where(stats.seller_id == seller_id, stats.day.between(since, until))
+            .group_by(stats.product_id)
+            .order_by((revenue if sort == "revenue" else units).desc(), stats.product_id)
             .limit(limit)
+            .subquery("ranked")
+        )
+        # Views only for the `limit` ranked products: a primary key range scan each
+        views = (
+            select(func.coalesce(func.sum(ProductDailyViews.views), 0))
+            .where(ProductDailyViews.product_id == ranked.c.product_id, ProductDailyViews.day.between(since, until))
+            .scalar_subquery()
         )
+        result = await session.execute(
+            select(ranked, Product.name.label("product_name"), views.label("views"))
+            .join(Product, Product.id == ranked.c.product_id)
+            .order_by((ranked.c.revenue if sort == "revenue" else ranked.c.units).desc(), ranked.c.product_id)
+        )
+        data = [
+            SellerTopProductRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
+        ]
 
-        orders = result.scalars().all()
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded, ttl=SELLER_ANALYTICS_TTL)
 
-        # Serialize using Pydantic
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/categories", response_model=List[SellerCategorySalesRead])
+async def get_seller_category_sales(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """Net revenue per product category in the range"""
+    try:
+        since, until = _analytics_range(since, until)
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        cache_key = SELLER_ANALYTICS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"categories:{since}:{until}"
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        stats = SellerProductDailyStats
+        revenue = func.sum(stats.revenue - stats.cancelled_revenue)
+        result = await session.execute(
+            select(
+                func.coalesce(stats.category, "Uncategorized").label("category"),
+                func.sum(stats.units - stats.cancelled_units).label("units"),
+                revenue.label("revenue"),
+            )
+            .where(stats.seller_id == seller_id, stats.day.between(since, until))
+            .group_by(func.coalesce(stats.category, "Uncategorized"))
+            .order_by(revenue.desc())
+        )
+        rows = result.all()
+        total = sum(row.revenue for row in rows)
         data = [
-            SellerOrderRead.model_validate(o).model_dump(mode="json")
-            for o in orders
+            SellerCategorySalesRead(
+                category=row.category,
+                units=row.units,
+                revenue=row.revenue,
+                share=row.revenue / total if total else 0.0,
+            ).model_dump(mode="json")
+            for row in rows
         ]
 
-        # Cache per seller and per page
-        await cache.set(cache_key, json.dumps(data, default=str))
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded, ttl=SELLER_ANALYTICS_TTL)
 
-        return data
+        return Response(content=encoded, media_type="application/json")
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/order-values", response_model=OrderValueDistributionRead)
+async def get_seller_order_values(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+):
+    """Median, p90 and other quantiles of the seller's part of each order"""
+    try:
+        since, until = _analytics_range(since, until)
+        if (until - since).days >= settings.order_value_retention_days:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Order value digests are kept for {settings.order_value_retention_days} days",
+            )
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        cache_key = SELLER_ANALYTICS_CACHE_KEY.format(seller_id=seller_id)
+        cache_field = f"order_values:{since}:{until}"
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        # One digest per day merged in memory, no order rows are read
+        digest = await order_values.distribution(redis, f"seller:{seller_id}", since, until)
+        data = OrderValueDistributionRead(
+            since=since, until=until, **order_values.summarize(digest)
+        ).model_dump(mode="json")
+
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded, ttl=SELLER_ANALYTICS_TTL)
+
+        return Response(content=encoded, media_type="application/json")
 
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/analytics/uniques", response_model=SellerUniquesRead)
+async def get_seller_uniques(
+    current_user: User = Depends(seller_required),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    since: Optional[date] = Query(None),
+    until: Optional[date] = Query(None),
+    product_id: Optional[int] = Query(None),
+):
+    """Unique buyers and product page visitors, per day and over the range"""
+    try:
+        since, until = _analytics_range(since, until)
+        if (until - since).days >= settings.unique_counts_retention_days:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unique counts are kept for {settings.unique_counts_retention_days} days",
+            )
+        cache = CacheManager(redis)
+        seller_id = await _analytics_seller(session, cache, current_user.id)
+
+        if product_id is not None:
+            owner = await session.scalar(select(Product.seller_id).where(Product.id == product_id))
+            if owner != seller_id:
+                raise HTTPException(status_code=404, detail="Product not found")
+            scope = f"product:{product_id}"
+        else:
+            scope = f"seller:{seller_id}"
+
+        # Each PFCOUNT/PFMERGE reads ~12KB per day key; no SQL past the ownership check
+        buyers = await unique_counts.count_range(redis, "buyers", scope, since, until)
+        visitors = await unique_counts.count_range(redis, "visitors", scope, since, until)
+        daily_buyers = await unique_counts.count_daily(redis, "buyers", scope, since, until)
+        daily_visitors = await unique_counts.count_daily(redis, "visitors", scope, since, until)
+
+        return SellerUniquesRead(
+            since=since,
+            until=until,
+            product_id=product_id,
+            buyers=buyers,
+            visitors=visitors,
+            # Both are estimates: clamp so a small sample never reads above 100%
+            conversion_rate=min(buyers / visitors, 1.0) if visitors else 0.0,
+            daily=[
+                {"day": day, "buyers": b, "visitors": v}
+                for (day, b), (_, v) in zip(daily_buyers, daily_visitors)
+            ],
+        )
+
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -253,12 +796,11 @@ async def create_seller_product(
             **product_create.model_dump()
         )
         session.add(new_product)
+        # Invalidate seller products cache once committed
+        outbox.invalidate(session, SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id))
         await session.commit()
         await session.refresh(new_product)
-
-        # Invalidate seller products cache
-        cache = CacheManager(redis)
-        await cache.invalidate(SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id))
+        outbox.wake()
 
         return SellerProductRead.model_validate(new_product)
     
@@ -289,17 +831,27 @@ async def update_seller_product(
             raise HTTPException(status_code=404, detail="Product not found")
 
         # Update fields
-        for key, value in product_update.model_dump(exclude_unset=True).items():
+        updates = product_update.model_dump(exclude_unset=True)
+        for key, value in updates.items():
             setattr(product, key, value)
+        # The seller switching is_active is a delisting (or relisting); cart cleanup keys off it
+        if updates.get("is_active") is False:
+            product.delisted_at = product.delisted_at or func.now()
+        elif updates.get("is_active") is True:
+            product.delisted_at = None
 
         session.add(product)
+        # Invalidate caches once committed
+        outbox.invalidate(
+            session,
+            SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id),
+            SELLER_PRODUCT_CACHE_KEY.format(id=product_id),
+            *ProductCache.static_keys([product_id]),
+            *ProductCache.volatile_keys([product_id]),
+        )
         await session.commit()
         await session.refresh(product)
-
-        # Invalidate caches
-        cache = CacheManager(redis)
-        await cache.invalidate(SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id))
-        await cache.invalidate(SELLER_PRODUCT_CACHE_KEY.format(id=product_id))
+        outbox.wake()
 
         return SellerProductRead.model_validate(product)
     
@@ -329,12 +881,16 @@ async def delete_seller_product(
             raise HTTPException(status_code=404, detail="Product not found")
 
         await session.delete(product)
+        # Invalidate caches once committed
+        outbox.invalidate(
+            session,
+            SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id),
+            SELLER_PRODUCT_CACHE_KEY.format(id=product_id),
+            *ProductCache.static_keys([product_id]),
+            *ProductCache.volatile_keys([product_id]),
+        )
         await session.commit()
-
-        # Invalidate caches
-        cache = CacheManager(redis)
-        await cache.invalidate(SELLER_PRODUCTS_CACHE_KEY.format(id=current_user.id))
-        await cache.invalidate(SELLER_PRODUCT_CACHE_KEY.format(id=product_id))
+        outbox.wake()
 
         return {"detail": "Product deleted successfully"}
     
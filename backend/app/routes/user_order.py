@@ -1,24 +1,34 @@
-from fastapi import APIRouter, Depends, HTTPException, Body, Query
+from fastapi import APIRouter, Depends, HTTPException, Body, Query, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy import update
 
 from app.db import get_async_session
-from app.models.user_order import Order
-from app.schemas.user_order import OrderRead, OrderUpdate
+from app.models.user_order import Order, OrderStatus
+from app.schemas.user_order import OrderRead, OrderSummaryRead, OrderUpdate
 from app.routes.users import fastapi_users
 from app.models.users import User
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from sqlalchemy.orm import selectinload
 
 import json
 from app.core.redis import get_redis
 from app.core.cache import CacheManager
+from app.core import outbox
+from app.core.flash_sale import FlashSale
+from app.core.order_export import MEDIA_TYPES, ExportFormat, buyer_lines_statement, export_filename, stream_export
+from app.core.order_json import order_statement, orders_page_statement
+from app.core.order_state import cancel_items, release_flash_after_commit
+from app.core.product_cache import ProductCache
 
 router = APIRouter(prefix="/order", tags=["order"])
 
 # Cache keys
-ORDERS_CACHE_KEY = "orders:user:{user_id}"
+ORDERS_CACHE_KEY = "orders:user:{user_id}"  # hash: one field per page
 ORDER_CACHE_KEY = "orders:user:{user_id}:{order_id}"
+SELLER_ORDERS_CACHE_KEY = "seller_orders:{seller_id}"
 
 @router.get("", response_model=List[OrderRead])
 async def get_orders(
@@ -32,42 +42,96 @@ async def get_orders(
         cache = CacheManager(redis)
         offset = (page - 1) * limit
 
-        # Cache key includes user, page, and limit
-        cache_key = f"{ORDERS_CACHE_KEY}:user:{current_user.id}:page:{page}:limit:{limit}"
+        # One hash per user, one field per page, so a single delete drops every page
+        cache_key = ORDERS_CACHE_KEY.format(user_id=current_user.id)
+        cache_field = f"page:{page}:limit:{limit}"
 
         # 1️⃣ Return cached orders if available
-        cached = await cache.get(cache_key)
+        cached = await cache.get_field(cache_key, cache_field)
         if cached:
-            return json.loads(cached)
+            return Response(content=cached, media_type="application/json")
 
-        # 2️⃣ Fetch orders from DB with pagination
-        result = await session.execute(
-            select(Order)
-            .options(
-                selectinload(Order.items),
-                selectinload(Order.shipping_address),
+        # 2️⃣ Postgres builds the whole page as JSON in one query
+        encoded = await session.scalar(orders_page_statement(current_user.id, offset, limit))
+
+        # 3️⃣ Cache per user and per page
+        await cache.set_field(cache_key, cache_field, encoded)
+
+        return Response(content=encoded, media_type="application/json")
+
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+
+@router.get("/summary", response_model=List[OrderSummaryRead])
+async def get_order_summaries(
+    current_user: User = Depends(fastapi_users.current_user()),
+    session: AsyncSession = Depends(get_async_session),
+    redis=Depends(get_redis),
+    before: Optional[int] = Query(None, ge=1),  # id of the last order on the previous page
+    limit: int = Query(20, ge=1, le=100),
+):
+    """
+    Order history without the lines, newest first. Pages by id (keyset) so
+    every page is one range scan of ix_orders_owner_id_id; the lines of an
+    order are loaded by GET /order/{order_id}.
+    """
+    try:
+        cache = CacheManager(redis)
+        cache_key = ORDERS_CACHE_KEY.format(user_id=current_user.id)
+        cache_field = f"summary:before:{before}:limit:{limit}"
+
+        cached = await cache.get_field(cache_key, cache_field)
+        if cached:
+            return Response(content=cached, media_type="application/json")
+
+        stmt = (
+            select(
+                Order.id,
+                Order.status,
+                Order.total_price,
+                Order.item_count,
+                Order.first_item_image,
+                Order.created_at,
             )
             .where(Order.owner_id == current_user.id)
-            .offset(offset)
+            .order_by(Order.id.desc())
             .limit(limit)
         )
+        if before is not None:
+            stmt = stmt.where(Order.id < before)
 
-        orders = result.scalars().all()
-
-        # 3️⃣ Serialize using Pydantic
+        result = await session.execute(stmt)
         data = [
-            OrderRead.model_validate(order).model_dump(mode="json")
-            for order in orders
+            OrderSummaryRead.model_validate(row._asdict()).model_dump(mode="json")
+            for row in result.all()
         ]
 
-        # 4️⃣ Cache per user and per page
-        await cache.set(cache_key, json.dumps(data, default=str))
+        encoded = json.dumps(data)
+        await cache.set_field(cache_key, cache_field, encoded)
 
-        return data
+        return Response(content=encoded, media_type="application/json")
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
-    
+
+
+@router.get("/export")
+async def export_orders(
+    current_user: User = Depends(fastapi_users.current_user()),
+    export_format: ExportFormat = Query("csv", alias="format"),
+    since: Optional[datetime] = Query(None),
+    until: Optional[datetime] = Query(None),
+):
+    """Stream the buyer's order lines as CSV or NDJSON, oldest first"""
+    return StreamingResponse(
+        stream_export(buyer_lines_statement(current_user.id, since, until), export_format),
+        media_type=MEDIA_TYPES[export_format],
+        headers={
+            "Content-Disposition": f'attachment; filename="{export_filename("orders", export_format)}"'
+        },
+    )
+
 
 @router.get("/{order_id}", response_model=OrderRead)
 async def get_order(
@@ -85,28 +149,16 @@ async def get_order(
 
         cached = await cache.get(cache_key)
         if cached:
-            return json.loads(cached)
+            return Response(content=cached, media_type="application/json")
 
-        result = await session.execute(
-            select(Order)
-            .options(
-                selectinload(Order.items),
-                selectinload(Order.shipping_address),
-            )
-            .where(
-                Order.id == order_id,
-                Order.owner_id == current_user.id,
-            )
-        )
-        order = result.scalars().first()
+        encoded = await session.scalar(order_statement(current_user.id, order_id))
 
-        if not order:
+        if not encoded:
             raise HTTPException(status_code=404, detail="Order not found")
 
-        data = OrderRead.model_validate(order).model_dump(mode="json")
-        await cache.set(cache_key, json.dumps(data))
+        await cache.set(cache_key, encoded)
 
-        return data
+        return Response(content=encoded, media_type="application/json")
 
     except HTTPException:
         raise
@@ -123,43 +175,58 @@ async def update_order(
     current_user: User = Depends(fastapi_users.current_user()),
     redis=Depends(get_redis),
 ):
+    """Cancel one of the buyer's own orders while it is still pending"""
     try:
-        cache = CacheManager(redis)
-
+        # 1️⃣ Compare-and-set: only a pending order of this buyer flips
         result = await session.execute(
-            select(Order)
-            .options(selectinload(Order.items))
+            update(Order)
             .where(
                 Order.id == order_id,
                 Order.owner_id == current_user.id,
+                Order.status == OrderStatus.PENDING,
             )
+            .values(status=OrderStatus(order_update.status))
+            .returning(Order.id)
+            .execution_options(synchronize_session=False)
         )
-        order = result.scalars().first()
+        cancelled = result.first()
 
-        if not order:
-            raise HTTPException(status_code=404, detail="Order not found")
-
-        update_data = order_update.model_dump(exclude_unset=True)
-        for key, value in update_data.items():
-            setattr(order, key, value)
-
-        await session.commit()
-        await session.refresh(order)
-
-        # ♻️ Invalidate only this user's cache
-        await cache.invalidate(
-            ORDERS_CACHE_KEY.format(user_id=current_user.id)
-        )
-        await cache.invalidate(
-            ORDER_CACHE_KEY.format(
-                user_id=current_user.id,
-                order_id=order_id,
+        if not cancelled:
+            exists = await session.scalar(
+                select(Order.id).where(Order.id == order_id, Order.owner_id == current_user.id)
             )
+            if not exists:
+                raise HTTPException(status_code=404, detail="Order not found")
+            raise HTTPException(status_code=409, detail="Only pending orders can be cancelled")
+
+        # 2️⃣ Items, seller orders and stock
+        flash = FlashSale(redis)
+        flash_quantities, product_ids, seller_ids = await cancel_items(session, flash, [order_id])
+
+        # ♻️ Invalidate only this user's cache, once committed
+        outbox.invalidate(
+            session,
+            ORDERS_CACHE_KEY.format(user_id=current_user.id),
+            ORDER_CACHE_KEY.format(user_id=current_user.id, order_id=order_id),
+            *[SELLER_ORDERS_CACHE_KEY.format(seller_id=seller_id) for seller_id in seller_ids],
+            *ProductCache.volatile_keys(product_ids),
         )
+        outbox.add_event(session, outbox.ORDER_CANCELLED_TOPIC, {"order_ids": [order_id], "reason": "buyer"})
+        await session.commit()
+        outbox.wake()
 
-        return OrderRead.model_validate(order)
+        if flash_quantities:
+            await release_flash_after_commit(session, flash, flash_quantities)
+
+        result = await session.execute(
+            select(Order)
+            .options(selectinload(Order.items), selectinload(Order.shipping_address))
+            .where(Order.id == order_id)
+        )
+        return OrderRead.model_validate(result.scalars().first())
 
     except HTTPException:
+        await session.rollback()
         raise
     except Exception as e:
         await session.rollback()
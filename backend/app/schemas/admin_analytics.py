@@ -0,0 +1,34 @@
+from pydantic import BaseModel
+from datetime import date
+
+
+class PlatformDailyGmvRead(BaseModel):
+    day: date
+    orders: int
+    cancelled_orders: int
+    gmv: float  # total of orders that were not cancelled
+    buyers: int
+
+
+class OrderStatusCountRead(BaseModel):
+    status: str
+    orders: int
+    total: float
+
+
+class DailySignupsRead(BaseModel):
+    day: date
+    users: int
+    sellers: int
+
+
+class CategorySalesRead(BaseModel):
+    category: str
+    orders: int
+    units: int
+    revenue: float
+
+
+class SellerFunnelStageRead(BaseModel):
+    stage: str
+    sellers: int
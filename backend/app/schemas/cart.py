@@ -1,4 +1,5 @@
 from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
 
 class CartItemCreate(BaseModel):
     product_id: int
@@ -24,4 +25,59 @@ class CartItemRead(BaseModel):
     quantity: int
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class CartBulkLine(BaseModel):
+    product_id: int
+    quantity: int = Field(..., ge=0)  # in "set" mode 0 removes the line
+
+
+class CartBulkUpdate(BaseModel):
+    mode: Literal["add", "set"] = "add"
+    items: List[CartBulkLine] = Field(..., min_length=1, max_length=500)
+
+
+class CartBulkResult(BaseModel):
+    items: List[CartItemRead]
+    removed: List[int]   # product ids
+    rejected: List[int]  # product ids (unknown product or not enough stock)
+
+
+## CART SUMMARY
+class CartSummaryLine(BaseModel):
+    cart_item_id: int
+    product_id: int
+    name: str
+    image: Optional[str] = None
+    quantity: int
+    unit_price: float  # current product price
+    line_total: float
+    stock: int
+    available: bool
+    issue: Optional[Literal["inactive", "out_of_stock", "insufficient_stock"]] = None
+
+
+class CartSellerSummary(BaseModel):
+    seller_id: int
+    store_name: str
+    item_count: int   # available units only
+    subtotal: float   # available lines only
+    lines: List[CartSummaryLine]
+
+
+class CartSummary(BaseModel):
+    item_count: int
+    subtotal: float
+    has_issues: bool
+    sellers: List[CartSellerSummary]
+
+
+## LIVE CART (Redis store)
+class LiveCartItemUpdate(BaseModel):
+    quantity: int = Field(..., ge=1)
+
+
+class LiveCartItemRead(BaseModel):
+    product_id: int
+    quantity: int
+    product: ProductInCart
@@ -56,6 +56,11 @@ class PublicProductRead(ProductBase):
         from_attributes = True
 
 
+class TopProductRead(PublicProductRead):
+    """Best seller entry: the product plus units sold in the window"""
+    units_sold: int
+
+
 class SellerProductRead(ProductBase):
     """Returned to seller/admin with extra info"""
     id: int
@@ -1,7 +1,7 @@
 from pydantic import BaseModel, Field
-from typing import Optional
-from datetime import datetime
-from app.schemas.user_order import OrderAddressRead
+from typing import List, Optional
+from datetime import date, datetime
+from app.schemas.user_order import OrderAddressRead, OrderItemRead, OrderStatusLiteral
 from app.models.seller import SellerStatus, SellerOrderStatus
 
 
@@ -57,13 +57,16 @@ class SellerRead(SellerBase):
 ## SELLER ORDER
 class SellerOrderRead(BaseModel):
     id: int
-    owner_id: int
+    owner_id: int  # the buyer
     owner_name: str
+    seller_id: Optional[int] = None
+    order_id: Optional[int] = None
     status: SellerOrderStatus
     total_price: float
     created_at: datetime
     updated_at: datetime
 
+    items: List[OrderItemRead] = []
     shipping_address: Optional[OrderAddressRead] = None
 
     class Config:
@@ -77,4 +80,103 @@ class SellerOrderCreate(BaseModel):
 
 class SellerOrderUpdate(BaseModel):
     status: Optional[SellerOrderStatus] = None
-    total_price: Optional[float] = None
\ No newline at end of file
+    total_price: Optional[float] = None
+
+
+class OrderItemTransition(BaseModel):
+    order_item_id: int
+    from_status: OrderStatusLiteral  # status the seller last saw, checked on update
+    to_status: OrderStatusLiteral
+
+
+class OrderItemBulkTransition(BaseModel):
+    items: List[OrderItemTransition] = Field(..., min_length=1, max_length=1000)
+
+
+class OrderItemStatusRead(BaseModel):
+    id: int
+    order_id: int
+    status: OrderStatusLiteral
+
+
+class OrderItemTransitionRejected(BaseModel):
+    order_item_id: int
+    reason: str
+
+
+class OrderItemBulkTransitionResult(BaseModel):
+    updated: List[OrderItemStatusRead]
+    rejected: List[OrderItemTransitionRejected]
+
+
+class SellerPeriodStats(BaseModel):
+    orders: int
+    units: int
+    revenue: float
+    net_revenue: float          # revenue minus cancelled items
+    average_order_value: float
+    cancellation_rate: float    # cancelled units / units
+
+
+class SellerAnalyticsSummary(BaseModel):
+    since: date
+    until: date
+    current: SellerPeriodStats
+    previous: SellerPeriodStats  # the same number of days right before `since`
+
+
+class SellerDailyStatsRead(BaseModel):
+    day: date
+    orders: int
+    units: int
+    revenue: float
+    cancelled_units: int
+    cancelled_revenue: float
+
+    class Config:
+        from_attributes = True
+
+
+class SellerTopProductRead(BaseModel):
+    product_id: int
+    product_name: str
+    category: Optional[str] = None
+    orders: int
+    units: int
+    revenue: float
+    views: int = 0  # product page views in the range
+
+
+class SellerCategorySalesRead(BaseModel):
+    category: str
+    units: int
+    revenue: float
+    share: float  # of the seller's revenue in the range
+
+
+class SellerUniqueDayRead(BaseModel):
+    day: date
+    buyers: int
+    visitors: int
+
+
+class SellerUniquesRead(BaseModel):
+    """Approximate distinct counts (HyperLogLog, ~1% error)"""
+    since: date
+    until: date
+    product_id: Optional[int] = None  # whole store when empty
+    buyers: int                       # distinct over the range, not the sum of the days
+    visitors: int
+    conversion_rate: float            # buyers / visitors
+    daily: List[SellerUniqueDayRead]
+
+
+class OrderValueDistributionRead(BaseModel):
+    """Order value quantiles from daily t-digests (approximate, tails most accurate)"""
+    since: date
+    until: date
+    orders: int
+    mean: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    quantiles: dict[str, Optional[float]]  # p25, p50, p75, p90, p95, p99
@@ -48,6 +48,19 @@ class OrderRead(BaseModel):
         from_attributes = True
 
 
+class OrderSummaryRead(BaseModel):
+    """Order history row: read from the orders table only"""
+    id: int
+    status: OrderStatusLiteral
+    total_price: float
+    item_count: int
+    first_item_image: Optional[str] = None
+    created_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
 class OrderItemCreate(BaseModel):
     product_id: int
     quantity: int
@@ -60,5 +73,5 @@ class OrderCreate(BaseModel):
 
 
 class OrderUpdate(BaseModel):
-    status: Optional[OrderStatusLiteral] = None
-    total_price: Optional[float] = None
\ No newline at end of file
+    # Buyers can only cancel; fulfillment goes through the seller endpoints
+    status: Literal["cancelled"]
\ No newline at end of file
@@ -0,0 +1,14 @@
+from multiprocessing import Process
+
+from app.core.config import settings
+from app.order_worker import start_worker
+
+if __name__ == "__main__":
+    processes = [
+        Process(target=start_worker, args=(i,), name=f"order-worker-{i}")
+        for i in range(settings.order_worker_processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()